@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Cold import time of the package entry points.
+
+Each module is imported in a fresh interpreter (best of --repeat runs), so
+the numbers are what a CLI invocation pays before doing any work. Also
+reports whether crewai was pulled in: the crew-free entry points
+(mars_exploration.cli, planning.evaluate) must not import it. Run from the
+repository root:
+
+    python benchmarks/bench_import.py [--repeat 5] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+MODULES = [
+    ("mars_exploration.paths", False),
+    ("mars_exploration.cli", False),
+    ("mars_exploration.planning.evaluate", False),
+    ("mars_exploration.tools.rover_path_tool", True),
+    ("mars_exploration.main", True),
+]
+
+_PROBE = (
+    "import sys, time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t, 'crewai' in sys.modules, 'networkx' in sys.modules)"
+)
+
+
+def _import_once(module: str) -> tuple:
+    env = {**os.environ, "PYTHONPATH": os.path.abspath(SRC)}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)], env=env, check=True, capture_output=True, text=True
+    ).stdout.split()
+    return float(out[0]), out[1] == "True", out[2] == "True"
+
+
+def run(repeat: int) -> dict:
+    results = {}
+    for module, crew_expected in MODULES:
+        runs = [_import_once(module) for _ in range(repeat)]
+        results[module] = {
+            "seconds": min(r[0] for r in runs),
+            "crewai": runs[0][1],
+            "networkx": runs[0][2],
+            "crewai_expected": crew_expected,
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for module, r in results.items():
+            flags = ", ".join(name for name in ("crewai", "networkx") if r[name]) or "-"
+            print(f"{module:<40} {r['seconds'] * 1000:>9.1f} ms   imports: {flags}")
+
+    leaked = [m for m, r in results.items() if r["crewai"] and not r["crewai_expected"]]
+    if leaked:
+        sys.exit(f"crewai imported by crew-free entry points: {', '.join(leaked)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Construction and serialization throughput of the hot-path models.
+
+Compares per-item validated construction, model_construct() and the batched
+per-goal model_validate() used by planning/fleet.py, and per-item
+model_dump_json() with dump_json() of the whole list (models/serialization.py).
+Run from the repository root:
+
+    python benchmarks/bench_models.py [--goals 200] [--vehicles 200] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mars_exploration.models.mission_spec import MissionSpec  # noqa: E402
+from mars_exploration.models.rover_models import GoalCandidates, RoverCandidate  # noqa: E402
+from mars_exploration.models.serialization import dump_json  # noqa: E402
+
+
+def _candidate_fields(i: int) -> dict:
+    return dict(
+        rover_id=f"rover_{i}",
+        path=[f"N{(i + k) % 100}" for k in range(12)],
+        distance=120.0 + i,
+        energy_required=24.0 + i * 0.2,
+        recharge_before=bool(i % 2),
+        speed=1.5,
+        location=f"N{i % 100}",
+    )
+
+
+def _timed(fn, n: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return n / elapsed if elapsed > 0 else float("inf")
+
+
+def run(goals: int, vehicles: int) -> dict:
+    fields = [_candidate_fields(i) for i in range(vehicles)]
+    n = goals * vehicles
+    results = {}
+
+    goal = dict(goal_id="G", description="d", priority="high", terrain="rocky", target_nodes=["N1"])
+
+    results["construct_validated_per_s"] = _timed(
+        lambda: [[RoverCandidate(**f) for f in fields] for _ in range(goals)], n
+    )
+    results["construct_model_construct_per_s"] = _timed(
+        lambda: [[RoverCandidate.model_construct(**f) for f in fields] for _ in range(goals)], n
+    )
+    results["construct_goal_batch_per_s"] = _timed(
+        lambda: [
+            GoalCandidates.model_validate({**goal, "candidates": fields, "no_candidates": []}) for _ in range(goals)
+        ],
+        n,
+    )
+    results["rejection_goal_batch_per_s"] = _timed(
+        lambda: [
+            GoalCandidates.model_validate(
+                {**goal, "candidates": [], "no_candidates": [{"rover_id": f["rover_id"], "reason": "no path"} for f in fields]}
+            )
+            for _ in range(goals)
+        ],
+        n,
+    )
+
+    out = [GoalCandidates.model_validate({**goal, "candidates": fields}) for _ in range(goals)]
+    results["serialize_per_item_per_s"] = _timed(lambda: [g.model_dump_json() for g in out], n)
+    results["serialize_list_per_s"] = _timed(lambda: dump_json(out), n)
+
+    spec_goals = [
+        {"goal_id": f"G{i}", "description": "d", "priority": "low", "target_nodes": ["N1"]} for i in range(goals * 10)
+    ]
+    results["mission_spec_goals_per_s"] = _timed(
+        lambda: MissionSpec(mission_title="t", mission_description="d", scientific_goals=spec_goals), len(spec_goals)
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--goals", type=int, default=200)
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.goals, args.vehicles)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, value in results.items():
+        print(f"{name:<30} {value:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
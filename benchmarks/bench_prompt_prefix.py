@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+Prompt prefix shared between two different missions, per task.
+
+Every crew is kicked off twice with different inputs against a mocked LLM
+(litellm mock_response, no backend needed) and the first request of each
+task is captured. The shared prefix of the two requests is what a backend
+prefix cache (Ollama slot reuse, vLLM prefix caching, provider prompt caches)
+can serve from memory on the next mission; the rest is prompt processing.
+Run from the repository root:
+
+    python benchmarks/bench_prompt_prefix.py [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ["MARS_LLM_WARMUP"] = "0"
+# One model for every agent: tier escalations would re-run tasks
+os.environ["LLM_SMALL_MODEL"] = os.getenv("LLM_MODEL", "llama3.1:70b")
+
+from crewai.utilities.events import crewai_event_bus  # noqa: E402
+from crewai.utilities.events.llm_events import LLMCallStartedEvent  # noqa: E402
+
+from mars_exploration.commons import llm  # noqa: E402
+from mars_exploration.models.drone_models import DroneSelectionPlan  # noqa: E402
+from mars_exploration.models.mission_spec import MissionSpec  # noqa: E402
+from mars_exploration.models.rover_models import RoverSelectionPlan  # noqa: E402
+from mars_exploration.paths import DRONES_FILE, INPUT_REPORT, ROVERS_FILE, default_map_path  # noqa: E402
+from mars_exploration.planning.fallback import classify_spec  # noqa: E402
+
+_MISSIONS = [
+    MissionSpec(
+        mission_title="Polar ice survey",
+        mission_description="Characterize subsurface ice near the north pole.",
+        scientific_goals=[
+            {"goal_id": "G1", "description": "Drill and sample ice", "target_nodes": ["N12"], "terrain": "icy", "priority": "high"},
+            {"goal_id": "G2", "description": "Aerial imaging of the ridge", "target_nodes": ["N40"], "priority": "medium"},
+        ],
+        constraints=["Rovers must recharge below 20% energy", "Drones return to base after 30 minutes"],
+        hazards=["Node N60: unstable ground"],
+    ),
+    MissionSpec(
+        mission_title="Crater rim reconnaissance",
+        mission_description="Map the rim of a young impact crater.",
+        scientific_goals=[
+            {"goal_id": "G1", "description": "Survey the crater rim", "target_nodes": ["N77", "N78"], "priority": "high"},
+            {"goal_id": "G2", "description": "Measure soil composition", "target_nodes": ["N31"], "terrain": "rocky", "priority": "low"},
+            {"goal_id": "G3", "description": "Photograph the ejecta field", "target_nodes": ["N90"], "priority": "medium"},
+        ],
+        hazards=["No agent may enter N5"],
+    ),
+]
+
+
+def _inputs(spec: MissionSpec, report: str) -> dict:
+    classification = classify_spec(spec)
+    return {
+        "mission_report": report,
+        "mission_summary": spec.model_dump_json(),
+        "rover_context": classification.rover_context().model_dump_json(),
+        "drone_context": classification.drone_context().model_dump_json(),
+        "rover_plan": RoverSelectionPlan().model_dump(),
+        "drone_plan": DroneSelectionPlan().model_dump(),
+    }
+
+
+def _crews(out_dir: str) -> list:
+    from mars_exploration.crews.classification_crew.classification_crew import ClassificationCrew
+    from mars_exploration.crews.drone_crew.drone_crew import DroneCrew
+    from mars_exploration.crews.integration_crew.integration_crew import IntegrationCrew
+    from mars_exploration.crews.mission_crew.mission_crew import MissionCrew
+    from mars_exploration.crews.rover_crew.rover_crew import RoverCrew
+
+    with open(ROVERS_FILE, encoding="utf-8") as f:
+        rovers = json.load(f)
+    with open(DRONES_FILE, encoding="utf-8") as f:
+        drones = json.load(f)
+    return [
+        lambda: MissionCrew(output_dir=out_dir),
+        lambda: ClassificationCrew(output_dir=out_dir),
+        lambda: RoverCrew(mapp=default_map_path(), rovers=rovers, output_dir=out_dir),
+        lambda: DroneCrew(mapp=default_map_path(), drones=drones, output_dir=out_dir),
+        lambda: IntegrationCrew(output_dir=out_dir),
+    ]
+
+
+def _first_requests(inputs: dict, out_dir: str) -> dict:
+    """task name -> serialized messages of its first LLM request."""
+    requests: dict = {}
+
+    with crewai_event_bus.scoped_handlers():
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def on_call(source, event):
+            if event.task_name and event.task_name not in requests:
+                messages = event.messages if isinstance(event.messages, list) else [{"content": event.messages}]
+                requests[event.task_name] = "".join(f"<{m.get('role')}>{m.get('content')}" for m in messages)
+
+        for make_crew in _crews(out_dir):
+            crew = make_crew().crew()
+            crew.verbose = False
+            try:
+                crew.kickoff(inputs=inputs)
+            except Exception:
+                # The mocked answer does not satisfy every task; only the first request matters
+                pass
+    return requests
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def run() -> dict:
+    for client in (llm.get_llm(llm.LARGE_TIER), llm.get_llm(llm.SMALL_TIER)):
+        client.additional_params["mock_response"] = "Thought: I now know the final answer\nFinal Answer: {}"
+    with open(INPUT_REPORT, encoding="utf-8") as f:
+        report = f.read()
+    reports = [report, report.replace("high", "medium", 1) + "\nAdditional note: schedule imaging at dawn.\n"]
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        first, second = (_first_requests(_inputs(spec, text), out_dir) for spec, text in zip(_MISSIONS, reports))
+
+    results = {}
+    for task in first:
+        if task not in second:
+            continue
+        shared = _common_prefix(first[task], second[task])
+        total = max(len(first[task]), len(second[task]))
+        results[task] = {"chars": total, "shared_prefix_chars": shared, "shared_fraction": shared / total if total else 0.0}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run()
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'task':<40} {'chars':>8} {'shared prefix':>14} {'shared':>8}")
+    for task, r in results.items():
+        print(f"{task:<40} {r['chars']:>8} {r['shared_prefix_chars']:>14} {r['shared_fraction']:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+"""
+Crew-free command line: deterministic map and planning commands.
+
+Nothing here imports crewai (or networkx, unless a graphml map has to be
+parsed), so these commands start in a fraction of the flow's import time:
+
+    mars candidates rover|drone [--mission ...]   NDJSON GoalCandidates, one goal per line
+    mars plan [--mission ...]                     rover and drone candidates as one JSON document
+    mars sweep rover|drone --param v1 v2 ...      feasibility cube over a parameter grid
+    mars schedule [--plan ...]                    conflict-free timed routes for a rover selection plan
+    mars compile-map | tile-map | build-ch        map preprocessing
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from mars_exploration.paths import (
+    DRONES_FILE,
+    MARS_MAP_PATH,
+    MARS_TILES_DIR,
+    MISSION_SUMMARY_JSON,
+    ROVER_PLAN_JSON,
+    ROVERS_FILE,
+    default_map_path,
+)
+
+
+def _load_goals(mission: str) -> list:
+    return json.loads(Path(mission).read_text(encoding="utf-8")).get("scientific_goals", [])
+
+
+def _fleet(vehicle: str, fleet_file=None):
+    from mars_exploration.planning.fleet import FleetTable
+
+    path = fleet_file or (ROVERS_FILE if vehicle == "rover" else DRONES_FILE)
+    return FleetTable(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def _iter_candidates(vehicle: str, args):
+    from mars_exploration.planning import evaluate
+
+    fleet, goals = _fleet(vehicle, getattr(args, "fleet", None)), _load_goals(args.mission)
+    if vehicle == "drone":
+        return evaluate.iter_drone_candidates(
+            args.map, fleet, goals, args.prohibited, not args.no_terrain_weight, alternatives=args.alternatives
+        )
+    return evaluate.iter_rover_candidates(
+        args.map, fleet, goals, args.prohibited, not args.no_terrain_weight,
+        alternatives=args.alternatives, charging_nodes=args.charging,
+    )
+
+
+def _add_mission_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--mission", default=MISSION_SUMMARY_JSON, help="mission crew output with scientific_goals")
+    parser.add_argument("--map", default=default_map_path())
+    parser.add_argument("--prohibited", nargs="*", default=[], help="prohibited node ids")
+    parser.add_argument("--no-terrain-weight", action="store_true")
+
+
+def _add_routing_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--alternatives", type=int, default=None, metavar="K",
+        help="alternative routes per candidate for hazard failover (default: $MARS_ROUTE_ALTERNATIVES or 0)",
+    )
+    parser.add_argument(
+        "--charging", nargs="*", default=[], metavar="NODE",
+        help="rover charging nodes, added to the map's `charging` attribute and $MARS_CHARGING_NODES",
+    )
+
+
+def _write_stream(items, output: str) -> None:
+    from mars_exploration.planning.stream import write_ndjson
+
+    try:
+        write_ndjson(items, output)
+    except BrokenPipeError:
+        # reader closed the pipe early (e.g. `| head`)
+        sys.stderr.close()
+
+
+def _candidates(args) -> None:
+    _write_stream(_iter_candidates(args.vehicle, args), args.output)
+
+
+def _plan(args) -> None:
+    plan = {
+        "map": args.map,
+        "rover": [g.model_dump(mode="json") for g in _iter_candidates("rover", args)],
+        "drone": [g.model_dump(mode="json") for g in _iter_candidates("drone", args)],
+    }
+    text = json.dumps(plan, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text, encoding="utf-8")
+
+
+def _sweep(args) -> None:
+    from mars_exploration.planning import evaluate
+
+    fleet = _fleet(args.vehicle, args.fleet)
+    goals = _load_goals(args.mission)
+    use_terrain_weight = not args.no_terrain_weight
+    if args.vehicle == "rover":
+        cube = evaluate.sweep_rovers(
+            args.map, fleet, goals, args.prohibited, use_terrain_weight,
+            args.energy_cost or (0.2,), args.energy_threshold or (5.0,),
+            alternatives=args.alternatives, charging_nodes=args.charging,
+        )
+    else:
+        cube = evaluate.sweep_drones(
+            args.map, fleet, goals, args.prohibited, use_terrain_weight,
+            args.flight_time_threshold or (240,), args.time_cost or (1.0,), alternatives=args.alternatives,
+        )
+    print(json.dumps(cube.to_dict()))
+
+
+def _schedule(args) -> None:
+    from mars_exploration.planning.mapf import schedule_plan_file
+
+    schedule = schedule_plan_file(
+        args.plan, args.map, args.prohibited,
+        use_terrain_weight=not args.no_terrain_weight, tick=args.tick, detour=args.detour,
+    )
+    text = schedule.model_dump_json(indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text, encoding="utf-8")
+
+
+def compile_map():
+    """Compile a graphml terrain map into the binary .marsmap format used by the path tools."""
+    from mars_exploration.routing import compiled_map
+
+    parser = argparse.ArgumentParser(prog="compile_map", description=compile_map.__doc__)
+    parser.add_argument("graphml", nargs="?", default=MARS_MAP_PATH, help="graphml source map")
+    parser.add_argument("-o", "--output", default=None, help="output file (default: <graphml>.marsmap)")
+    args = parser.parse_args()
+
+    out_path = compiled_map.compile_map(args.graphml, args.output)
+    print(f"Compiled {args.graphml} -> {out_path}")
+
+
+def tile_map():
+    """Partition a graphml terrain map into lazily loaded tiles with a boundary overlay."""
+    from mars_exploration.routing import tiles
+
+    parser = argparse.ArgumentParser(prog="tile_map", description=tile_map.__doc__)
+    parser.add_argument("graphml", nargs="?", default=MARS_MAP_PATH, help="graphml source map")
+    parser.add_argument("-o", "--output", default=MARS_TILES_DIR, help="output directory")
+    parser.add_argument("--tile-size", type=int, default=tiles.DEFAULT_TILE_SIZE, help="max nodes per tile")
+    args = parser.parse_args()
+
+    out_dir = tiles.build_tiled_map(args.graphml, args.output, tile_size=args.tile_size)
+    print(f"Tiled {args.graphml} -> {out_dir}")
+
+
+def build_ch():
+    """Build the contraction hierarchy route index (rover, drone and hop cost models) for a map."""
+    from mars_exploration.routing import ch
+
+    parser = argparse.ArgumentParser(prog="build_ch", description=build_ch.__doc__)
+    parser.add_argument("graphml", nargs="?", default=MARS_MAP_PATH, help="graphml source or compiled map")
+    args = parser.parse_args()
+
+    out_path = ch.build_ch_index(args.graphml)
+    print(f"Indexed {args.graphml} -> {out_path}")
+
+
+def stream_candidates():
+    """Stream rover or drone GoalCandidates for the mission goals as NDJSON, one goal per line."""
+    parser = argparse.ArgumentParser(prog="stream_candidates", description=stream_candidates.__doc__)
+    parser.add_argument("vehicle", choices=["rover", "drone"])
+    _add_mission_args(parser)
+    _add_routing_args(parser)
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    _candidates(parser.parse_args())
+
+
+# Map preprocessing subcommands reuse the standalone entry points above
+_MAP_COMMANDS = {"compile-map": compile_map, "tile-map": tile_map, "build-ch": build_ch}
+
+
+def main():
+    """Crew-free mission planning commands (no LLM calls, no crewai import)."""
+    if len(sys.argv) > 1 and sys.argv[1] in _MAP_COMMANDS:
+        command = sys.argv.pop(1)
+        sys.argv[0] = f"mars {command}"
+        _MAP_COMMANDS[command]()
+        return
+
+    parser = argparse.ArgumentParser(prog="mars", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("candidates", help="stream GoalCandidates for one vehicle type as NDJSON")
+    p.add_argument("vehicle", choices=["rover", "drone"])
+    _add_mission_args(p)
+    p.add_argument("--fleet", default=None, help="fleet JSON (default: input rovers.json / drones.json)")
+    _add_routing_args(p)
+    p.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    p.set_defaults(func=_candidates)
+
+    p = sub.add_parser("plan", help="rover and drone candidates for a mission as one JSON document")
+    _add_mission_args(p)
+    _add_routing_args(p)
+    p.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    p.set_defaults(func=_plan)
+
+    p = sub.add_parser("sweep", help="feasibility cube over a grid of tool parameters")
+    p.add_argument("vehicle", choices=["rover", "drone"])
+    _add_mission_args(p)
+    p.add_argument("--fleet", default=None, help="fleet JSON (default: input rovers.json / drones.json)")
+    p.add_argument("--energy-cost", type=float, nargs="+", help="rover grid axis")
+    p.add_argument("--energy-threshold", type=float, nargs="+", help="rover grid axis")
+    p.add_argument("--flight-time-threshold", type=float, nargs="+", help="drone grid axis")
+    p.add_argument("--time-cost", type=float, nargs="+", help="drone grid axis")
+    _add_routing_args(p)
+    p.set_defaults(func=_sweep)
+
+    p = sub.add_parser("schedule", help="conflict-free timed routes for the rovers of a selection plan")
+    p.add_argument("--plan", default=ROVER_PLAN_JSON, help="rover crew output (RoverSelectionPlan)")
+    p.add_argument("--map", default=default_map_path())
+    p.add_argument("--prohibited", nargs="*", default=[], help="prohibited node ids")
+    p.add_argument("--no-terrain-weight", action="store_true")
+    p.add_argument("--tick", type=float, default=None, help="time resolution (default: $MARS_MAPF_TICK or 1)")
+    p.add_argument("--detour", type=float, default=None, help="allowed extra distance as a fraction (default: $MARS_MAPF_DETOUR or 0)")
+    p.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    p.set_defaults(func=_schedule)
+
+    for name, func in _MAP_COMMANDS.items():
+        sub.add_parser(name, help=func.__doc__, add_help=False)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, TypeVar
+
+from mars_exploration.commons import metrics
+
+
+# Per-stage time budgets for MarsMissionFlow steps, in seconds:
+#
+#   MARS_STAGE_DEADLINES="default=600,process_mission=180,integrate_mission=240"
+#
+# A step without an entry (and no default) runs unbounded. When a budget runs
+# out the step's LLM work is abandoned (its thread cannot be killed and keeps
+# running in the background, but its result is discarded) and the step falls
+# back to a deterministic implementation when it has one.
+DEADLINES_ENV = "MARS_STAGE_DEADLINES"
+
+STAGE_TIMEOUTS = metrics.counter("mars_stage_timeouts_total", "Flow steps that exceeded their deadline.", ("step",))
+STAGE_FALLBACKS = metrics.counter(
+    "mars_stage_fallbacks_total", "Flow steps completed by their deterministic fallback.", ("step",)
+)
+
+T = TypeVar("T")
+
+
+class StageTimeout(TimeoutError):
+    """A flow step did not finish within its deadline."""
+
+    def __init__(self, step: str, seconds: float):
+        super().__init__(f"{step} exceeded its {seconds:g}s deadline")
+        self.step = step
+        self.seconds = seconds
+
+
+def parse_deadlines(value: Optional[str]) -> Dict[str, float]:
+    """'step=seconds,...' -> {step: seconds}; malformed entries are rejected."""
+    out: Dict[str, float] = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        step, sep, seconds = item.partition("=")
+        if not sep:
+            raise ValueError(f"{DEADLINES_ENV}: expected step=seconds, got {item!r}")
+        out[step.strip()] = float(seconds)
+    return out
+
+
+def stage_deadline(step: str) -> Optional[float]:
+    """Deadline in seconds for step (its own entry, else default), None when unbounded."""
+    deadlines = parse_deadlines(os.getenv(DEADLINES_ENV))
+    seconds = deadlines.get(step, deadlines.get("default"))
+    return seconds if seconds and seconds > 0 else None
+
+
+def in_thread(fn: Callable[[], T], name: str) -> "Future[T]":
+    """fn() in a daemon thread with the caller's context variables (trace parent, metrics labels)."""
+    future: Future = Future()
+    ctx = contextvars.copy_context()
+
+    def run():
+        try:
+            future.set_result(ctx.run(fn))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
+def run_with_deadline(fn: Callable[[], T], seconds: Optional[float], step: str) -> T:
+    """fn() if it returns within seconds, else StageTimeout. Runs inline when seconds is None."""
+    if seconds is None:
+        return fn()
+
+    future = in_thread(fn, f"stage-{step}")
+    try:
+        return future.result(timeout=seconds)
+    except TimeoutError:
+        if future.done():
+            raise
+        STAGE_TIMEOUTS.inc(step=step)
+        raise StageTimeout(step, seconds) from None
+
+
+async def run_with_deadline_async(fn: Callable[[], T], seconds: Optional[float], step: str) -> T:
+    """
+    Awaitable run_with_deadline(): fn() always runs in its own thread, so the
+    event loop keeps driving the other flow steps meanwhile.
+    """
+    future = asyncio.wrap_future(in_thread(fn, f"stage-{step}"))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), seconds)
+    except TimeoutError:
+        if future.done():
+            raise
+        # The abandoned result (or error) is dropped when it arrives
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        STAGE_TIMEOUTS.inc(step=step)
+        raise StageTimeout(step, seconds) from None
@@ -1,20 +1,475 @@
+import contextvars
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Optional, Tuple, Type
+
+import litellm
 from crewai import LLM
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+from litellm.integrations.custom_logger import CustomLogger
+from litellm.utils import supports_response_schema
+from pydantic import BaseModel
+
+from mars_exploration.commons import metrics, tracing
+
+if TYPE_CHECKING:
+    from crewai import Agent
+    from crewai.tasks.task_output import TaskOutput
+
+_clients: Dict[Tuple[str, str, str], LLM] = {}
+_clients_lock = threading.Lock()
+
+# Model tiers: "large" is LLM_MODEL, "small" is LLM_SMALL_MODEL (on
+# LLM_SMALL_BASE_URL when set). Without LLM_SMALL_MODEL the small tier is the
+# large model, so an install configured with LLM_MODEL alone runs as before. Agents pick a tier or a model with `llm_tier` /
+# `llm_model` in their agents.yaml entry; MARS_AGENT_MODELS overrides either per
+# agent ("rover_assignment_selector=large,drone_candidates_analyst=qwen2.5:7b").
+# Every distinct model shares one client.
+LARGE_TIER = "large"
+SMALL_TIER = "small"
+SMALL_MODEL_ENV = "LLM_SMALL_MODEL"
+SMALL_URL_ENV = "LLM_SMALL_BASE_URL"
+AGENT_MODELS_ENV = "MARS_AGENT_MODELS"
+
+# Backend-side prompt reuse. Ollama unloads an idle model after 5 minutes unless
+# each request carries keep_alive (through extra_body for LLM_PROVIDER=ollama,
+# whose unknown params litellm moves into "options"). With MARS_LLM_WARMUP=1,
+# warm_up() loads every tier's model ahead of its first task. Time to first
+# token is only observable on streamed calls.
+KEEP_ALIVE_ENV = "MARS_LLM_KEEP_ALIVE"
+WARMUP_ENV = "MARS_LLM_WARMUP"
+STREAM_ENV = "MARS_LLM_STREAM"
+
+# Set to 1/true to constrain tool-free agents' answers to their task's
+# output_pydantic JSON schema at decode time (response_format, or Ollama's
+# `format`). Off by default: repair in structured_output handles the rest.
+SCHEMA_ENV = "MARS_LLM_SCHEMA"
+
+# Hedged requests: when a call to the primary backend has not answered within
+# the HEDGE_PERCENTILE_ENV latency percentile of recent calls (HEDGE_AFTER_ENV
+# seconds until HEDGE_MIN_SAMPLES calls were seen), the same request is sent to
+# LLM_HEDGE_BASE_URL (optionally LLM_HEDGE_MODEL) and the first answer wins.
+# The slower call is abandoned, not cancelled.
+HEDGE_URL_ENV = "LLM_HEDGE_BASE_URL"
+HEDGE_MODEL_ENV = "LLM_HEDGE_MODEL"
+HEDGE_PERCENTILE_ENV = "MARS_LLM_HEDGE_PERCENTILE"
+HEDGE_AFTER_ENV = "MARS_LLM_HEDGE_AFTER"
+HEDGE_MIN_SAMPLES = 20
+_LATENCY_WINDOW = 200
+
+LLM_SECONDS = metrics.histogram("mars_llm_call_seconds", "LLM call latency.", ("model",))
+LLM_TOKENS = metrics.counter("mars_llm_tokens_total", "LLM tokens by kind (prompt/completion).", ("model", "kind"))
+LLM_TOKENS_PER_SECOND = metrics.histogram(
+    "mars_llm_completion_tokens_per_second",
+    "Completion tokens per second of wall-clock call time.",
+    ("model",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+LLM_ERRORS = metrics.counter("mars_llm_errors_total", "LLM calls that raised.", ("model",))
+LLM_RETRIES = metrics.counter("mars_llm_retries_total", "LLM calls re-issued from inside another call.", ("model",))
+LLM_HEDGES = metrics.counter(
+    "mars_llm_hedges_total", "Hedged LLM requests by the backend that answered first.", ("model", "winner")
+)
+LLM_TTFT = metrics.histogram(
+    "mars_llm_time_to_first_token_seconds", "Time to the first streamed token (MARS_LLM_STREAM=1).", ("model", "task")
+)
+LLM_PROMPT_CACHE = metrics.counter(
+    "mars_llm_prompt_cache_tokens_total",
+    "Prompt tokens per task by kind (prompt / cached, when the backend reports prefix-cache hits).",
+    ("task", "kind"),
+)
+LLM_ESCALATIONS = metrics.counter(
+    "mars_llm_escalations_total", "Tasks re-run on the large model after a smaller model's output failed validation.", ("task", "model")
+)
+
+
+class UsageRecorder(CustomLogger):
+    """
+    Per-call LLM callback that hands token usage to on_usage.
+
+    crewAI passes usage to every callback given to LLM.call() through
+    log_success_event(response_obj={"usage": ...}); litellm's own
+    invocations (response_obj is a ModelResponse) are ignored.
+    """
+
+    def __init__(self, on_usage: Callable[[Any], None]):
+        super().__init__()
+        self.on_usage = on_usage
+
+    def log_success_event(self, kwargs: Dict[str, Any], response_obj: Any, start_time: Any, end_time: Any) -> None:
+        if not isinstance(response_obj, dict):
+            return
+        usage = response_obj.get("usage")
+        if usage:
+            self.on_usage(usage)
+
+
+def _spawn(fn: Callable[..., Any], *args: Any, name: str = "llm-hedge") -> Future:
+    """Run fn in a daemon thread (with the caller's contextvars); an abandoned call never blocks exit."""
+    future: Future = Future()
+    ctx = contextvars.copy_context()
+
+    def run():
+        try:
+            future.set_result(ctx.run(fn, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
+class _LatencyWindow:
+    """Recent call latencies of one model, for the hedge delay."""
+
+    def __init__(self, size: int = _LATENCY_WINDOW):
+        self._values: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._values) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_latencies: Dict[str, _LatencyWindow] = {}
+_latencies_lock = threading.Lock()
+
+
+def _latency_window(model: str) -> _LatencyWindow:
+    with _latencies_lock:
+        return _latencies.setdefault(model, _LatencyWindow())
+
+
+class InstrumentedLLM(LLM):
+    """
+    crewai LLM that records each call when tracing and/or metrics are on:
+    an "llm" span (latency, model, task, agent, token usage) and the
+    mars_llm_* metrics. A plain LLM otherwise. Calls are hedged to a second
+    backend when LLM_HEDGE_BASE_URL is set.
+    """
+
+    _depth = threading.local()
+    _hedge_worker = threading.local()
+    _first_chunk = threading.local()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None):
+        args = (messages, tools, callbacks, available_functions, from_task, from_agent)
+        hedge = self._hedge_llm()
+        # Nested calls (crewAI retries) stay on the backend already chosen
+        if hedge is None or getattr(self._hedge_worker, "active", False):
+            return self._timed_call(*args)
+        return self._hedged_call(hedge, args)
+
+    def _hedge_llm(self) -> Optional["InstrumentedLLM"]:
+        if getattr(self, "_is_hedge", False):
+            return None
+        url = os.getenv(HEDGE_URL_ENV)
+        if not url:
+            return None
+        hedge = getattr(self, "_hedge", None)
+        if hedge is None or hedge.base_url != url:
+            # LLM_HEDGE_MODEL stands in for the large tier only
+            model = os.getenv(HEDGE_MODEL_ENV) if self.model == _llm_settings()["model"] else None
+            if model:
+                model = f"{_llm_settings()['provider']}/{model}"
+            hedge = InstrumentedLLM(model=model or self.model, base_url=url, stream=self.stream, **self.additional_params)
+            hedge._is_hedge = True
+            self._hedge = hedge
+        return hedge
+
+    def _hedge_delay(self) -> float:
+        q = float(os.getenv(HEDGE_PERCENTILE_ENV, "0.95"))
+        observed = _latency_window(self.model).percentile(q)
+        return observed if observed is not None else float(os.getenv(HEDGE_AFTER_ENV, "30"))
+
+    def _worker(self, *args):
+        self._hedge_worker.active = True
+        return self._timed_call(*args)
+
+    def _hedged_call(self, hedge: "InstrumentedLLM", args: tuple):
+        primary = _spawn(self._worker, *args)
+        done, _ = wait([primary], timeout=self._hedge_delay())
+        if done:
+            return primary.result()
+
+        secondary = _spawn(hedge._worker, *args)
+        pending = {primary, secondary}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    LLM_HEDGES.inc(model=self.model, winner="primary" if future is primary else "hedge")
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def _timed_call(self, *args):
+        start = time.perf_counter()
+        result = self._instrumented_call(*args)
+        _latency_window(self.model).add(time.perf_counter() - start)
+        return result
+
+    def _instrumented_call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None):
+        if not (tracing.enabled() or metrics.enabled()):
+            return super().call(messages, tools, callbacks, available_functions, from_task, from_agent)
+
+        model = self.model
+        task = getattr(from_task, "name", None) or "-"
+        depth = getattr(self._depth, "value", 0)
+        if depth:
+            # crewAI re-enters call() when it retries (e.g. without 'stop')
+            LLM_RETRIES.inc(model=model)
+        usage_seen = []
+
+        with tracing.span(
+            "llm.call",
+            "llm",
+            model=model,
+            task=getattr(from_task, "name", None),
+            agent=getattr(from_agent, "role", None),
+        ) as span:
+
+            def on_usage(usage):
+                prompt = getattr(usage, "prompt_tokens", None)
+                completion = getattr(usage, "completion_tokens", None)
+                cached = _cached_tokens(usage)
+                span.set(
+                    prompt_tokens=prompt,
+                    cached_tokens=cached,
+                    completion_tokens=completion,
+                    total_tokens=getattr(usage, "total_tokens", None),
+                )
+                LLM_TOKENS.inc(prompt or 0, model=model, kind="prompt")
+                LLM_TOKENS.inc(completion or 0, model=model, kind="completion")
+                LLM_PROMPT_CACHE.inc(prompt or 0, task=task, kind="prompt")
+                LLM_PROMPT_CACHE.inc(cached, task=task, kind="cached")
+                usage_seen.append(completion or 0)
+
+            callbacks = list(callbacks or []) + [UsageRecorder(on_usage)]
+            self._depth.value = depth + 1
+            outer_chunk = getattr(self._first_chunk, "value", None)
+            self._first_chunk.value = None
+            start = time.perf_counter()
+            try:
+                return super().call(messages, tools, callbacks, available_functions, from_task, from_agent)
+            except Exception:
+                LLM_ERRORS.inc(model=model)
+                raise
+            finally:
+                self._depth.value = depth
+                elapsed = time.perf_counter() - start
+                first_chunk, self._first_chunk.value = self._first_chunk.value, outer_chunk
+                if first_chunk is not None:
+                    span.set(ttft_seconds=round(first_chunk - start, 6))
+                    LLM_TTFT.observe(first_chunk - start, model=model, task=task)
+                LLM_SECONDS.observe(elapsed, model=model)
+                if usage_seen and elapsed > 0:
+                    LLM_TOKENS_PER_SECOND.observe(usage_seen[-1] / elapsed, model=model)
+
+
+def _cached_tokens(usage: Any) -> int:
+    """Prompt tokens served from the backend's prefix cache, 0 when not reported."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", None) or 0
+
+
+@crewai_event_bus.on(LLMStreamChunkEvent)
+def _on_stream_chunk(source: Any, event: LLMStreamChunkEvent) -> None:
+    # Emitted synchronously from the calling thread by crewAI's streaming loop
+    if isinstance(source, InstrumentedLLM) and getattr(InstrumentedLLM._first_chunk, "value", 0) is None:
+        InstrumentedLLM._first_chunk.value = time.perf_counter()
+
+
+def _llm_settings() -> Dict[str, str]:
+    provider = os.getenv("LLM_PROVIDER", "ollama")
+    model = os.getenv("LLM_MODEL", "llama3.1:70b")
+    base_url = os.getenv("LLM_BASE_URL", "http://localhost:11434")
+    return {"provider": provider, "model": f"{provider}/{model}", "base_url": base_url}
+
+
+def _tier_settings(tier: str) -> Dict[str, str]:
+    settings = _llm_settings()
+    if tier == LARGE_TIER:
+        return settings
+    if tier != SMALL_TIER:
+        raise ValueError(f"unknown LLM tier {tier!r} (expected {SMALL_TIER!r} or {LARGE_TIER!r})")
+    model = os.getenv(SMALL_MODEL_ENV)
+    if not model:
+        return settings
+    base_url = os.getenv(SMALL_URL_ENV) or settings["base_url"]
+    return {"provider": settings["provider"], "model": f"{settings['provider']}/{model}", "base_url": base_url}
+
+
+def _agent_overrides() -> Dict[str, str]:
+    """MARS_AGENT_MODELS 'agent=tier|model,...' -> {agent: tier or model}."""
+    out: Dict[str, str] = {}
+    for item in os.getenv(AGENT_MODELS_ENV, "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        agent, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"{AGENT_MODELS_ENV}: expected agent=tier|model, got {item!r}")
+        out[agent.strip()] = value.strip()
+    return out
+
+
+def agent_settings(agent_name: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    Provider, model and base_url for one agent. In order of precedence: its
+    MARS_AGENT_MODELS entry (a tier or a model name), `llm_model` in its
+    agents.yaml entry, `llm_tier` there, else the large tier.
+    """
+    config = config or {}
+    value = _agent_overrides().get(agent_name) or config.get("llm_model") or config.get("llm_tier") or LARGE_TIER
+    if value in (SMALL_TIER, LARGE_TIER):
+        return _tier_settings(value)
+    settings = _llm_settings()
+    return {**settings, "model": f"{settings['provider']}/{value}"}
+
+
+def _client(settings: Dict[str, str], output_model: Optional[Type[BaseModel]] = None) -> LLM:
+    """Shared InstrumentedLLM per distinct (model, base_url[, output schema])."""
+    extra = _schema_params(settings["provider"], settings["model"], output_model) if output_model is not None else {}
+    key = (settings["model"], settings["base_url"], output_model.__name__ if extra else "")
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = InstrumentedLLM(
+                model=settings["model"],
+                base_url=settings["base_url"],
+                stream=_env_flag(STREAM_ENV),
+                **_keep_alive_params(settings["provider"]),
+                **extra,
+            )
+        return _clients[key]
+
+
+def _env_flag(name: str, default: str = "") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _keep_alive_params(provider: str) -> Dict[str, Any]:
+    keep_alive = os.getenv(KEEP_ALIVE_ENV, "30m").strip()
+    if not keep_alive:
+        return {}
+    if provider == "ollama_chat":
+        return {"keep_alive": keep_alive}
+    if provider == "ollama":
+        return {"extra_body": {"keep_alive": keep_alive}}
+    return {}
+
+
+@lru_cache(maxsize=None)
+def _schema_params(provider: str, model: str, output_model: Type[BaseModel]) -> Dict[str, Any]:
+    if supports_response_schema(model=model, custom_llm_provider=provider):
+        return {"response_format": output_model}
+    if provider in ("ollama", "ollama_chat"):
+        return {"format": output_model.model_json_schema()}
+    print(f"{SCHEMA_ENV}: {model} has no schema-constrained output, using plain decoding")
+    return {}
+
+
+def get_llm(tier: str = LARGE_TIER) -> LLM:
+    return _client(_tier_settings(tier))
+
+
+def schema_constrained() -> bool:
+    return _env_flag(SCHEMA_ENV)
+
+
+def warm_up() -> None:
+    """
+    Load the model of every client created so far (both tiers at least) with a
+    one-token completion, so that no task pays for loading a model. Failures
+    are reported and otherwise ignored.
+    """
+    get_llm(LARGE_TIER)
+    get_llm(SMALL_TIER)
+    with _clients_lock:
+        backends = {(llm.model, llm.base_url): llm for llm in _clients.values()}
+    for (model, base_url), llm in backends.items():
+        start = time.perf_counter()
+        try:
+            litellm.completion(
+                model=model,
+                api_base=base_url,
+                messages=[{"role": "user", "content": "ok"}],
+                max_tokens=1,
+                **{k: v for k, v in llm.additional_params.items() if k in ("keep_alive", "extra_body")},
+            )
+        except Exception as e:
+            print(f"LLM warm-up of {model} at {base_url} failed: {e}")
+            continue
+        print(f"LLM warm-up of {model}: {time.perf_counter() - start:.1f}s")
+
+
+def warm_up_in_background() -> Optional[Future]:
+    """warm_up() in a daemon thread when MARS_LLM_WARMUP=1 (off by default)."""
+    if not _env_flag(WARMUP_ENV):
+        return None
+    return _spawn(warm_up, name="llm-warmup")
+
+
+def structured_llm(output_model: Type[BaseModel], settings: Optional[Dict[str, str]] = None) -> LLM:
+    """
+    LLM for a tool-free agent whose task returns output_model.
+
+    With MARS_LLM_SCHEMA on, the backend is asked to decode only JSON that
+    matches output_model's schema: response_format where litellm supports it,
+    Ollama's native `format` otherwise. Agents with tools must keep get_llm(),
+    since their ReAct steps are not JSON. Falls back to plain decoding when the
+    option is off or the provider has no schema support.
+    """
+    settings = settings or _llm_settings()
+    return _client(settings, output_model if schema_constrained() else None)
+
+
+def agent_llm(agent_name: str, config: Optional[Dict[str, Any]] = None, output_model: Optional[Type[BaseModel]] = None) -> LLM:
+    """
+    Shared client for agent_name's model (see agent_settings). Pass output_model
+    for tool-free agents so that MARS_LLM_SCHEMA applies (see structured_llm).
+    """
+    settings = agent_settings(agent_name, config)
+    return structured_llm(output_model, settings) if output_model is not None else _client(settings)
 
-_llm_instance: LLM | None = None
 
-def get_llm() -> LLM:
-    global _llm_instance
+def below_large_tier(llm: Any) -> bool:
+    """True for a client whose model is not the large tier's, i.e. one a task can escalate from."""
+    return getattr(llm, "model", None) != _llm_settings()["model"]
 
-    if _llm_instance is None:
-        provider = os.getenv("LLM_PROVIDER", "ollama")
-        model = os.getenv("LLM_MODEL", "llama3.1:70b")
-        base_url = os.getenv("LLM_BASE_URL", "http://localhost:11434")
 
-        _llm_instance = LLM(
-            model=f"{provider}/{model}",
-            base_url=base_url
-        )
+def escalation_guardrail(
+    agent: "Agent", task_name: str, output_model: Optional[Type[BaseModel]] = None
+) -> Callable[["TaskOutput"], Tuple[bool, Any]]:
+    """
+    Task guardrail for agents on a smaller model: when the task's output did not
+    validate against its output_pydantic (even after repair), the agent is moved
+    to the large tier and the task runs again. Output from the large model is
+    passed through unchanged, as without tiering.
+    """
 
-    return _llm_instance
+    def gate(output: "TaskOutput") -> Tuple[bool, Any]:
+        if output.pydantic is not None or not below_large_tier(agent.llm):
+            return True, output
+        large = structured_llm(output_model) if output_model is not None else get_llm(LARGE_TIER)
+        LLM_ESCALATIONS.inc(task=task_name, model=agent.llm.model)
+        print(f"{task_name}: output of {agent.llm.model} did not validate, escalating to {large.model}")
+        agent.llm = large
+        return False, f"The answer did not match the required output format; it is retried with {large.model}."
 
+    return gate
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Metrics are collected only when one of these is set:
+#   MARS_METRICS=1               collect (read with render() / dump())
+#   MARS_METRICS_PORT=<port>     serve Prometheus text on http://127.0.0.1:<port>/metrics
+#   MARS_METRICS_FILE=<path>     rewrite <path> every MARS_METRICS_INTERVAL seconds (default 15)
+METRICS_ENV = "MARS_METRICS"
+METRICS_PORT_ENV = "MARS_METRICS_PORT"
+METRICS_FILE_ENV = "MARS_METRICS_FILE"
+METRICS_INTERVAL_ENV = "MARS_METRICS_INTERVAL"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond route batches up to multi-minute crew steps.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: Sequence[str]):
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """Last value (or running level) per label set."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def time(self, **labels: str):
+        """Context manager observing the elapsed seconds of the block."""
+        if not self._registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def count(self, **labels: str) -> float:
+        row = self._values.get(self._key(labels))
+        return row[-1] if row else 0.0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format_value(bound)))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(row[-2])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_format_value(row[-1])}")
+        return lines
+
+
+class Registry:
+    """
+    Named metrics of one process.
+
+    counter()/gauge()/histogram() return the existing metric when the name is
+    already registered, so modules can declare the metrics they update at
+    import time. While disabled every update is a single attribute check.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help, labelnames, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> str:
+        """Write render() to path atomically (readers never see a partial file)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+        return path
+
+
+REGISTRY = Registry(
+    enabled=any(os.getenv(name) for name in (METRICS_ENV, METRICS_PORT_ENV, METRICS_FILE_ENV))
+)
+
+
+def enabled() -> bool:
+    return REGISTRY.enabled
+
+
+def enable() -> Registry:
+    REGISTRY.enabled = True
+    return REGISTRY
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.counter(name, help, labelnames)
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.gauge(name, help, labelnames)
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, help, labelnames, buckets)
+
+
+def timed(metric: Histogram, **labels: str) -> Callable:
+    """Decorator observing the call duration of a function in a histogram."""
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not REGISTRY.enabled:
+                    return await func(*args, **kwargs)
+                with _Timer(metric, labels):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            with _Timer(metric, labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# -- exporters -------------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve the registry on http://host:port/metrics from a daemon thread."""
+    handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="mars-metrics-http", daemon=True).start()
+    return server
+
+
+class FileDumper:
+    """Rewrites a Prometheus text file every interval seconds until stop()."""
+
+    def __init__(self, path: str, interval: float, registry: Registry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="mars-metrics-dump", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.registry.dump(self.path)
+
+    def stop(self) -> None:
+        """Stop the thread and write a final snapshot."""
+        self._stop.set()
+        self._thread.join()
+        self.registry.dump(self.path)
+
+
+_exporters: List[object] = []
+
+
+def start_exporters() -> None:
+    """Start the HTTP endpoint and/or file dump configured through the environment."""
+    if _exporters:
+        return
+    port = os.getenv(METRICS_PORT_ENV)
+    if port:
+        _exporters.append(serve(int(port)))
+    path = os.getenv(METRICS_FILE_ENV)
+    if path:
+        _exporters.append(FileDumper(path, float(os.getenv(METRICS_INTERVAL_ENV, "15"))))
+
+
+def stop_exporters() -> None:
+    """Write the final file snapshot and shut the HTTP endpoint down."""
+    while _exporters:
+        exporter = _exporters.pop()
+        if isinstance(exporter, FileDumper):
+            exporter.stop()
+        else:
+            exporter.shutdown()
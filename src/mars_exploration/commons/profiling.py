@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+# Profiling is off unless MARS_PROFILE (or `kickoff --profile`) selects modes:
+#   sample    wall-clock stack sampler -> collapsed stacks + speedscope JSON
+#   cprofile  deterministic cProfile of each outermost section -> .pstats
+# "1" means "sample"; modes can be combined ("sample,cprofile").
+# MARS_PROFILE_INTERVAL is the sampling period in ms, MARS_PROFILE_TOP the
+# number of functions in the end-of-run summary.
+PROFILE_ENV = "MARS_PROFILE"
+PROFILE_INTERVAL_ENV = "MARS_PROFILE_INTERVAL"
+PROFILE_TOP_ENV = "MARS_PROFILE_TOP"
+MODES = ("sample", "cprofile")
+
+# (function, file, first line); sections use ("[name]", "", 0)
+Frame = Tuple[str, str, int]
+
+
+def parse_modes(value: Optional[str]) -> Set[str]:
+    modes: Set[str] = set()
+    for part in (value or "").replace(" ", "").lower().split(","):
+        if not part or part in ("0", "false", "no", "off"):
+            continue
+        if part in ("1", "true", "yes", "on"):
+            part = "sample"
+        if part not in MODES:
+            raise ValueError(f"unknown profile mode {part!r} (expected {MODES})")
+        modes.add(part)
+    return modes
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    if not filename:
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of threads that are inside a profiled section.
+
+    Every interval a daemon thread reads sys._current_frames(); each stack is
+    rooted at the open sections of its thread (e.g. [flow.plan_rover_operations]
+    -> [tool.rovers_path_tool] -> ...). Overhead is one stack walk per sampled
+    thread per interval, independent of how many calls the code makes.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.started = self.stopped = 0.0
+        self._sections: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enter(self, name: str) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            self._sections.setdefault(tid, []).append(name)
+
+    def exit(self) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            stack = self._sections.get(tid)
+            if stack:
+                stack.pop()
+                if not stack:
+                    del self._sections[tid]
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="mars-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.perf_counter()
+
+    def _loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = [(tid, tuple(names)) for tid, names in self._sections.items() if tid != own]
+            for tid, names in active:
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack: List[Frame] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[tuple((f"[{n}]", "", 0) for n in names) + tuple(stack)] += 1
+
+    # -- output ----------------------------------------------------------
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format (flamegraph.pl, speedscope, inferno)."""
+        lines = [
+            ";".join(_frame_label(f).replace(";", ":") for f in stack) + f" {count}"
+            for stack, count in self.samples.most_common()
+        ]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def speedscope(self, name: str) -> Dict:
+        """Speedscope file format: one sampled profile, weights in milliseconds."""
+        frames: List[Dict] = []
+        index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            ids = []
+            for f in stack:
+                i = index.get(f)
+                if i is None:
+                    i = index[f] = len(frames)
+                    frames.append({"name": f[0], "file": f[1], "line": f[2]} if f[1] else {"name": f[0]})
+                ids.append(i)
+            samples.append(ids)
+            weights.append(count * self.interval * 1000.0)
+        total = sum(weights)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": total,
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "mars_exploration",
+        }
+
+    def top(self, n: int) -> List[Tuple[Frame, int, int]]:
+        """(function, self samples, inclusive samples), hottest self time first."""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.samples.items():
+            frames = [f for f in stack if f[1]]
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for f in set(frames):
+                total_counts[f] += count
+        return [(f, c, total_counts[f]) for f, c in self_counts.most_common(n)]
+
+
+class DeterministicProfiler:
+    """cProfile of each outermost profiled section, merged into one pstats.Stats."""
+
+    def __init__(self):
+        self.stats: Optional[pstats.Stats] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enter(self, name: str) -> None:
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        if depth == 0:
+            self._local.profile = cProfile.Profile()
+            try:
+                self._local.profile.enable()
+            except ValueError:
+                # another profiler is active on this thread
+                self._local.profile = None
+
+    def exit(self) -> None:
+        self._local.depth -= 1
+        if self._local.depth or self._local.profile is None:
+            return
+        profile, self._local.profile = self._local.profile, None
+        profile.disable()
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile, stream=io.StringIO())
+            else:
+                self.stats.add(profile)
+
+    def top(self, n: int) -> List[Tuple[Frame, int, float, float]]:
+        """(function, calls, own seconds, cumulative seconds), hottest own time first."""
+        if self.stats is None:
+            return []
+        rows = [
+            ((func[2], func[0], func[1]), nc, tt, ct)
+            for func, (cc, nc, tt, ct, callers) in self.stats.stats.items()
+        ]
+        rows.sort(key=lambda r: r[2], reverse=True)
+        return rows[:n]
+
+
+class Profiler:
+    """The profilers of one run; sections are entered on every enabled profiler."""
+
+    def __init__(self, modes: Set[str], interval: float):
+        self.modes = modes
+        self.sampler = SamplingProfiler(interval) if "sample" in modes else None
+        self.cprofile = DeterministicProfiler() if "cprofile" in modes else None
+        self._parts = [p for p in (self.sampler, self.cprofile) if p is not None]
+
+    def enter(self, name: str) -> None:
+        for p in self._parts:
+            p.enter(name)
+
+    def exit(self) -> None:
+        for p in reversed(self._parts):
+            p.exit()
+
+    def write(self, out_dir: str, run_name: str) -> List[str]:
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        if self.sampler is not None:
+            path = os.path.join(out_dir, f"{run_name}.collapsed.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.sampler.collapsed())
+            written.append(path)
+            path = os.path.join(out_dir, f"{run_name}.speedscope.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.sampler.speedscope(run_name), f)
+            written.append(path)
+        if self.cprofile is not None and self.cprofile.stats is not None:
+            path = os.path.join(out_dir, f"{run_name}.pstats")
+            self.cprofile.stats.dump_stats(path)
+            written.append(path)
+        return written
+
+    def summary(self, n: int) -> str:
+        lines = []
+        if self.sampler is not None:
+            total = sum(self.sampler.samples.values())
+            lines.append(f"Top {n} functions by sampled self time ({total} samples, {self.sampler.interval * 1000:g} ms interval):")
+            lines.append(f"{'self%':>7} {'total%':>7}  function")
+            for frame, own, inclusive in self.sampler.top(n):
+                lines.append(f"{100.0 * own / total:6.1f}% {100.0 * inclusive / total:6.1f}%  {_frame_label(frame)}")
+        if self.cprofile is not None:
+            lines.append(f"Top {n} functions by own time (cProfile):")
+            lines.append(f"{'calls':>9} {'own s':>9} {'cum s':>9}  function")
+            for frame, calls, own, cumulative in self.cprofile.top(n):
+                lines.append(f"{calls:9d} {own:9.3f} {cumulative:9.3f}  {_frame_label(frame)}")
+        return "\n".join(lines)
+
+
+_profiler: Optional[Profiler] = None
+
+
+def active() -> bool:
+    return _profiler is not None
+
+
+def start(modes: Optional[str] = None) -> Optional[Profiler]:
+    """Start profiling for this run (modes default to MARS_PROFILE). No-op when none are selected."""
+    global _profiler
+    if _profiler is not None:
+        return _profiler
+    selected = parse_modes(modes if modes is not None else os.getenv(PROFILE_ENV))
+    if not selected:
+        return None
+    interval = float(os.getenv(PROFILE_INTERVAL_ENV, "5")) / 1000.0
+    _profiler = Profiler(selected, interval)
+    if _profiler.sampler is not None:
+        _profiler.sampler.start()
+    return _profiler
+
+
+def finish(out_dir: str, top: Optional[int] = None) -> List[str]:
+    """Stop profiling, write the per-run files to out_dir and print the top-N summary."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return []
+    if profiler.sampler is not None:
+        profiler.sampler.stop()
+    run_name = time.strftime("profile-%Y%m%d-%H%M%S")
+    written = profiler.write(out_dir, run_name)
+    print(profiler.summary(top or int(os.getenv(PROFILE_TOP_ENV, "20"))))
+    for path in written:
+        print(f"Profile written to {path}")
+    return written
+
+
+class _Section:
+    __slots__ = ("name", "profiler")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Section":
+        self.profiler = _profiler
+        if self.profiler is not None:
+            self.profiler.enter(self.name)
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        if self.profiler is not None:
+            self.profiler.exit()
+        return False
+
+
+def section(name: str) -> _Section:
+    """Context manager marking a profiled section (a flow step, a tool call)."""
+    return _Section(name)
+
+
+def profiled(name: str) -> Callable:
+    """Decorator form of section(); a plain call when no profiler is running."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            profiler.enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.exit()
+
+        return wrapper
+
+    return decorator
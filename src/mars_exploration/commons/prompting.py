@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from crewai import Task
+from crewai.utilities.string_utils import interpolate_only
+from pydantic import Field, PrivateAttr
+
+
+# Prompt layout for backend prefix caching (Ollama/llama.cpp slot reuse, vLLM
+# automatic prefix caching, provider prompt caches). crewAI sends the task as
+#
+#   description + expected output + output schema + context from earlier tasks
+#
+# so anything interpolated into the description makes every call after it a
+# cache miss. StablePrefixTask keeps the description static and sends the
+# per-mission inputs (its `data:` template in tasks.yaml) as the first part of
+# the context, after all of the static text.
+class StablePrefixTask(Task):
+    """Task whose per-mission inputs are sent after its static instructions and schema."""
+
+    data: Optional[str] = Field(
+        default=None,
+        description="Template for the task's variable inputs, interpolated like the description and sent as context.",
+    )
+    _original_data: Optional[str] = PrivateAttr(default=None)
+
+    def interpolate_inputs_and_add_conversation_history(self, inputs: Dict[str, Any]) -> None:
+        super().interpolate_inputs_and_add_conversation_history(inputs)
+        if self.data is None:
+            return
+        if self._original_data is None:
+            self._original_data = self.data
+        self.data = interpolate_only(input_string=self._original_data, inputs=inputs)
+
+    def _execute_core(self, agent, context: Optional[str], tools):
+        # Also runs for guardrail retries, whose context is only the validation error
+        if self.data:
+            context = f"{self.data.rstrip()}\n\n{context}" if context else self.data.rstrip()
+        return super()._execute_core(agent, context, tools)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import re
+import types
+from typing import Any, ClassVar, Dict, Literal, Optional, Type, Union, get_args, get_origin
+
+from crewai.utilities.converter import Converter, ConverterError
+from pydantic import BaseModel, ValidationError
+
+from mars_exploration.commons import metrics
+from mars_exploration.commons.llm import below_large_tier
+
+
+# Deterministic repair of task outputs before validation against output_pydantic.
+#
+# crewAI validates the agent's final answer with model_validate_json and, when
+# that fails, asks the LLM to convert its own answer again (Converter.to_pydantic,
+# up to max_attempts calls). Most failures are mechanical: fenced code, text
+# after the JSON, "High" for a Literal["high"], arrays sent as strings, keys the
+# model made up. RepairingConverter fixes those locally and only falls back to
+# the LLM when the repaired output still does not validate.
+OUTPUT_REPAIRS = metrics.counter(
+    "mars_structured_output_total",
+    "Structured task outputs that failed direct validation, by outcome (repaired locally / llm fallback / failed).",
+    ("task", "outcome"),
+)
+OUTPUT_RETRIES = metrics.counter(
+    "mars_structured_output_retries_total", "LLM re-conversion calls made for a task's structured output.", ("task",)
+)
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """
+    First complete JSON object or array in text, ignoring code fences and any
+    prose before or after it. None when there is none.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    decoder = json.JSONDecoder(strict=False)
+    for i, ch in enumerate(text):
+        if ch in "{[":
+            try:
+                value, _ = decoder.raw_decode(text, i)
+            except json.JSONDecodeError:
+                continue
+            return value
+    return None
+
+
+def _strip_optional(annotation: Any) -> Any:
+    origin = get_origin(annotation)
+    if origin is Union or origin is types.UnionType:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _coerce(value: Any, annotation: Any) -> Any:
+    annotation = _strip_optional(annotation)
+    origin = get_origin(annotation)
+
+    # Arrays/objects sent as JSON strings
+    if isinstance(value, str) and (origin in (list, dict) or _is_model(annotation)):
+        stripped = value.strip()
+        if stripped[:1] in "[{":
+            try:
+                value = json.loads(stripped, strict=False)
+            except json.JSONDecodeError:
+                return value
+
+    if _is_model(annotation):
+        return repair_fields(value, annotation) if isinstance(value, dict) else value
+    if origin is list:
+        (item,) = get_args(annotation) or (Any,)
+        if isinstance(value, list):
+            return [_coerce(v, item) for v in value]
+        if isinstance(value, str) and _strip_optional(item) is str:
+            # "N1, N2" or a single id where a list of ids was expected
+            return [v.strip() for v in value.split(",") if v.strip()]
+        return value
+    if origin is Literal and isinstance(value, str):
+        # "High" / " high " for Literal["high", ...]
+        by_folded = {str(a).lower(): a for a in get_args(annotation) if isinstance(a, str)}
+        return by_folded.get(value.strip().lower(), value)
+    return value
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def repair_fields(data: Dict[str, Any], model: Type[BaseModel]) -> Dict[str, Any]:
+    """data with unknown keys dropped (extra="forbid" models) and field values coerced to model's annotations."""
+    forbid = model.model_config.get("extra") == "forbid"
+    out: Dict[str, Any] = {}
+    for key, value in data.items():
+        field = model.model_fields.get(key)
+        if field is None:
+            if not forbid:
+                out[key] = value
+            continue
+        out[key] = _coerce(value, field.annotation)
+    return out
+
+
+def repair(text: str, model: Type[BaseModel]) -> Optional[BaseModel]:
+    """model parsed from an LLM answer after local repairs, or None if it still does not validate."""
+    data = extract_json(text)
+    if isinstance(data, list) and len(model.model_fields) == 1:
+        # bare array for a single-list wrapper model such as PossibleAssignments
+        data = {next(iter(model.model_fields)): data}
+    if not isinstance(data, dict):
+        return None
+    try:
+        return model.model_validate(repair_fields(data, model))
+    except ValidationError:
+        return None
+
+
+class RepairingConverter(Converter):
+    """
+    Converter that tries repair() before spending LLM calls on re-conversion.
+    On a model below the large tier, a conversion that still fails leaves the
+    raw output to the task guardrail instead of failing the task.
+    """
+
+    task_name: ClassVar[str] = "unknown"
+
+    def to_pydantic(self, current_attempt=1) -> BaseModel:
+        if current_attempt == 1:
+            repaired = repair(self.text, self.model)
+            if repaired is not None:
+                OUTPUT_REPAIRS.inc(task=self.task_name, outcome="repaired")
+                return repaired
+        OUTPUT_RETRIES.inc(task=self.task_name)
+        try:
+            result = super().to_pydantic(current_attempt)
+        except ConverterError as e:
+            if current_attempt != 1:
+                raise
+            OUTPUT_REPAIRS.inc(task=self.task_name, outcome="failed")
+            if below_large_tier(self.llm):
+                # Keep the raw answer; the task's escalation_guardrail re-runs it on the large model
+                return e
+            raise
+        if current_attempt == 1:
+            OUTPUT_REPAIRS.inc(task=self.task_name, outcome="llm")
+        return result
+
+    def to_json(self, current_attempt=1):
+        if current_attempt == 1:
+            repaired = repair(self.text, self.model)
+            if repaired is not None:
+                OUTPUT_REPAIRS.inc(task=self.task_name, outcome="repaired")
+                return repaired.model_dump()
+        OUTPUT_RETRIES.inc(task=self.task_name)
+        return super().to_json(current_attempt)
+
+
+_converters: Dict[str, Type[RepairingConverter]] = {}
+
+
+def repairing_converter(task_name: str) -> Type[RepairingConverter]:
+    """RepairingConverter subclass labelled with task_name, for Task(converter_cls=...)."""
+    cls = _converters.get(task_name)
+    if cls is None:
+        cls = type(f"RepairingConverter_{task_name}", (RepairingConverter,), {"task_name": task_name})
+        _converters[task_name] = cls
+    return cls
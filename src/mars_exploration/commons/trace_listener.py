@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from crewai.utilities.events import (
+    TaskCompletedEvent,
+    TaskFailedEvent,
+    TaskStartedEvent,
+    ToolUsageErrorEvent,
+    ToolUsageFinishedEvent,
+)
+from crewai.utilities.events.base_event_listener import BaseEventListener
+
+from mars_exploration.commons import tracing
+
+
+def _task_name(task: Any) -> str:
+    if task is None:
+        return "task"
+    name = getattr(task, "name", None)
+    if name:
+        return str(name)
+    description = str(getattr(task, "description", "") or "task").strip()
+    return description.split("\n", 1)[0][:60]
+
+
+def _agent_role(task: Any) -> Optional[str]:
+    agent = getattr(task, "agent", None)
+    return str(agent.role).strip() if agent is not None else None
+
+
+class TraceListener(BaseEventListener):
+    """
+    Turns crewAI task and tool events into spans on the process tracer.
+
+    Crew tasks become "task" spans (open between TaskStarted and
+    TaskCompleted/TaskFailed); tool calls become "tool" spans timed by the
+    started_at/finished_at fields of ToolUsageFinished.
+    """
+
+    def setup_listeners(self, crewai_event_bus):
+        tracer = tracing.get_tracer()
+
+        @crewai_event_bus.on(TaskStartedEvent)
+        def on_task_started(source, event):
+            task = event.task or source
+            tracer.begin(("task", id(task)), f"task.{_task_name(task)}", "task", agent=_agent_role(task))
+
+        @crewai_event_bus.on(TaskCompletedEvent)
+        def on_task_completed(source, event):
+            task = event.task or source
+            tracer.finish_key(("task", id(task)))
+
+        @crewai_event_bus.on(TaskFailedEvent)
+        def on_task_failed(source, event):
+            task = event.task or source
+            tracer.finish_key(("task", id(task)), error=str(event.error))
+
+        @crewai_event_bus.on(ToolUsageFinishedEvent)
+        def on_tool_finished(source, event):
+            tracer.record(
+                f"tool.{event.tool_name}",
+                "tool",
+                int(event.started_at.timestamp() * 1e9),
+                int(event.finished_at.timestamp() * 1e9),
+                agent=event.agent_role,
+                from_cache=event.from_cache,
+            )
+
+        @crewai_event_bus.on(ToolUsageErrorEvent)
+        def on_tool_error(source, event):
+            ts = int(event.timestamp.timestamp() * 1e9)
+            tracer.record(f"tool.{event.tool_name}", "tool", ts, ts, agent=event.agent_role, error=str(event.error))
+
+
+_listener: Optional[TraceListener] = None
+
+
+def install() -> None:
+    """Register the listener once per process (no-op while tracing is off)."""
+    global _listener
+    if tracing.enabled() and _listener is None:
+        _listener = TraceListener()
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Tracing is off unless MARS_TRACE is set:
+#   MARS_TRACE=1            write to the default location passed to finish()
+#   MARS_TRACE=<file.json>  write to that file
+# MARS_TRACE_FORMAT selects "chrome" (chrome://tracing / Perfetto, default)
+# or "otel" (OTLP/JSON resourceSpans, as written by the OTel file exporter).
+TRACE_ENV = "MARS_TRACE"
+TRACE_FORMAT_ENV = "MARS_TRACE_FORMAT"
+FORMATS = ("chrome", "otel")
+
+SERVICE_NAME = "mars_exploration"
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("mars_trace_span", default=None)
+
+
+class Span:
+    """One timed operation. Times are wall-clock nanoseconds (time.time_ns)."""
+
+    __slots__ = ("name", "cat", "span_id", "parent_id", "start_ns", "end_ns", "tid", "thread", "attrs")
+
+    def __init__(self, name: str, cat: str, span_id: int, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        thread = threading.current_thread()
+        task = _current_task()
+        if task is None:
+            self.tid = thread.ident or 0
+            self.thread = thread.name
+        else:
+            # Concurrent asyncio tasks on one thread get a lane each, so their spans do not interleave
+            self.tid = id(task)
+            self.thread = f"{thread.name}/{task.get_name()}"
+        self.attrs = attrs
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.time_ns()) - self.start_ns
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+class _NullSpan:
+    """Stand-in returned while tracing is disabled; every call is a no-op."""
+
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "name", "cat", "attrs", "span", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer.start(self.name, self.cat, **self.attrs)
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current.reset(self.token)
+        if exc_type is not None:
+            self.span.set(error=f"{exc_type.__name__}: {exc}")
+        self.tracer.end(self.span)
+        return False
+
+
+class Tracer:
+    """
+    In-process span collector.
+
+    Spans nest through a context variable, so flow steps, crew tasks, tool
+    calls and LLM calls on the same thread (or in tasks started from it)
+    link to their parent. Finished spans are kept in memory until export().
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.trace_id = os.urandom(16).hex()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+        self._open: Dict[Any, Any] = {}
+
+    # -- recording -------------------------------------------------------
+    def span(self, name: str, cat: str = "", **attrs: Any):
+        """Context manager timing the enclosed block."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _SpanContext(self, name, cat, attrs)
+
+    def start(self, name: str, cat: str = "", **attrs: Any) -> Span:
+        parent = _current.get()
+        return Span(name, cat, next(self._ids), parent.span_id if parent else None, attrs)
+
+    def end(self, span: Span, **attrs: Any) -> None:
+        span.end_ns = time.time_ns()
+        if attrs:
+            span.attrs.update(attrs)
+        with self._lock:
+            self._spans.append(span)
+
+    def begin(self, key: Any, name: str, cat: str = "", **attrs: Any) -> None:
+        """
+        Open a span closed later by finish_key(key) (for start/end event pairs).
+
+        The span becomes the current parent until it is finished, so work done
+        in between (e.g. LLM calls of a crew task) nests under it.
+        """
+        if not self.enabled:
+            return
+        span = self.start(name, cat, **attrs)
+        token = _current.set(span)
+        with self._lock:
+            self._open[key] = (span, token)
+
+    def finish_key(self, key: Any, **attrs: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._open.pop(key, None)
+        if entry is None:
+            return
+        span, token = entry
+        try:
+            _current.reset(token)
+        except ValueError:
+            # finished from another context; that context keeps its own parent
+            pass
+        self.end(span, **attrs)
+
+    def record(self, name: str, cat: str, start_ns: int, end_ns: int, **attrs: Any) -> None:
+        """Add an already finished span (e.g. from an event carrying its own timestamps)."""
+        if not self.enabled:
+            return
+        span = self.start(name, cat, **attrs)
+        span.start_ns, span.end_ns = start_ns, end_ns
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return sorted(self._spans, key=lambda s: s.start_ns)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._open.clear()
+
+    # -- export ----------------------------------------------------------
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Chrome trace-event JSON: one complete ("X") event per span, µs resolution."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        threads: Dict[int, str] = {}
+        for s in self.spans():
+            threads.setdefault(s.tid, s.thread)
+            events.append({
+                "name": s.name,
+                "cat": s.cat,
+                "ph": "X",
+                "ts": s.start_ns / 1000.0,
+                "dur": s.duration_ns / 1000.0,
+                "pid": pid,
+                "tid": s.tid,
+                "args": _plain(s.attrs),
+            })
+        meta = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms"}
+
+    def otel_trace(self) -> Dict[str, Any]:
+        """OTLP/JSON trace payload (resourceSpans -> scopeSpans -> spans)."""
+        spans = []
+        for s in self.spans():
+            attrs = dict(s.attrs, **{"mars.category": s.cat, "thread.name": s.thread})
+            span = {
+                "traceId": self.trace_id,
+                "spanId": f"{s.span_id:016x}",
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                "attributes": [_otel_attribute(k, v) for k, v in attrs.items() if v is not None],
+                "status": {"code": 2, "message": str(s.attrs["error"])} if "error" in s.attrs else {},
+            }
+            if s.parent_id is not None:
+                span["parentSpanId"] = f"{s.parent_id:016x}"
+            spans.append(span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otel_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+            }]
+        }
+
+    def export(self, path: str, fmt: str = "chrome") -> str:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown trace format {fmt!r} (expected one of {FORMATS})")
+        payload = self.chrome_trace() if fmt == "chrome" else self.otel_trace()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        return path
+
+
+def _plain(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v if isinstance(v, (str, int, float, bool)) or v is None else str(v) for k, v in attrs.items()}
+
+
+def _otel_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_TRACER = Tracer(enabled=bool(os.getenv(TRACE_ENV)))
+
+
+def get_tracer() -> Tracer:
+    return _TRACER
+
+
+def enabled() -> bool:
+    return _TRACER.enabled
+
+
+def enable() -> Tracer:
+    _TRACER.enabled = True
+    return _TRACER
+
+
+def span(name: str, cat: str = "", **attrs: Any):
+    """Time a block on the process tracer; a shared no-op object when tracing is off."""
+    if not _TRACER.enabled:
+        return NULL_SPAN
+    return _SpanContext(_TRACER, name, cat, attrs)
+
+
+def traced(name: Optional[str] = None, cat: str = "") -> Callable:
+    """Decorator form of span(); the span name defaults to the function name."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _TRACER.enabled:
+                    return await func(*args, **kwargs)
+                with _SpanContext(_TRACER, span_name, cat, {}):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _TRACER.enabled:
+                return func(*args, **kwargs)
+            with _SpanContext(_TRACER, span_name, cat, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def finish(default_path: str) -> Optional[str]:
+    """
+    Export the collected spans if tracing is on and return the file written.
+
+    MARS_TRACE=1 (or true/yes/on) writes to default_path; any other value is
+    used as the output path.
+    """
+    if not _TRACER.enabled:
+        return None
+    target = os.getenv(TRACE_ENV, "")
+    path = default_path if target.lower() in ("", "1", "true", "yes", "on") else target
+    fmt = os.getenv(TRACE_FORMAT_ENV, "chrome").strip().lower()
+    return _TRACER.export(path, fmt)
@@ -0,0 +1,61 @@
+import os
+from crewai import Agent, Crew, Process, Task
+from crewai.project import CrewBase, agent, crew, task
+from crewai.agents.agent_builder.base_agent import BaseAgent
+from typing import List
+
+from mars_exploration.commons.llm import agent_llm, escalation_guardrail
+from mars_exploration.commons.prompting import StablePrefixTask
+from mars_exploration.commons.structured_output import repairing_converter
+from mars_exploration.models.mission_context import MissionClassification
+
+
+@CrewBase
+class ClassificationCrew:
+    """
+    Classification Crew: one LLM pass over the mission summary that tags goals,
+    constraints and hazards per vehicle class, shared by the rover and drone crews.
+    """
+
+    agents: List[BaseAgent]
+    tasks: List[Task]
+
+    agents_config = "config/agents.yaml"
+    tasks_config = "config/tasks.yaml"
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    @agent
+    def mission_context_classifier(self) -> Agent:
+        return Agent(
+            config=self.agents_config["mission_context_classifier"],
+            max_iter=5,
+            llm=agent_llm(
+                "mission_context_classifier", self.agents_config["mission_context_classifier"], MissionClassification
+            ),
+        )
+
+    @task
+    def classify_mission_context(self) -> Task:
+        return StablePrefixTask(
+            config=self.tasks_config["classify_mission_context"],
+            converter_cls=repairing_converter("classify_mission_context"),
+            guardrail=escalation_guardrail(
+                self.mission_context_classifier(), "classify_mission_context", MissionClassification
+            ),
+            output_pydantic=MissionClassification,
+            output_file=os.path.join(self.output_dir, "classify_mission_context.json"),
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the Classification Crew"""
+
+        return Crew(
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=True,
+        )
@@ -4,7 +4,8 @@ from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
 
-from mars_exploration.commons.llm import get_llm
+from mars_exploration.commons.llm import agent_llm
+from mars_exploration.commons.prompting import StablePrefixTask
 
 
 @CrewBase
@@ -26,13 +27,13 @@ class IntegrationCrew:
     def integration_planner(self) -> Agent:
         return Agent(
             config=self.agents_config["integration_planner"], 
-            llm=get_llm(),
+            llm=agent_llm("integration_planner", self.agents_config["integration_planner"]),
             reasoning=False
         )
 
     @task
     def integrate_mission_plans(self) -> Task:
-        return Task(
+        return StablePrefixTask(
             config=self.tasks_config["integrate_mission_plans"],
             markdown=True,
             output_file=os.path.join(self.output_dir, "integrate_mission_plans.md")
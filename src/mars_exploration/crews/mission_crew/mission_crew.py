@@ -1,11 +1,17 @@
+import contextvars
 import os
+from concurrent.futures import ThreadPoolExecutor
 from crewai import LLM, Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
 
-from mars_exploration.commons.llm import get_llm
-from mars_exploration.models.mission_spec import MissionSpec
+from mars_exploration.commons import tracing
+from mars_exploration.commons.llm import agent_llm, escalation_guardrail
+from mars_exploration.commons.prompting import StablePrefixTask
+from mars_exploration.commons.structured_output import repairing_converter
+from mars_exploration.models.mission_spec import MissionFragment, MissionSpec
+from mars_exploration.planning.report_chunks import chunk_workers, merge_fragments, report_title
 
 @CrewBase
 class MissionCrew:
@@ -24,14 +30,16 @@ class MissionCrew:
     def mission_analyst(self) -> Agent:
         return Agent(
             config=self.agents_config["mission_analyst"], 
-            llm=get_llm(),
+            llm=agent_llm("mission_analyst", self.agents_config["mission_analyst"], MissionSpec),
             max_iter=5
         )
 
     @task
     def process_mission_report(self) -> Task:
-        return Task(
+        return StablePrefixTask(
             config=self.tasks_config["process_mission_report"],
+            converter_cls=repairing_converter("process_mission_report"),
+            guardrail=escalation_guardrail(self.mission_analyst(), "process_mission_report", MissionSpec),
             output_pydantic=MissionSpec,
             output_file=os.path.join(self.output_dir, "process_mission_report.json")
         )
@@ -46,3 +54,72 @@ class MissionCrew:
             process=Process.sequential,
             verbose=True,
         )
+
+
+@CrewBase
+class MissionFragmentCrew:
+    """Mission Crew for one part of a long report (chunked mode)"""
+
+    agents: List[BaseAgent]
+    tasks: List[Task]
+
+    agents_config = "config/agents.yaml"
+    tasks_config = "config/tasks.yaml"
+
+    def __init__(self, output_dir, part):
+        self.output_dir = output_dir
+        self.part = part
+
+    @agent
+    def mission_analyst(self) -> Agent:
+        return Agent(
+            config=self.agents_config["mission_analyst"],
+            llm=agent_llm("mission_analyst", self.agents_config["mission_analyst"], MissionFragment),
+            max_iter=5
+        )
+
+    @task
+    def extract_mission_fragment(self) -> Task:
+        return StablePrefixTask(
+            config=self.tasks_config["extract_mission_fragment"],
+            converter_cls=repairing_converter("extract_mission_fragment"),
+            guardrail=escalation_guardrail(self.mission_analyst(), "extract_mission_fragment", MissionFragment),
+            output_pydantic=MissionFragment,
+            output_file=os.path.join(self.output_dir, f"extract_mission_fragment_{self.part}.json")
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the Mission Fragment Crew"""
+
+        return Crew(
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=True,
+        )
+
+
+def analyze_report_parts(parts: List[str], output_dir: str) -> MissionSpec:
+    """
+    Map-reduce mission analysis: one MissionFragmentCrew per report part, at
+    most MARS_MISSION_CHUNK_WORKERS at a time, merged by merge_fragments().
+    """
+    ctx = contextvars.copy_context()
+
+    def extract(index: int) -> MissionFragment:
+        with tracing.span("mission.part", "flow", part=index + 1, chars=len(parts[index])):
+            return (
+                MissionFragmentCrew(output_dir=output_dir, part=index + 1)
+                .crew()
+                .kickoff(inputs={"mission_report": parts[index], "part": index + 1, "parts": len(parts)})
+                .pydantic
+            )
+
+    with ThreadPoolExecutor(max_workers=min(chunk_workers(), len(parts)), thread_name_prefix="mission-part") as pool:
+        fragments = list(pool.map(lambda i: ctx.copy().run(extract, i), range(len(parts))))
+    missing = [i + 1 for i, f in enumerate(fragments) if f is None]
+    if missing:
+        raise ValueError(f"Mission report parts {missing} did not produce a valid fragment")
+    with tracing.span("mission.merge", "flow", parts=len(parts)):
+        return merge_fragments(fragments, report_title(parts[0]) or "Mars mission")
@@ -4,10 +4,12 @@ from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List, Any, Tuple
 
-from mars_exploration.commons.llm import get_llm
+from mars_exploration.commons.llm import agent_llm, escalation_guardrail
+from mars_exploration.commons.prompting import StablePrefixTask
+from mars_exploration.commons.structured_output import repairing_converter
 from mars_exploration.tools.common_tools import SplitGoalsTool
 from mars_exploration.tools.rover_path_tool import RoversPathTool
-from mars_exploration.models.rover_models import PossibleAssignments, RoverMissionContext, RoverSelectionPlan
+from mars_exploration.models.rover_models import PossibleAssignments, RoverSelectionPlan
 @CrewBase
 class RoverCrew:
     """Rover Crew"""
@@ -25,37 +27,21 @@ class RoverCrew:
         os.makedirs(self.output_dir, exist_ok=True)
 
 
-    @agent
-    def rover_context_cleaner(self) -> Agent:
-        return Agent(
-            config=self.agents_config["rover_context_cleaner"],
-            max_iter=5,
-            llm=get_llm(),
-        )
-
-    
-    @task
-    def clean_mission_for_rovers(self) -> Task:
-        return Task(
-            config=self.tasks_config["clean_mission_for_rovers"],
-            output_pydantic=RoverMissionContext,
-            output_file=os.path.join(self.output_dir, "clean_mission_for_rovers.json")
-        )
-    
     @agent
     def rover_candidates_analyst(self) -> Agent:
         return Agent(
             config=self.agents_config["rover_candidates_analyst"],
-            llm=get_llm(),
+            llm=agent_llm("rover_candidates_analyst", self.agents_config["rover_candidates_analyst"]),
             max_iter=5,
             tools=[self.route_tool]
         )
     
     @task
     def compute_possible_rover_assignments(self) -> Task:
-        return Task(
+        return StablePrefixTask(
             config=self.tasks_config["compute_possible_rover_assignments"],
-            context=[self.clean_mission_for_rovers()],
+            converter_cls=repairing_converter("compute_possible_rover_assignments"),
+            guardrail=escalation_guardrail(self.rover_candidates_analyst(), "compute_possible_rover_assignments"),
             output_pydantic=PossibleAssignments,
             output_file=os.path.join(self.output_dir, "compute_possible_rover_assignments.json")
         )
@@ -64,14 +50,16 @@ class RoverCrew:
     def rover_assignment_selector(self) -> Agent:
         return Agent(
             config=self.agents_config["rover_assignment_selector"],
-            llm=get_llm(),
+            llm=agent_llm("rover_assignment_selector", self.agents_config["rover_assignment_selector"]),
             tools=[SplitGoalsTool()]
         )
     
     @task
     def select_rover_candidate(self) -> Task:
-        return Task(
+        return StablePrefixTask(
             config=self.tasks_config["select_rover_candidate"],
+            converter_cls=repairing_converter("select_rover_candidate"),
+            guardrail=escalation_guardrail(self.rover_assignment_selector(), "select_rover_candidate"),
             context=[self.compute_possible_rover_assignments()],
             output_pydantic=RoverSelectionPlan,
             output_file=os.path.join(self.output_dir, "select_rover_candidate.json")
@@ -1,142 +1,405 @@
 #!/usr/bin/env python
+import asyncio
+import functools
+from concurrent.futures import Future
 from pathlib import Path
-from random import randint
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel
-import networkx as nx
 
+from crewai import Crew
 from crewai.flow import Flow, listen, start, and_
 import os
-from mars_exploration.crews.mission_crew.mission_crew import MissionCrew
-from mars_exploration.crews.rover_crew.rover_crew import RoverCrew
-from mars_exploration.crews.drone_crew.drone_crew import DroneCrew
-from mars_exploration.crews.integration_crew.integration_crew import IntegrationCrew
 import json
 
 from mars_exploration.models.mission_spec import MissionSpec
-from mars_exploration.models.rover_models import RoverSelectionPlan
-from mars_exploration.models.drone_models import DroneSelectionPlan
+from mars_exploration.models.mission_context import MissionClassification
+from mars_exploration.models.rover_models import RoverFleetSchedule, RoverMissionContext, RoverSelectionPlan
+from mars_exploration.models.drone_models import DroneMissionContext, DroneSelectionPlan
+from mars_exploration.models.serialization import write_json
+from mars_exploration.commons import deadlines, metrics, profiling, tracing
+from mars_exploration.paths import (
+    DRONE_PLAN_JSON,
+    DRONES_FILE,
+    FINAL_PLAN_MD,
+    INPUT_DIR,
+    INPUT_REPORT,
+    INTERMEDIATE_DIR,
+    MARS_MAP_PATH,
+    MARS_TILES_DIR,
+    MISSION_CONTEXT_JSON,
+    MISSION_SUMMARY_JSON,
+    OUTPUT_DIR,
+    PROFILE_DIR,
+    ROVER_PLAN_JSON,
+    ROVER_SCHEDULE_JSON,
+    ROVERS_FILE,
+    TRACE_JSON,
+    default_map_path,
+)
+from mars_exploration.planning.speculate import speculate_in_background
+# Map and candidate commands live in the crew-free CLI; re-exported for old imports
+from mars_exploration.cli import build_ch, compile_map, stream_candidates, tile_map
+
+
+FLOW_STEP_SECONDS = metrics.histogram("mars_flow_step_seconds", "Duration of MarsMissionFlow steps.", ("step",))
+
+
+def instrumented_step(func):
+    """
+    Trace span, duration histogram and profiler section (flow.<step>) for one flow step.
+
+    Async steps run concurrently on the event loop: each one is traced on a
+    lane of its own, and run_stage() enters its profiler section in the
+    thread that does the blocking work.
+    """
+    name = func.__name__
+    if not asyncio.iscoroutinefunction(func):
+        func = profiling.profiled(f"flow.{name}")(func)
+        return tracing.traced(f"flow.{name}", "flow")(metrics.timed(FLOW_STEP_SECONDS, step=name)(func))
+
+    step = tracing.traced(f"flow.{name}", "flow")(metrics.timed(FLOW_STEP_SECONDS, step=name)(func))
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        task = asyncio.current_task()
+        if task is not None:
+            task.set_name(f"flow.{name}")
+        return await step(*args, **kwargs)
+
+    return wrapper
+
+
+def _write_artifact(path: str, value: Any) -> None:
+    with tracing.span("flow.write", "io", path=os.path.basename(path)):
+        write_json(path, value)
+
+
+def _write_text(path: str, text: str) -> None:
+    with tracing.span("flow.write", "io", path=os.path.basename(path)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
 
 
-
-#Constants 
-INPUT_DIR="src/mars_exploration/data/input"
-INTERMEDIATE_DIR="src/mars_exploration/data/intermediate"
-OUTPUT_DIR="src/mars_exploration/data/output"
-INPUT_REPORT=os.path.join(INPUT_DIR, "mission_report.md")
-MISSION_SUMMARY_JSON= os.path.join(INTERMEDIATE_DIR, "mission_crew","mission_crew_output.json")
-MARS_MAP_PATH = os.path.join(INPUT_DIR, "mars_terrain.graphml")
-ROVERS_FILE = os.path.join(INPUT_DIR, "rovers.json")
-DRONES_FILE = os.path.join(INPUT_DIR, "drones.json")
-ROVER_PLAN_JSON = os.path.join(INTERMEDIATE_DIR, "rover_crew", "rover_crew_output.json")
-DRONE_PLAN_JSON = os.path.join(INTERMEDIATE_DIR, "drone_crew", "drone_crew_output.json")
-FINAL_PLAN_MD = os.path.join(OUTPUT_DIR, "final_mission_plan.md")
-
 class MarsMissionState(BaseModel):
-    mars_map_path: str = None
-    input_report: str = None
-    mission_summary: MissionSpec = None
-    rovers: List[Dict[str, Any]] = None
-    drones : List[Dict[str, Any]] = None
-    rover_plan: RoverSelectionPlan = ""
-    drone_plan: DroneSelectionPlan = ""
+    mars_map_path: Optional[str] = None
+    input_report: Optional[str] = None
+    mission_summary: Optional[MissionSpec] = None
+    mission_context: Optional[MissionClassification] = None
+    rover_context: Optional[RoverMissionContext] = None
+    drone_context: Optional[DroneMissionContext] = None
+    rovers: Optional[List[Dict[str, Any]]] = None
+    drones : Optional[List[Dict[str, Any]]] = None
+    rover_plan: Optional[RoverSelectionPlan] = None
+    # Conflict-free timing of rover_plan (planning/mapf.py)
+    rover_schedule: Optional[RoverFleetSchedule] = None
+    drone_plan: Optional[DroneSelectionPlan] = None
     final_plan: str = ""
+    # Steps that missed their deadline and used a deterministic fallback
+    degraded_stages: List[str] = []
+    # Where the run writes its artifacts (the planning service gives each mission its own)
+    intermediate_dir: str = INTERMEDIATE_DIR
+    output_dir: str = OUTPUT_DIR
 
 
 
+# The LLM steps are coroutines: crewAI runs the listeners of a step with
+# asyncio.gather, but a blocking step would hold the event loop, so the rover
+# and drone branches would still run one after the other. Each step instead
+# awaits its crew in a stage thread (run_stage), crews are built in the
+# background while earlier stages run (build_crews) and intermediate JSON is
+# written off the loop (write_artifact). A mission takes about as long as its
+# longest branch.
 class MarsMissionFlow(Flow[MarsMissionState]):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._crews: Dict[str, Future] = {}
+        self._writes: List[asyncio.Future] = []
+
+    def intermediate_path(self, *parts: str) -> str:
+        return os.path.join(self.state.intermediate_dir, *parts)
+
+    def build_crews(self) -> None:
+        """Start building every crew (config, agents, LLM clients, path tools and fleet tables) in background threads."""
+        from mars_exploration.crews.classification_crew.classification_crew import ClassificationCrew
+        from mars_exploration.crews.drone_crew.drone_crew import DroneCrew
+        from mars_exploration.crews.integration_crew.integration_crew import IntegrationCrew
+        from mars_exploration.crews.mission_crew.mission_crew import MissionCrew
+        from mars_exploration.crews.rover_crew.rover_crew import RoverCrew
+
+        state = self.state
+        builders = {
+            "mission": lambda: MissionCrew(output_dir=self.intermediate_path("mission_crew")),
+            "classification": lambda: ClassificationCrew(output_dir=self.intermediate_path("classification")),
+            "rover": lambda: RoverCrew(mapp=state.mars_map_path, rovers=state.rovers, output_dir=self.intermediate_path("rover_crew")),
+            "drone": lambda: DroneCrew(mapp=state.mars_map_path, drones=state.drones, output_dir=self.intermediate_path("drone_crew")),
+            "integration": lambda: IntegrationCrew(output_dir=self.intermediate_path("integration")),
+        }
+        def build(name, make):
+            with tracing.span("flow.build_crew", "flow", crew=name):
+                return make().crew()
+
+        self._crews = {
+            name: deadlines.in_thread(functools.partial(build, name, make), f"build-{name}-crew")
+            for name, make in builders.items()
+        }
+
+    def built_crew(self, name: str) -> Crew:
+        """Crew started by build_crews(); blocks until it is ready (call it from the stage thread)."""
+        return self._crews[name].result()
+
+    def write_artifact(self, path: str, value: Any) -> None:
+        """write_json() in a worker thread; flush_writes() waits for every pending write."""
+        self._writes.append(asyncio.ensure_future(asyncio.to_thread(_write_artifact, path, value)))
+
+    async def flush_writes(self) -> None:
+        writes, self._writes = self._writes, []
+        await asyncio.gather(*writes)
+
+    async def run_stage(self, step: str, work, fallback=None):
+        """work() in a stage thread within the step's deadline (MARS_STAGE_DEADLINES); fallback() and a degraded mark when it runs out."""
+        try:
+            return await deadlines.run_with_deadline_async(
+                profiling.profiled(f"flow.{step}")(work), deadlines.stage_deadline(step), step
+            )
+        except deadlines.StageTimeout as e:
+            if fallback is None:
+                raise
+            print(f"{e}, using the deterministic fallback")
+            deadlines.STAGE_FALLBACKS.inc(step=step)
+            self.state.degraded_stages.append(step)
+            return await asyncio.to_thread(fallback)
+
+    def fallback_rover_plan(self) -> RoverSelectionPlan:
+        """Tool-only rover plan: rovers_path_tool candidates and deterministic selection."""
+        from mars_exploration.planning import evaluate
+        from mars_exploration.planning.fallback import select_rovers
+        from mars_exploration.planning.fleet import FleetTable
+
+        ctx = self.state.rover_context
+        candidates = evaluate.iter_rover_candidates(
+            self.state.mars_map_path,
+            FleetTable(self.state.rovers),
+            [g.model_dump() for g in ctx.rover_goals],
+            ctx.prohibited_nodes,
+            energy_cost=ctx.energy_cost if ctx.energy_cost is not None else 0.2,
+            energy_threshold=ctx.energy_threshold if ctx.energy_threshold is not None else 5.0,
+        )
+        return select_rovers(list(candidates))
+
+    def schedule_rover_plan(self) -> Optional[RoverFleetSchedule]:
+        """Conflict-free timed routes for the selected rovers; None (reported) when they cannot be computed."""
+        from mars_exploration.planning.mapf import schedule_rovers
+        from mars_exploration.routing.engine import NodeNotFoundError, NoPathError
+
+        try:
+            return schedule_rovers(self.state.rover_plan, self.state.mars_map_path, self.state.rover_context.prohibited_nodes)
+        except (NoPathError, NodeNotFoundError, ValueError) as e:
+            print(f"Rover scheduling failed: {e}")
+            return None
+
+    def fallback_drone_plan(self) -> DroneSelectionPlan:
+        """Tool-only drone plan: drones_path_tool candidates and deterministic selection."""
+        from mars_exploration.planning import evaluate
+        from mars_exploration.planning.fallback import select_drones
+        from mars_exploration.planning.fleet import FleetTable
+
+        ctx = self.state.drone_context
+        candidates = evaluate.iter_drone_candidates(
+            self.state.mars_map_path,
+            FleetTable(self.state.drones),
+            [g.model_dump() for g in ctx.drone_goals],
+            ctx.prohibited_nodes,
+            flight_time_threshold=ctx.flight_time_threshold if ctx.flight_time_threshold is not None else 240,
+            time_cost=ctx.time_cost if ctx.time_cost is not None else 1.0,
+        )
+        return select_drones(list(candidates))
+
     @start()
+    @instrumented_step
     def prepare_mission(self):
+        from mars_exploration.commons.llm import warm_up_in_background
+
         print("Begin flow")
-        self.state.input_report = Path(INPUT_REPORT).read_text(encoding="utf-8")
-        self.state.mars_map_path = MARS_MAP_PATH
-        self.state.rovers = json.loads(Path(ROVERS_FILE).read_text(encoding="utf-8"))
-        self.state.drones = json.loads(Path(DRONES_FILE).read_text(encoding="utf-8"))
+        self._writes = []
+        # With MARS_LLM_WARMUP=1, loads the small-tier model while the mission analyst runs on the large one
+        warm_up_in_background()
+        # Inputs passed to kickoff(inputs=...) win over the files in INPUT_DIR
+        if self.state.input_report is None:
+            self.state.input_report = Path(INPUT_REPORT).read_text(encoding="utf-8")
+        if self.state.mars_map_path is None:
+            self.state.mars_map_path = default_map_path()
+        if self.state.rovers is None:
+            self.state.rovers = json.loads(Path(ROVERS_FILE).read_text(encoding="utf-8"))
+        if self.state.drones is None:
+            self.state.drones = json.loads(Path(DRONES_FILE).read_text(encoding="utf-8"))
+        # Route legs are computed while the LLM stages run (planning/speculate.py)
+        speculate_in_background(self.state.input_report, self.state.mars_map_path, self.state.rovers, self.state.drones)
+        self.build_crews()
 
 
 
         
     @listen(prepare_mission)
-    def process_mission(self):
+    @instrumented_step
+    async def process_mission(self):
+        from mars_exploration.crews.mission_crew.mission_crew import analyze_report_parts
+        from mars_exploration.planning.report_chunks import split_report
+
         print("Processing mission report")
 
-        result = (
-            MissionCrew(output_dir=os.path.join(INTERMEDIATE_DIR, "mission_crew"))
-            .crew()
-            .kickoff(inputs={
+        # Long reports are read part by part in parallel and merged (planning/report_chunks.py)
+        parts = split_report(self.state.input_report)
+        if len(parts) > 1:
+            print(f"Mission report split into {len(parts)} parts")
+            work = lambda: analyze_report_parts(parts, self.intermediate_path("mission_crew"))
+        else:
+            work = lambda: self.built_crew("mission").kickoff(inputs={
             "mission_report": self.state.input_report
-        })
-        )
+        }).pydantic
 
-        mission_spec = result.pydantic
-        with open(MISSION_SUMMARY_JSON, "w", encoding="utf-8") as f:
-            f.write(mission_spec.model_dump_json(indent=4))
+        # No deterministic reading of a free-text report: a timeout fails the mission
+        mission_spec = await self.run_stage("process_mission", work)
+        self.write_artifact(self.intermediate_path("mission_crew", "mission_crew_output.json"), mission_spec)
 
         self.state.mission_summary = mission_spec
 
 
     @listen(process_mission)
-    def plan_rover_operations(self):
+    @instrumented_step
+    async def classify_mission_context(self):
+        from mars_exploration.planning.fallback import classify_spec
+
+        print("Classifying mission context for rovers and drones")
+
+        # One LLM pass tags goals/constraints/hazards per vehicle class; the
+        # rover and drone contexts are split from it deterministically.
+        self.state.mission_context = await self.run_stage(
+            "classify_mission_context",
+            lambda: self.built_crew("classification")
+            .kickoff(inputs={
+                "mission_summary": self.state.mission_summary.model_dump_json()
+            })
+            .pydantic,
+            fallback=lambda: classify_spec(self.state.mission_summary),
+        )
+        self.state.rover_context = self.state.mission_context.rover_context()
+        self.state.drone_context = self.state.mission_context.drone_context()
+
+        self.write_artifact(self.intermediate_path("classification", os.path.basename(MISSION_CONTEXT_JSON)), self.state.mission_context)
+        self.write_artifact(self.intermediate_path("classification", "rover_context.json"), self.state.rover_context)
+        self.write_artifact(self.intermediate_path("classification", "drone_context.json"), self.state.drone_context)
+
+    @listen(classify_mission_context)
+    @instrumented_step
+    async def plan_rover_operations(self):
         print(f"Planning rover operations")
 
-        result = (
-            RoverCrew(mapp=self.state.mars_map_path, rovers=self.state.rovers, output_dir=os.path.join(INTERMEDIATE_DIR, "rover_crew"))
-            .crew()
+        self.state.rover_plan = await self.run_stage(
+            "plan_rover_operations",
+            lambda: self.built_crew("rover")
             .kickoff(inputs={
-                "mission_summary": self.state.mission_summary.model_dump_json()          
+                "rover_context": self.state.rover_context.model_dump_json()
             })
+            .pydantic,
+            fallback=self.fallback_rover_plan,
         )
 
-        self.state.rover_plan = result.pydantic
+        self.write_artifact(self.intermediate_path("rover_crew", "rover_crew_output.json"), self.state.rover_plan)
 
-        with open(ROVER_PLAN_JSON, "w", encoding="utf-8") as f:
-            f.write(self.state.rover_plan.model_dump_json(indent=4))
+        # Rovers are selected per goal; time their routes so no two meet on a node or an edge
+        self.state.rover_schedule = await asyncio.to_thread(self.schedule_rover_plan)
+        if self.state.rover_schedule is not None:
+            self.write_artifact(self.intermediate_path("rover_crew", os.path.basename(ROVER_SCHEDULE_JSON)), self.state.rover_schedule)
 
-    @listen(process_mission)
-    def plan_drone_operations(self):
+    @listen(classify_mission_context)
+    @instrumented_step
+    async def plan_drone_operations(self):
         print(f"Planning drone operations")
-        result = (
-            DroneCrew(mapp=self.state.mars_map_path, drones=self.state.drones, output_dir=os.path.join(INTERMEDIATE_DIR, "drone_crew"))
-            .crew()
+        self.state.drone_plan = await self.run_stage(
+            "plan_drone_operations",
+            lambda: self.built_crew("drone")
             .kickoff(inputs={
-                "mission_summary": self.state.mission_summary.model_dump_json()          
+                "drone_context": self.state.drone_context.model_dump_json()
             })
+            .pydantic,
+            fallback=self.fallback_drone_plan,
         )
-        self.state.drone_plan = result.pydantic
 
-        with open(DRONE_PLAN_JSON, "w", encoding="utf-8") as f:
-            f.write(self.state.drone_plan.model_dump_json(indent=4))
+        self.write_artifact(self.intermediate_path("drone_crew", "drone_crew_output.json"), self.state.drone_plan)
 
     @listen(and_(plan_rover_operations, plan_drone_operations))
-    def integrate_mission(self):
+    @instrumented_step
+    async def integrate_mission(self):
+        from mars_exploration.planning.fallback import degraded_note, render_plan
+
         print("Integrating final mission plan")
 
-        result = (
-            IntegrationCrew(output_dir=os.path.join(INTERMEDIATE_DIR, "integration"))
-            .crew()
+        # Integration output is Markdown (human readable)
+        self.state.final_plan = await self.run_stage(
+            "integrate_mission",
+            lambda: self.built_crew("integration")
             .kickoff(inputs={
                 "mission_summary": self.state.mission_summary.model_dump(),
-                "rover_plan": self.state.rover_plan.model_dump(),
+                "rover_plan": {
+                    **self.state.rover_plan.model_dump(),
+                    "schedule": self.state.rover_schedule.model_dump() if self.state.rover_schedule else None,
+                },
                 "drone_plan": self.state.drone_plan.model_dump(),
             })
+            .raw,
+            fallback=lambda: render_plan(
+                self.state.mission_summary, self.state.rover_plan, self.state.drone_plan, self.state.rover_schedule
+            ),
         )
+        if self.state.degraded_stages:
+            self.state.final_plan = degraded_note(self.state.degraded_stages) + self.state.final_plan
 
-        # Integration output is Markdown (human readable)
-        self.state.final_plan = result.raw
-
-        with open(FINAL_PLAN_MD, "w", encoding="utf-8") as f:
-            f.write(self.state.final_plan)
+        await asyncio.gather(
+            asyncio.to_thread(_write_text, os.path.join(self.state.output_dir, os.path.basename(FINAL_PLAN_MD)), self.state.final_plan),
+            self.flush_writes(),
+        )
 
 
 def kickoff():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="kickoff", description="Run the Mars mission flow.")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="sample",
+        default=None,
+        help=f"profile the run: sample, cprofile or both comma-separated (default: ${profiling.PROFILE_ENV})",
+    )
+    args, _ = parser.parse_known_args()
+    profiling.start(args.profile)
+
+    if tracing.enabled():
+        from mars_exploration.commons import trace_listener
+
+        trace_listener.install()
+
+    metrics.start_exporters()
+
     flow = MarsMissionFlow()
-    flow.kickoff()
+    try:
+        with tracing.span("flow.kickoff", "flow"):
+            flow.kickoff()
+    finally:
+        metrics.stop_exporters()
+        profiling.finish(PROFILE_DIR)
+
+    trace_path = tracing.finish(TRACE_JSON)
+    if trace_path:
+        print(f"Trace written to {trace_path}")
 
 
 def plot():
     flow = MarsMissionFlow()
     flow.plot()
 
+
 if __name__ == "__main__":
     kickoff()
@@ -20,6 +20,17 @@ class DroneMissionContext(BaseModel):
     drone_goals: List[DroneGoal] = Field(default_factory=list, description="Drone-relevant mission goals only.")
     constraints: List[str] = Field(default_factory=list, description="Only constraints relevant to drone operations.")
     hazards: List[str] = Field(default_factory=list, description="Hazards relevant to drone operations.")
+    prohibited_nodes: List[str] = Field(default_factory=list, description="Node ids drones must not enter.")
+    flight_time_threshold: Optional[float] = Field(default=None, description="Flight time limit in minutes, if the mission states one.")
+    time_cost: Optional[float] = Field(default=None, description="Minutes per distance unit, if the mission states one.")
+
+
+class DroneRouteAlternative(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    path: List[str] = Field(..., description="Alternative round-trip route returning to the drone start.")
+    distance: float = Field(..., description="Total round-trip distance/cost.")
+    time_required: float = Field(..., description="Estimated round-trip flight time in minutes.")
 
 
 class DroneCandidate(BaseModel):
@@ -32,6 +43,10 @@ class DroneCandidate(BaseModel):
     location: str = Field(..., description="Drone start node (treated as base node).")
     altitude: float = Field(..., description="Drone altitude from drones.json.")
     camera_resolution: str = Field(..., description="Drone camera_resolution from drones.json.")
+    alternatives: List[DroneRouteAlternative] = Field(
+        default_factory=list,
+        description="Feasible round trips avoiding nodes of path, shortest first (hazard failover; empty unless requested).",
+    )
 
 
 class DroneRejection(BaseModel):
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from mars_exploration.models.drone_models import DroneGoal, DroneMissionContext
+from mars_exploration.models.rover_models import RoverGoal, RoverMissionContext
+
+Priority = Literal["high", "medium", "low"]
+Vehicle = Literal["rover", "drone"]
+
+
+class ClassifiedGoal(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    goal_id: str = Field(..., description="Scientific goal id, copied from the mission summary.")
+    description: str = Field(..., description="Goal description, copied from the mission summary.")
+    target_nodes: List[str] = Field(default_factory=list, description="Target nodes for this goal.")
+    terrain: Optional[str] = Field(default=None, description="Terrain type (plain/rocky/sandy/icy/crater/air) if given.")
+    priority: Priority = Field(..., description="Priority normalized to: high, medium, low. Must be lower case")
+    vehicles: List[Vehicle] = Field(
+        default_factory=list,
+        description="Vehicle classes that can execute the goal: rover (ground sampling/measurement), drone (aerial imaging/survey).",
+    )
+
+
+class ClassifiedItem(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    text: str = Field(..., description="Constraint or hazard text, copied from the mission summary.")
+    vehicles: List[Vehicle] = Field(
+        default_factory=list,
+        description="Vehicle classes it applies to; global statements (No agent/All agents/No one ...) apply to both.",
+    )
+    nodes: List[str] = Field(
+        default_factory=list,
+        description="Node ids (e.g. N60) that it forbids vehicles to enter; empty if it does not prohibit nodes.",
+    )
+
+
+class MissionClassification(BaseModel):
+    """
+    Shared classification stage output: every goal, constraint and hazard tagged
+    once with the vehicle classes it applies to, plus the numeric thresholds the
+    path tools need. rover_context() / drone_context() split it deterministically.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    goals: List[ClassifiedGoal] = Field(default_factory=list, description="Every scientific goal with its vehicle classes.")
+    constraints: List[ClassifiedItem] = Field(default_factory=list, description="Every constraint with its vehicle classes.")
+    hazards: List[ClassifiedItem] = Field(default_factory=list, description="Every hazard with its vehicle classes.")
+    energy_threshold: Optional[float] = Field(
+        default=None, description="Rover minimum energy percentage (e.g. 'recharge below 20%' -> 20), if stated."
+    )
+    energy_cost: Optional[float] = Field(default=None, description="Rover energy per distance unit, only if explicitly stated.")
+    flight_time_threshold: Optional[float] = Field(
+        default=None, description="Drone flight time limit in minutes (e.g. 'return after 30 minutes' -> 30), if stated."
+    )
+    time_cost: Optional[float] = Field(default=None, description="Drone minutes per distance unit, only if explicitly stated.")
+
+    def prohibited_nodes(self, vehicle: Vehicle) -> List[str]:
+        """Node ids forbidden to `vehicle` by its hazards and constraints, in first-seen order."""
+        seen: dict = {}
+        for item in (*self.hazards, *self.constraints):
+            if vehicle in item.vehicles:
+                for node in item.nodes:
+                    seen.setdefault(node.strip(), None)
+        return [n for n in seen if n]
+
+    def _texts(self, items: List[ClassifiedItem], vehicle: Vehicle) -> List[str]:
+        return [item.text for item in items if vehicle in item.vehicles]
+
+    def _goal_fields(self, vehicle: Vehicle) -> List[dict]:
+        return [g.model_dump(exclude={"vehicles"}) for g in self.goals if vehicle in g.vehicles]
+
+    def rover_context(self) -> RoverMissionContext:
+        return RoverMissionContext(
+            rover_goals=[RoverGoal(**g) for g in self._goal_fields("rover")],
+            constraints=self._texts(self.constraints, "rover"),
+            hazards=self._texts(self.hazards, "rover"),
+            prohibited_nodes=self.prohibited_nodes("rover"),
+            energy_threshold=self.energy_threshold,
+            energy_cost=self.energy_cost,
+        )
+
+    def drone_context(self) -> DroneMissionContext:
+        return DroneMissionContext(
+            drone_goals=[DroneGoal(**g) for g in self._goal_fields("drone")],
+            constraints=self._texts(self.constraints, "drone"),
+            hazards=self._texts(self.hazards, "drone"),
+            prohibited_nodes=self.prohibited_nodes("drone"),
+            flight_time_threshold=self.flight_time_threshold,
+            time_cost=self.time_cost,
+        )
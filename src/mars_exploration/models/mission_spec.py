@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections import Counter
+
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import List, Optional, Literal
 Priority = Literal["high", "medium", "low"]
@@ -58,9 +60,31 @@ class MissionSpec(BaseModel):
     @field_validator("scientific_goals")
     @classmethod
     def _unique_goal_ids(cls, goals: List[ScientificGoal]) -> List[ScientificGoal]:
-        ids = [g.goal_id for g in goals]
-        dupes = {x for x in ids if ids.count(x) > 1}
+        counts = Counter(g.goal_id for g in goals)
+        dupes = {x for x, n in counts.items() if n > 1}
         if dupes:
             raise ValueError(f"Duplicate goal ids found: {sorted(dupes)}")
         return goals
 
+
+
+class GoalFragment(ScientificGoal):
+    priority: Optional[Priority] = Field(
+        default=None, description="Priority if this part of the report states it: high/medium/low, lowercase. Otherwise null"
+    )
+
+
+class MissionFragment(BaseModel):
+    """
+    What one part of a long mission report states (chunked Mission Crew, see
+    planning/report_chunks.py). Goal ids are local to the part.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    mission_title: str = Field(default="", description="Mission title if this part states it, else empty.")
+    mission_description: str = Field(default="", description="Summary of the mission purpose if this part describes it, else empty.")
+    scientific_goals: List[GoalFragment] = Field(default_factory=list, description="Scientific goals mentioned in this part.")
+    constraints: List[str] = Field(default_factory=list, description="Operational or environmental constraints stated in this part.")
+    hazards: List[str] = Field(default_factory=list, description="Known or suspected hazards stated in this part.")
+    assumptions: List[str] = Field(default_factory=list, description="Assumptions needed to interpret this part.")
+    risks: List[str] = Field(default_factory=list, description="Ambiguities, conflicts or missing details in this part.")
@@ -21,21 +21,43 @@ class RoverMissionContext(BaseModel):
     rover_goals: List[RoverGoal] = Field(default_factory=list, description="Rover-relevant mission goals only.")
     constraints: List[str] = Field(default_factory=list, description="Only constraints relevant to rover operations.")
     hazards: List[str] = Field(default_factory=list, description="Hazards relevant to rover operations.")
+    prohibited_nodes: List[str] = Field(default_factory=list, description="Node ids rovers must not enter.")
+    energy_threshold: Optional[float] = Field(default=None, description="Minimum energy percentage, if the mission states one.")
+    energy_cost: Optional[float] = Field(default=None, description="Energy per distance unit, if the mission states one.")
 
 # Process paths agent
+class RoverRouteAlternative(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    path: List[str] = Field(..., description="Alternative round-trip path: start -> targets -> start.")
+    distance: float = Field(..., description="Total round-trip distance/cost.")
+    energy_required: float = Field(..., description="Energy required = distance * energy_cost.")
+    recharge_before: bool = Field(..., description="True if rover must recharge before departing on this route.")
+
+
 class RoverCandidate(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
     rover_id: str = Field(..., description="Rover id from rovers.json.")
     path: List[str] = Field(..., description="Round-trip path: start -> targets -> start.")
     distance: float = Field(..., description="Total round-trip distance/cost.")
-    energy_required: float = Field(..., description="Energy required = distance * energy_cost.")
+    energy_required: float = Field(
+        ..., description="Energy required = distance * energy_cost (can exceed a full battery when recharge_stops is set)."
+    )
     recharge_before: bool = Field(
         ...,
         description="True if rover must recharge before departing to avoid dropping below threshold.",
     )
     speed: float = Field(..., description="Rover speed")
     location: str = Field(..., description="initial location")
+    recharge_stops: List[str] = Field(
+        default_factory=list,
+        description="Charging nodes on path where the rover refills its battery, in route order (empty for a direct trip).",
+    )
+    alternatives: List[RoverRouteAlternative] = Field(
+        default_factory=list,
+        description="Feasible round trips avoiding nodes of path, shortest first (hazard failover; empty unless requested).",
+    )
 
 class RoverRejection(BaseModel):
     model_config = ConfigDict(extra="forbid")
@@ -115,4 +137,38 @@ class RoverSelectionPlan(BaseModel):
     failures: List[RoverGoalFailure] = Field(
         default_factory=list,
         description="Goals that have zero candidates. Must include reason derived from no_candidates."
-    )
\ No newline at end of file
+    )
+
+# Conflict-free scheduling (planning/mapf.py)
+
+class TimedStop(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    node: str = Field(..., description="Node id.")
+    arrival: float = Field(..., description="Time the rover reaches the node (mission start = 0).")
+    departure: float = Field(..., description="Time the rover leaves the node (later than arrival when it waits).")
+
+
+class RoverSchedule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    rover_id: str = Field(..., description="Rover id.")
+    goal_ids: List[str] = Field(..., description="Goals of the rover's assignments, in the order they are driven.")
+    path: List[str] = Field(..., description="Full itinerary: start -> targets -> start for every assignment.")
+    timed_path: List[TimedStop] = Field(..., description="Arrival and departure time at every node of path.")
+    distance: float = Field(..., description="Total distance/cost of path.")
+    energy_required: float = Field(..., description="Energy required for path at the candidates' energy per distance.")
+    start: float = Field(..., description="Departure time from the start node.")
+    finish: float = Field(..., description="Arrival time back at the start node.")
+    wait_time: float = Field(..., description="Time spent waiting for other rovers.")
+
+
+class RoverFleetSchedule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    schedules: List[RoverSchedule] = Field(default_factory=list, description="One conflict-free timed route per rover.")
+    makespan: float = Field(default=0.0, description="Time the last rover is back at its start node.")
+    tick: float = Field(default=1.0, description="Time resolution of the schedule.")
+    conflicts_resolved: int = Field(
+        default=0, description="Conflicts between the selected routes if every rover left at time 0 without waiting."
+    )
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+
+# Serialization helpers for intermediate artifacts. Hot-path models are built
+# from plain dicts with one model_validate() per goal (see planning/fleet.py);
+# benchmarks/bench_models.py tracks construction and serialization throughput.
+
+
+def dump_json(value: Any, indent: Optional[int] = None) -> bytes:
+    """Serialize a model or a list of models to JSON bytes."""
+    if isinstance(value, BaseModel):
+        return value.__pydantic_serializer__.to_json(value, indent=indent)
+    return TypeAdapter(type(value)).dump_json(value, indent=indent)
+
+
+def write_json(path: str, value: Any, indent: Optional[int] = 4) -> None:
+    """Write an intermediate artifact (model or list of models) as JSON."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(dump_json(value, indent=indent))
@@ -0,0 +1,26 @@
+import os
+
+
+# Data layout shared by the flow (main.py) and the crew-free CLI (cli.py).
+# Kept free of heavy imports so that `mars` can start without crewai.
+INPUT_DIR="src/mars_exploration/data/input"
+INTERMEDIATE_DIR="src/mars_exploration/data/intermediate"
+OUTPUT_DIR="src/mars_exploration/data/output"
+INPUT_REPORT=os.path.join(INPUT_DIR, "mission_report.md")
+MISSION_SUMMARY_JSON= os.path.join(INTERMEDIATE_DIR, "mission_crew","mission_crew_output.json")
+MARS_MAP_PATH = os.path.join(INPUT_DIR, "mars_terrain.graphml")
+MARS_TILES_DIR = os.path.join(INPUT_DIR, "mars_terrain.tiles")
+ROVERS_FILE = os.path.join(INPUT_DIR, "rovers.json")
+DRONES_FILE = os.path.join(INPUT_DIR, "drones.json")
+MISSION_CONTEXT_JSON = os.path.join(INTERMEDIATE_DIR, "classification", "mission_context.json")
+ROVER_PLAN_JSON = os.path.join(INTERMEDIATE_DIR, "rover_crew", "rover_crew_output.json")
+ROVER_SCHEDULE_JSON = os.path.join(INTERMEDIATE_DIR, "rover_crew", "rover_schedule.json")
+DRONE_PLAN_JSON = os.path.join(INTERMEDIATE_DIR, "drone_crew", "drone_crew_output.json")
+FINAL_PLAN_MD = os.path.join(OUTPUT_DIR, "final_mission_plan.md")
+TRACE_JSON = os.path.join(INTERMEDIATE_DIR, "trace.json")
+PROFILE_DIR = os.path.join(INTERMEDIATE_DIR, "profile")
+
+
+def default_map_path() -> str:
+    # Prefer the tiled map when one has been built (see tile_map)
+    return MARS_TILES_DIR if os.path.isdir(MARS_TILES_DIR) else MARS_MAP_PATH
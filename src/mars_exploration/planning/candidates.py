@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from mars_exploration.commons import metrics
+
+
+# route(source, target_nodes) -> (round-trip distance, node path)
+RouteFn = Callable[[str, List[str]], Tuple[float, List[str]]]
+# (source, target_nodes) -> alternative round trips, shortest first (routing/alternatives.py)
+AlternativesFn = Callable[[str, List[str]], List[Tuple[float, List[str]]]]
+# (source, target_nodes) -> (distance, path, recharge stops, energy before the first stop) (routing/energy.py)
+RechargeFn = Callable[[str, List[str]], Tuple[float, List[str], List[str], float]]
+
+_PER_GOAL_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+GOAL_CANDIDATES = metrics.histogram(
+    "mars_goal_candidates", "Feasible vehicles per goal.", ("vehicle",), buckets=_PER_GOAL_BUCKETS
+)
+GOAL_REJECTIONS = metrics.histogram(
+    "mars_goal_rejections", "Rejected vehicles per goal (reported only when none is feasible).", ("vehicle",),
+    buckets=_PER_GOAL_BUCKETS,
+)
+
+
+def normalize_terrain(value: str) -> str:
+    if not value:
+        return ""
+
+    v = value.strip().lower()
+
+    # common noise removal
+    v = v.replace(" terrain", "")
+    v = v.replace(" area", "")
+    v = v.replace("_", " ")
+    v = v.replace("-", " ")
+
+    # canonical mapping
+    if "rock" in v:
+        return "rocky"
+    if "sand" in v:
+        return "sandy"
+    if "ice" in v:
+        return "icy"
+    if "crater" in v:
+        return "crater"
+    if "plain" in v:
+        return "plain"
+
+    return v
+
+
+def priority_rank(p: str) -> int:
+    """Sort order: high -> medium -> low. Unknown goes last."""
+    p = (p or "").strip().lower()
+    return {"high": 0, "medium": 1, "low": 2}.get(p, 3)
+
+
+def sort_goals(goals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Goals in priority order (stable)."""
+    return sorted(goals, key=lambda g: priority_rank(str(g.get("priority", "")).lower()))
+
+
+def parse_goal(goal: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized goal fields shared by the rover and drone tools."""
+    target_nodes = goal.get("target_nodes") or []
+    return {
+        "goal_id": str(goal.get("goal_id", goal.get("id", ""))).strip(),
+        "description": str(goal.get("description", "")).strip(),
+        "priority": str(goal.get("priority", "")).strip().lower() or "medium",
+        "terrain": normalize_terrain(str(goal.get("terrain") or "").strip()),
+        "target_nodes": [str(x).strip() for x in target_nodes if str(x).strip()],
+    }
+
+
+def prohibited_node_set(prohibited_nodes: Optional[list]) -> Set[str]:
+    return {str(n).strip() for n in (prohibited_nodes or []) if str(n).strip()}
+
+
+def drone_time_cost(time_cost: float, use_terrain_weight: bool) -> float:
+    """Minutes per distance unit used by DronesPathTool."""
+    if not time_cost:
+        time_cost = 1.0
+    if use_terrain_weight and time_cost > 0.5:  # to have realistic time costs
+        time_cost = 0.15
+    return time_cost
+
+
+def observe_goal(vehicle: str, goal_candidates) -> None:
+    """Record the candidate / rejection counts of one GoalCandidates."""
+    GOAL_CANDIDATES.observe(len(goal_candidates.candidates), vehicle=vehicle)
+    GOAL_REJECTIONS.observe(len(goal_candidates.no_candidates), vehicle=vehicle)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Set
+
+from mars_exploration.models import drone_models, rover_models
+from mars_exploration.planning.candidates import (
+    AlternativesFn,
+    RechargeFn,
+    RouteFn,
+    drone_time_cost,
+    observe_goal,
+    parse_goal,
+    prohibited_node_set,
+    sort_goals,
+)
+from mars_exploration.planning.fleet import FleetTable, drone_goal_candidates, rover_goal_candidates
+from mars_exploration.planning.sweep import FeasibilityCube, drone_sweep, normalized_time_costs, rover_sweep
+from mars_exploration.routing.cost_models import DRONE_TERRAIN_MULTIPLIERS, ROVER_TERRAIN_MULTIPLIERS
+from mars_exploration.routing.alternatives import alternative_routes, route_alternatives
+from mars_exploration.routing.energy import charging_nodes_from_env, get_energy_router
+from mars_exploration.routing.engine import get_route_engine
+
+
+# The path tool computations without crewAI: RoversPathTool / DronesPathTool
+# delegate here, and the `mars` CLI calls these directly so that deterministic
+# runs never import crewai.
+
+
+def chain_route(mars_map: str, multipliers: Optional[Mapping[str, float]], prohibited_set: Set[str]) -> RouteFn:
+    """Round-trip route function (source -> targets -> source) over the shared engine."""
+    engine = get_route_engine(mars_map, multipliers)
+    blocked = engine.blocked_indices(prohibited_set)
+
+    def route(source: str, target_nodes: List[str]):
+        return engine.chain(source, target_nodes, blocked)
+
+    return route
+
+
+def alternatives_fn(
+    mars_map: str, multipliers: Optional[Mapping[str, float]], prohibited_set: Set[str], k: Optional[int]
+) -> Optional[AlternativesFn]:
+    """Alternative round trips per origin (k, default MARS_ROUTE_ALTERNATIVES), or None when k is 0."""
+    k = route_alternatives() if k is None else k
+    if k <= 0:
+        return None
+    engine = get_route_engine(mars_map, multipliers)
+    blocked = engine.blocked_indices(prohibited_set)
+
+    def alternatives(source: str, target_nodes: List[str]):
+        return alternative_routes(engine, source, target_nodes, blocked, k)
+
+    return alternatives
+
+
+def recharge_fn(
+    mars_map: str,
+    multipliers: Optional[Mapping[str, float]],
+    prohibited_set: Set[str],
+    charging_nodes: Optional[list],
+    energy_cost: float,
+    energy_threshold: float,
+) -> Optional[RechargeFn]:
+    """Round trips with recharges (routing/energy.py), or None when the map and config name no charging node."""
+    from mars_exploration.routing.tiles import is_tiled_map
+
+    # Tiles do not carry the charging attribute: only load the full map for configured stations
+    if is_tiled_map(mars_map) and not (charging_nodes or charging_nodes_from_env()):
+        return None
+    router = get_energy_router(mars_map, multipliers)
+    stations = router.stations(charging_nodes or [])
+    if not stations:
+        return None
+    blocked = router.blocked_indices(prohibited_set)
+
+    def recharge(source: str, target_nodes: List[str]):
+        return router.route(source, target_nodes, blocked, stations - blocked, energy_cost, energy_threshold)
+
+    return recharge
+
+
+def iter_rover_candidates(
+    mars_map: str,
+    fleet: FleetTable,
+    goals: List[Dict[str, Any]],
+    prohibited_nodes: Optional[list] = None,
+    use_terrain_weight: bool = True,
+    energy_cost: float = 0.2,
+    energy_threshold: float = 5.0,
+    alternatives: Optional[int] = None,
+    charging_nodes: Optional[list] = None,
+) -> Iterator[rover_models.GoalCandidates]:
+    """
+    Rover GoalCandidates per goal, high -> medium -> low, computed lazily.
+
+    Rovers over the energy limit are routed through charging nodes (the map's
+    `charging` attribute, MARS_CHARGING_NODES and charging_nodes) when any exist.
+    """
+    prohibited_set = prohibited_node_set(prohibited_nodes)
+    multipliers = ROVER_TERRAIN_MULTIPLIERS if use_terrain_weight else None
+    route = chain_route(mars_map, multipliers, prohibited_set)
+    alternative = alternatives_fn(mars_map, multipliers, prohibited_set, alternatives)
+    recharge = recharge_fn(mars_map, multipliers, prohibited_set, charging_nodes, energy_cost, energy_threshold)
+    for goal in sort_goals(goals):
+        out = rover_goal_candidates(
+            fleet, parse_goal(goal), route, prohibited_set, energy_cost, energy_threshold,
+            alternatives=alternative, recharge=recharge,
+        )
+        observe_goal("rover", out)
+        yield out
+
+
+def iter_drone_candidates(
+    mars_map: str,
+    fleet: FleetTable,
+    goals: List[Dict[str, Any]],
+    prohibited_nodes: Optional[list] = None,
+    use_terrain_weight: bool = True,
+    flight_time_threshold: float = 240,
+    time_cost: float = 1.0,
+    alternatives: Optional[int] = None,
+) -> Iterator[drone_models.GoalCandidates]:
+    """Drone GoalCandidates per goal in priority order; time_cost is normalized here."""
+    time_cost = drone_time_cost(time_cost, use_terrain_weight)
+    prohibited_set = prohibited_node_set(prohibited_nodes)
+    multipliers = DRONE_TERRAIN_MULTIPLIERS if use_terrain_weight else None
+    route = chain_route(mars_map, multipliers, prohibited_set)
+    alternative = alternatives_fn(mars_map, multipliers, prohibited_set, alternatives)
+    for goal in sort_goals(goals):
+        out = drone_goal_candidates(
+            fleet, parse_goal(goal), route, prohibited_set, flight_time_threshold, time_cost, alternatives=alternative
+        )
+        observe_goal("drone", out)
+        yield out
+
+
+def sweep_rovers(
+    mars_map: str,
+    fleet: FleetTable,
+    goals: List[Dict[str, Any]],
+    prohibited_nodes: Optional[list] = None,
+    use_terrain_weight: bool = True,
+    energy_cost: Sequence[float] = (0.2,),
+    energy_threshold: Sequence[float] = (5.0,),
+    alternatives: Optional[int] = None,
+    charging_nodes: Optional[list] = None,
+) -> FeasibilityCube:
+    """Rover feasibility cube; over-limit rovers are routed through charging nodes per grid point."""
+    prohibited_set = prohibited_node_set(prohibited_nodes)
+    multipliers = ROVER_TERRAIN_MULTIPLIERS if use_terrain_weight else None
+    route = chain_route(mars_map, multipliers, prohibited_set)
+    alternative = alternatives_fn(mars_map, multipliers, prohibited_set, alternatives)
+
+    def recharge(cost: float, threshold: float):
+        return recharge_fn(mars_map, multipliers, prohibited_set, charging_nodes, cost, threshold)
+
+    parsed = [parse_goal(goal) for goal in sort_goals(goals)]
+    return rover_sweep(
+        fleet, parsed, route, prohibited_set, energy_cost, energy_threshold, alternatives=alternative, recharge=recharge
+    )
+
+
+def sweep_drones(
+    mars_map: str,
+    fleet: FleetTable,
+    goals: List[Dict[str, Any]],
+    prohibited_nodes: Optional[list] = None,
+    use_terrain_weight: bool = True,
+    flight_time_threshold: Sequence[float] = (240,),
+    time_cost: Sequence[float] = (1.0,),
+    alternatives: Optional[int] = None,
+) -> FeasibilityCube:
+    prohibited_set = prohibited_node_set(prohibited_nodes)
+    multipliers = DRONE_TERRAIN_MULTIPLIERS if use_terrain_weight else None
+    route = chain_route(mars_map, multipliers, prohibited_set)
+    parsed = [parse_goal(goal) for goal in sort_goals(goals)]
+    return drone_sweep(
+        fleet, parsed, route, prohibited_set,
+        flight_time_threshold, normalized_time_costs(time_cost, use_terrain_weight),
+        alternatives=alternatives_fn(mars_map, multipliers, prohibited_set, alternatives),
+    )
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Set, Tuple, TypeVar
+
+from mars_exploration.commons import metrics
+from mars_exploration.models import drone_models, rover_models
+
+
+# Hazard failover without a route search. Candidates computed with
+# alternatives (MARS_ROUTE_ALTERNATIVES, routing/alternatives.py) carry
+# alternative round trips that each avoid part of their primary path. When a
+# new hazard appears, the shortest route that avoids it is picked from those
+# lists; only vehicles whose every route is hit need the path tool again
+# (or planning/replanner.py).
+FAILOVERS = metrics.counter(
+    "mars_route_failovers_total", "Hazard failovers by outcome (kept, alternative, lost).", ("outcome",)
+)
+
+C = TypeVar("C")
+P = TypeVar("P")
+
+# vehicle -> (rejection model, id field, assignment field)
+_VEHICLES = {
+    "rover": (rover_models.RoverRejection, "rover_id", "selected_rover"),
+    "drone": (drone_models.DroneRejection, "drone_id", "selected_drone"),
+}
+
+
+def _hazard_set(hazards: Iterable[str]) -> Set[str]:
+    return hazards if isinstance(hazards, (set, frozenset)) else set(hazards)
+
+
+def failover(candidate: C, hazards: Iterable[str]) -> Optional[C]:
+    """
+    Rover or drone candidate on its shortest route that avoids every hazard
+    node: itself when its path is clear, a copy moved to the first clear
+    alternative, None when every route is hit.
+    """
+    hazards = _hazard_set(hazards)
+    if hazards.isdisjoint(candidate.path):
+        FAILOVERS.inc(outcome="kept")
+        return candidate
+    for i, alternative in enumerate(candidate.alternatives):
+        if hazards.isdisjoint(alternative.path):
+            FAILOVERS.inc(outcome="alternative")
+            remaining = [a for a in candidate.alternatives[i + 1:] if hazards.isdisjoint(a.path)]
+            return candidate.model_copy(update={**dict(alternative), "alternatives": remaining})
+    FAILOVERS.inc(outcome="lost")
+    return None
+
+
+def failover_goal(goal: P, hazards: Iterable[str], vehicle: str) -> P:
+    """
+    Rover or drone GoalCandidates after failover of every candidate; vehicles
+    left without a clear route move to no_candidates.
+    """
+    rejection, id_field, _ = _VEHICLES[vehicle]
+    hazards = _hazard_set(hazards)
+    candidates, rejections = [], list(goal.no_candidates)
+    for candidate in goal.candidates:
+        moved = failover(candidate, hazards)
+        if moved is not None:
+            candidates.append(moved)
+        else:
+            crossed = sorted(hazards.intersection(candidate.path))
+            rejections.append(
+                rejection(**{id_field: getattr(candidate, id_field), "reason": f"all precomputed routes cross new hazards {crossed}"})
+            )
+    return goal.model_copy(update={"candidates": candidates, "no_candidates": rejections})
+
+
+def failover_plan(plan: P, hazards: Iterable[str], vehicle: str) -> Tuple[P, List[str]]:
+    """
+    Rover or drone selection plan with every assignment on its best clear
+    route, plus the goal ids whose selected vehicle has none left (those
+    assignments are kept unchanged and need a new search).
+    """
+    _, _, field = _VEHICLES[vehicle]
+    hazards = _hazard_set(hazards)
+    assignments, lost = [], []
+    for assignment in plan.assignments:
+        moved = failover(getattr(assignment, field), hazards)
+        if moved is None:
+            lost.append(assignment.goal_id)
+            assignments.append(assignment)
+        else:
+            assignments.append(assignment.model_copy(update={field: moved}))
+    return plan.model_copy(update={"assignments": assignments}), lost
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from mars_exploration.models import drone_models, rover_models
+from mars_exploration.models.mission_context import ClassifiedGoal, ClassifiedItem, MissionClassification
+from mars_exploration.models.mission_spec import MissionSpec
+from mars_exploration.planning.candidates import priority_rank
+
+
+# Deterministic stand-ins for the LLM stages, used by MarsMissionFlow when a
+# stage misses its deadline (commons/deadlines.py). They follow the rules the
+# agents are prompted with, without the judgement: keyword classification,
+# tie-breaker selection with load balancing and a template plan.
+
+_NODE = re.compile(r"\bN\d+\b")
+_ROVER_WORDS = ("sample", "sampling", "drill", "collect", "measure", "analy", "soil", "subsurface", "ground")
+_DRONE_WORDS = ("image", "imaging", "photo", "panoram", "survey", "reconnaissance", "observ", "aerial", "map")
+_PROHIBIT_WORDS = ("no agent", "avoid", "prohibit", "forbid", "must not", "restricted", "unstable", "radioactive", "hazard")
+_ENERGY = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+_MINUTES = re.compile(r"(\d+(?:\.\d+)?)\s*min")
+
+
+def _vehicles_for_goal(description: str) -> List[str]:
+    text = description.lower()
+    rover = any(w in text for w in _ROVER_WORDS)
+    drone = any(w in text for w in _DRONE_WORDS)
+    if rover and not drone:
+        return ["rover"]
+    if drone and not rover:
+        return ["drone"]
+    return ["rover", "drone"]
+
+
+def _vehicles_for_item(text: str) -> List[str]:
+    lower = text.lower()
+    rover = "rover" in lower
+    drone = "drone" in lower
+    if rover != drone:
+        return ["rover"] if rover else ["drone"]
+    if "satellite" in lower and not (rover or drone):
+        return []
+    return ["rover", "drone"]
+
+
+def classify_item(text: str, hazard: bool) -> ClassifiedItem:
+    """Vehicle classes and prohibited nodes of one constraint (hazard=False) or hazard."""
+    prohibits = hazard or any(w in text.lower() for w in _PROHIBIT_WORDS)
+    return ClassifiedItem(
+        text=text,
+        vehicles=_vehicles_for_item(text),
+        nodes=_NODE.findall(text) if prohibits else [],
+    )
+
+
+def _first_number(pattern: re.Pattern, texts: Sequence[str], keyword: str) -> Optional[float]:
+    for text in texts:
+        if keyword in text.lower():
+            match = pattern.search(text)
+            if match:
+                return float(match.group(1))
+    return None
+
+
+def classify_spec(spec: MissionSpec) -> MissionClassification:
+    """Keyword classification of a mission summary (stand-in for the classification crew)."""
+    constraints = list(spec.constraints)
+    return MissionClassification(
+        goals=[
+            ClassifiedGoal(**goal.model_dump(), vehicles=_vehicles_for_goal(goal.description))
+            for goal in spec.scientific_goals
+        ],
+        constraints=[classify_item(c, hazard=False) for c in constraints],
+        hazards=[classify_item(h, hazard=True) for h in spec.hazards],
+        energy_threshold=_first_number(_ENERGY, constraints, "rover"),
+        flight_time_threshold=_first_number(_MINUTES, constraints, "drone"),
+    )
+
+
+def _resolution(value: str) -> float:
+    match = re.search(r"\d+(?:\.\d+)?", value or "")
+    return float(match.group(0)) if match else 0.0
+
+
+def _goal_fields(goal) -> Dict[str, object]:
+    return dict(
+        goal_id=goal.goal_id,
+        description=goal.description,
+        priority=goal.priority,
+        terrain=goal.terrain,
+        target_nodes=list(goal.target_nodes),
+    )
+
+
+def _failure_reason(rejections, id_field: str) -> str:
+    if not rejections:
+        return "No vehicle could be evaluated for this goal."
+    return "; ".join(f"{getattr(r, id_field)}: {r.reason}" for r in rejections)
+
+
+def select_rovers(possible: Sequence[rover_models.GoalCandidates]) -> rover_models.RoverSelectionPlan:
+    """
+    One rover per goal with candidates, high priority first: least-used rover,
+    then lower energy_required, then shorter distance.
+    """
+    used: Counter = Counter()
+    plan = rover_models.RoverSelectionPlan()
+    for goal in sorted(possible, key=lambda g: priority_rank(g.priority)):
+        if not goal.candidates:
+            plan.failures.append(
+                rover_models.RoverGoalFailure(**_goal_fields(goal), reason=_failure_reason(goal.no_candidates, "rover_id"))
+            )
+            continue
+        best = min(goal.candidates, key=lambda c: (used[c.rover_id], c.energy_required, c.distance))
+        used[best.rover_id] += 1
+        plan.assignments.append(
+            rover_models.RoverGoalAssignment(
+                **_goal_fields(goal),
+                selected_rover=best,
+                selection_reason=(
+                    f"Deterministic selection: {best.rover_id} had {used[best.rover_id] - 1} prior assignments and "
+                    f"the lowest energy_required ({best.energy_required:.2f}) among the least-used feasible rovers."
+                ),
+            )
+        )
+    return plan
+
+
+def select_drones(possible: Sequence[drone_models.GoalCandidates]) -> drone_models.DroneSelectionPlan:
+    """
+    One drone per goal with candidates, high priority first: least-used drone,
+    then higher camera resolution, higher altitude, lower time_required.
+    """
+    used: Counter = Counter()
+    plan = drone_models.DroneSelectionPlan()
+    for goal in sorted(possible, key=lambda g: priority_rank(g.priority)):
+        if not goal.candidates:
+            plan.failures.append(
+                drone_models.DroneGoalFailure(**_goal_fields(goal), reason=_failure_reason(goal.no_candidates, "drone_id"))
+            )
+            continue
+        best = min(
+            goal.candidates,
+            key=lambda c: (used[c.drone_id], -_resolution(c.camera_resolution), -c.altitude, c.time_required),
+        )
+        used[best.drone_id] += 1
+        plan.assignments.append(
+            drone_models.DroneGoalAssignment(
+                **_goal_fields(goal),
+                selected_drone=best,
+                selection_reason=(
+                    f"Deterministic selection: {best.drone_id} had {used[best.drone_id] - 1} prior assignments and the "
+                    f"best camera ({best.camera_resolution}) / altitude ({best.altitude:g}) among the least-used feasible drones."
+                ),
+            )
+        )
+    return plan
+
+
+def degraded_note(degraded_stages: Sequence[str]) -> str:
+    """Markdown banner put at the top of a plan built with fallbacks."""
+    return (
+        f"> **Degraded plan:** {', '.join(degraded_stages)} exceeded their deadline and used deterministic fallbacks.\n\n"
+    )
+
+
+def render_plan(
+    spec: MissionSpec,
+    rover_plan: Optional[rover_models.RoverSelectionPlan],
+    drone_plan: Optional[drone_models.DroneSelectionPlan],
+    rover_schedule: Optional[rover_models.RoverFleetSchedule] = None,
+) -> str:
+    """Template Markdown mission plan (stand-in for the integration crew). Rovers take precedence on shared goals."""
+    rovers = {a.goal_id: a for a in (rover_plan.assignments if rover_plan else [])}
+    timings = {s.rover_id: s for s in (rover_schedule.schedules if rover_schedule else [])}
+    drones = {a.goal_id: a for a in (drone_plan.assignments if drone_plan else [])}
+    failures: Dict[str, List[str]] = {}
+    for plan in (rover_plan, drone_plan):
+        for f in (plan.failures if plan else []):
+            failures.setdefault(f.goal_id, []).append(f.reason)
+
+    lines = [f"# {spec.mission_title}", "", "## Mission Overview", "", spec.mission_description, "", "## Mission strategy", ""]
+
+    unassigned = []
+    for goal in sorted(spec.scientific_goals, key=lambda g: priority_rank(g.priority)):
+        lines.append(f"### {goal.goal_id} ({goal.priority}): {goal.description}")
+        if goal.goal_id in rovers:
+            rover = rovers[goal.goal_id].selected_rover
+            lines += [
+                f"1. {rover.rover_id} departs from {rover.location}"
+                + (" after recharging" if rover.recharge_before else "")
+                + f" and drives {' -> '.join(rover.path)}.",
+                f"2. It works at {', '.join(goal.target_nodes)} and returns to {rover.location} "
+                f"(distance {rover.distance:g}, energy {rover.energy_required:.1f})"
+                + (f", recharging at {', '.join(rover.recharge_stops)}." if rover.recharge_stops else "."),
+            ]
+            timing = timings.get(rover.rover_id)
+            if timing is not None:
+                lines.append(
+                    f"3. Conflict-free timing: departs at t={timing.start:g}, waits {timing.wait_time:g} "
+                    f"in total and is back at t={timing.finish:g} via {' -> '.join(timing.path)}."
+                )
+        elif goal.goal_id in drones:
+            drone = drones[goal.goal_id].selected_drone
+            lines += [
+                f"1. {drone.drone_id} takes off from {drone.location} at {drone.altitude:g} m and flies {' -> '.join(drone.path)}.",
+                f"2. It images {', '.join(goal.target_nodes)} with its {drone.camera_resolution} camera and lands at "
+                f"{drone.location} ({drone.time_required:g} min).",
+            ]
+        else:
+            unassigned.append(goal.goal_id)
+            lines.append(f"Not assigned: {' / '.join(failures.get(goal.goal_id, ['no vehicle plan covers this goal']))}")
+        lines.append("")
+
+    if spec.constraints or spec.hazards:
+        lines += ["## Constraints and hazards", ""] + [f"- {c}" for c in (*spec.constraints, *spec.hazards)] + [""]
+    if unassigned:
+        lines += ["## Goals not completed", ""] + [f"- {g}" for g in unassigned] + [""]
+    return "\n".join(lines)
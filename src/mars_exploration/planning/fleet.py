@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from mars_exploration.commons import tracing
+from mars_exploration.models import drone_models, rover_models
+from mars_exploration.planning.candidates import AlternativesFn, RechargeFn, RouteFn, normalize_terrain
+from mars_exploration.routing.engine import NodeNotFoundError, NoPathError
+
+
+# Per-vehicle outcome codes, in the order the checks run.
+SKIP = 0  # malformed vehicle without id
+MISSING_LOCATION = 1
+PROHIBITED_START = 2
+INCOMPATIBLE_TERRAIN = 3
+NO_TARGETS = 4
+NO_PATH = 5
+NODE_NOT_FOUND = 6
+OVER_LIMIT = 7  # rover energy / drone time
+FEASIBLE = 8
+
+
+def _float(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class FleetTable:
+    """
+    Columnar view of a rover or drone fleet, parsed once.
+
+    data is a NumPy structured array with one row per vehicle:
+      id, location, origin (index into origins), valid (has an id),
+      energy, speed, range, altitude, compat (terrain bitmask).
+    Terrain names get one bit each in terrain_bits; compat_lists keeps the
+    normalized compatibility lists for rejection messages.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        ids = [str(r.get("id", "")).strip() for r in records]
+        locations = [str(r.get("location", "")).strip() for r in records]
+
+        self.compat_lists: List[List[str]] = [
+            [normalize_terrain(x) for x in (r.get("terrain_compatibility") or []) if x] for r in records
+        ]
+        self.terrain_bits: Dict[str, int] = {}
+        for compat in self.compat_lists:
+            for terrain in compat:
+                self.terrain_bits.setdefault(terrain, len(self.terrain_bits))
+        if len(self.terrain_bits) > 64:
+            raise ValueError("fleet uses more than 64 distinct terrain types")
+
+        self.origins: List[str] = sorted(set(locations))
+        origin_of = {loc: i for i, loc in enumerate(self.origins)}
+
+        width = max([len(x) for x in ids + locations] + [1])
+        dtype = np.dtype([
+            ("id", f"U{width}"),
+            ("location", f"U{width}"),
+            ("origin", np.int32),
+            ("valid", np.bool_),
+            ("energy", np.float64),
+            ("speed", np.float64),
+            ("range", np.float64),
+            ("altitude", np.float64),
+            ("compat", np.uint64),
+        ])
+        data = np.zeros(len(records), dtype=dtype)
+        data["id"] = ids
+        data["location"] = locations
+        data["origin"] = [origin_of[loc] for loc in locations]
+        data["valid"] = [bool(x) for x in ids]
+        data["energy"] = [_float(r.get("energy")) for r in records]
+        data["speed"] = [_float(r.get("speed")) for r in records]
+        data["range"] = [_float(r.get("range")) for r in records]
+        data["altitude"] = [_float(r.get("altitude")) for r in records]
+        data["compat"] = [
+            sum(1 << self.terrain_bits[t] for t in set(compat)) for compat in self.compat_lists
+        ]
+        self.data = data
+        self.camera_resolution: List[str] = [str(r.get("camera_resolution", "")) for r in records]
+
+    def __len__(self) -> int:
+        return int(self.data.shape[0])
+
+    def compatible(self, terrain: str) -> np.ndarray:
+        """Vehicles that support a (normalized) goal terrain; all of them if terrain is empty."""
+        if not terrain:
+            return np.ones(len(self), dtype=bool)
+        bit = self.terrain_bits.get(terrain)
+        if bit is None:
+            return np.zeros(len(self), dtype=bool)
+        return (self.data["compat"] & np.uint64(1 << bit)) != 0
+
+    def prohibited_starts(self, prohibited_set: Set[str]) -> np.ndarray:
+        bad = [i for i, loc in enumerate(self.origins) if loc in prohibited_set]
+        return np.isin(self.data["origin"], bad)
+
+
+class RouteTable:
+    """
+    Round-trip routes of one goal, computed once per distinct vehicle origin.
+
+    distances() returns a distance per vehicle (NaN when there is no route)
+    together with per-vehicle outcome codes for route failures. With an
+    alternatives function, alternative round trips are kept per origin too.
+    """
+
+    def __init__(
+        self,
+        table: FleetTable,
+        route: RouteFn,
+        target_nodes: List[str],
+        alternatives: Optional[AlternativesFn] = None,
+    ):
+        self.table = table
+        self.route = route
+        self.target_nodes = target_nodes
+        self.alternatives_fn = alternatives
+        self.dist = np.full(len(table.origins), np.nan)
+        self.status = np.full(len(table.origins), FEASIBLE, dtype=np.int8)
+        self.paths: Dict[int, List[str]] = {}
+        self.alternatives: Dict[int, List[Tuple[float, List[str]]]] = {}
+        self.errors: Dict[int, str] = {}
+
+    def compute(self, needed: np.ndarray) -> None:
+        """Route every origin used by a vehicle in the needed mask."""
+        origins = [
+            o for o in np.unique(self.table.data["origin"][needed]).tolist()
+            if o not in self.paths and o not in self.errors
+        ]
+        if not origins:
+            return
+        with tracing.span("routing.batch", "routing", origins=len(origins), targets=len(self.target_nodes)):
+            for o in origins:
+                try:
+                    distance, path = self.route(self.table.origins[o], self.target_nodes)
+                except NoPathError:
+                    self.status[o] = NO_PATH
+                    self.errors[o] = ""
+                except NodeNotFoundError as e:
+                    self.status[o] = NODE_NOT_FOUND
+                    self.errors[o] = str(e)
+                else:
+                    self.dist[o] = distance
+                    self.paths[o] = path
+                    if self.alternatives_fn is not None:
+                        self.alternatives[o] = self.alternatives_fn(self.table.origins[o], self.target_nodes)
+
+    def distances(self) -> Tuple[np.ndarray, np.ndarray]:
+        origin = self.table.data["origin"]
+        return self.dist[origin], self.status[origin]
+
+
+def _goal_model(model, goal: Dict[str, Any], candidates: List[dict], rejections: List[dict]):
+    """
+    Build one GoalCandidates from plain dicts in a single validation call.
+
+    Validating the whole goal at once is cheaper than constructing every
+    candidate model separately (and, on pydantic 2.11+, than model_construct).
+    """
+    return model.model_validate({**goal, "candidates": candidates, "no_candidates": rejections})
+
+
+def _rover_alternatives(routes, energy: float, energy_cost: float, energy_threshold: float) -> List[dict]:
+    """Alternative round trips that pass the same energy rule as the primary route."""
+    out = []
+    for distance, path in routes or ():
+        required = distance * float(energy_cost)
+        if 100.0 - required >= float(energy_threshold):
+            out.append({
+                "path": list(path),
+                "distance": distance,
+                "energy_required": required,
+                "recharge_before": energy - required <= float(energy_threshold),
+            })
+    return out
+
+
+def _drone_alternatives(routes, max_time: float, time_cost: float) -> List[dict]:
+    """Alternative round trips within the drone's flight-time limit."""
+    return [
+        {"path": list(path), "distance": distance, "time_required": distance * time_cost}
+        for distance, path in routes or ()
+        if distance * time_cost <= max_time
+    ]
+
+
+def static_checks(table: FleetTable, goal: Dict[str, Any], prohibited_set: Set[str], terrain_check: bool) -> np.ndarray:
+    """Outcome codes of the route-independent checks (FEASIBLE = still open)."""
+    data = table.data
+    status = np.full(len(table), FEASIBLE, dtype=np.int8)
+    if not goal["target_nodes"]:
+        status[:] = NO_TARGETS
+    if terrain_check:
+        status[~table.compatible(goal["terrain"])] = INCOMPATIBLE_TERRAIN
+    if prohibited_set:
+        status[table.prohibited_starts(prohibited_set)] = PROHIBITED_START
+    status[data["location"] == ""] = MISSING_LOCATION
+    status[~data["valid"]] = SKIP
+    return status
+
+
+def rover_goal_candidates(
+    table: FleetTable,
+    goal: Dict[str, Any],
+    route: RouteFn,
+    prohibited_set: Set[str],
+    energy_cost: float,
+    energy_threshold: float,
+    routes: Optional[RouteTable] = None,
+    alternatives: Optional[AlternativesFn] = None,
+    recharge: Optional[RechargeFn] = None,
+) -> rover_models.GoalCandidates:
+    """
+    Vectorized rover feasibility for one parsed goal.
+
+    A rover is a candidate only if its terrain is compatible, a round-trip
+    route exists that avoids prohibited nodes, and
+    100 - (distance * energy_cost) >= energy_threshold. Rovers without id are
+    skipped. Routes are computed once per distinct origin. With a recharge
+    function, rovers over the energy limit get a route with recharge stops
+    instead when one exists.
+    """
+    data = table.data
+    status = static_checks(table, goal, prohibited_set, terrain_check=True)
+
+    routes = routes or RouteTable(table, route, goal["target_nodes"], alternatives)
+    routes.compute(status == FEASIBLE)
+    dist, route_status = routes.distances()
+    open_ = status == FEASIBLE
+    status[open_] = route_status[open_]
+
+    energy_required = dist * float(energy_cost)
+    over = (100.0 - energy_required) < float(energy_threshold)
+    status[(status == FEASIBLE) & over] = OVER_LIMIT
+    recharge_before = (data["energy"] - energy_required) <= float(energy_threshold)
+
+    # Over the limit on one battery: plan recharges at charging nodes (per origin)
+    recharged: Dict[int, Tuple[float, List[str], List[str], float]] = {}
+    if recharge is not None:
+        over_limit = status == OVER_LIMIT
+        for o in np.unique(data["origin"][over_limit]).tolist():
+            try:
+                recharged[o] = recharge(table.origins[o], goal["target_nodes"])
+            except (NoPathError, NodeNotFoundError):
+                continue
+        status[over_limit & np.isin(data["origin"], list(recharged))] = FEASIBLE
+
+    feasible = np.flatnonzero(status == FEASIBLE)
+    if feasible.size:
+        paths = routes.paths
+        candidates = []
+        for rover_id, o, d, e, r, v, loc, energy in zip(
+            data["id"][feasible].tolist(),
+            data["origin"][feasible].tolist(),
+            dist[feasible].tolist(),
+            energy_required[feasible].tolist(),
+            recharge_before[feasible].tolist(),
+            data["speed"][feasible].tolist(),
+            data["location"][feasible].tolist(),
+            data["energy"][feasible].tolist(),
+        ):
+            if o in recharged:
+                d, path, stops, first_energy = recharged[o]
+                candidates.append({
+                    "rover_id": rover_id,
+                    "path": list(path),
+                    "distance": d,
+                    "energy_required": d * float(energy_cost),
+                    "recharge_before": energy - first_energy <= float(energy_threshold),
+                    "speed": v,
+                    "location": loc,
+                    "recharge_stops": list(stops),
+                })
+                continue
+            candidates.append({
+                "rover_id": rover_id,
+                "path": list(paths[o]),
+                "distance": d,
+                "energy_required": e,
+                "recharge_before": r,
+                "speed": v,
+                "location": loc,
+                "alternatives": _rover_alternatives(routes.alternatives.get(o), energy, energy_cost, energy_threshold),
+            })
+        return _goal_model(rover_models.GoalCandidates, goal, candidates, [])
+
+    target_nodes = goal["target_nodes"]
+    ids, locations, origins = data["id"].tolist(), data["location"].tolist(), data["origin"].tolist()
+    rejections = []
+    for i, code in enumerate(status.tolist()):
+        if code == SKIP:
+            continue
+        source = locations[i]
+        if code == MISSING_LOCATION:
+            reason = "missing rover.location"
+        elif code == PROHIBITED_START:
+            reason = f"rover starts on prohibited node {source}"
+        elif code == INCOMPATIBLE_TERRAIN:
+            reason = f"incompatible terrain: rover supports {table.compat_lists[i]}, goal requires '{goal['terrain']}'"
+        elif code == NO_TARGETS:
+            reason = "Goal has no target_nodes. It is not a clear goal."
+        elif code == NO_PATH:
+            reason = f"no path for chained route from {source} to targets {target_nodes} and return"
+        elif code == NODE_NOT_FOUND:
+            reason = f"node not found: {routes.errors[origins[i]]}"
+        else:
+            total_distance = float(dist[i])
+            reason = (
+                f"energy infeasible even after recharge: "
+                f"100 - {float(energy_required[i]):.2f} < {energy_threshold} = (full battery - energy cost) < energy threshold. Total distance {total_distance}"
+            )
+            if recharge is not None:
+                reason += ". No route with recharges at charging nodes either"
+        rejections.append({"rover_id": ids[i], "reason": reason})
+    return _goal_model(rover_models.GoalCandidates, goal, [], rejections)
+
+
+def drone_goal_candidates(
+    table: FleetTable,
+    goal: Dict[str, Any],
+    route: RouteFn,
+    prohibited_set: Set[str],
+    flight_time_threshold: float,
+    time_cost: float,
+    routes: Optional[RouteTable] = None,
+    alternatives: Optional[AlternativesFn] = None,
+) -> drone_models.GoalCandidates:
+    """
+    Vectorized drone feasibility for one parsed goal.
+
+    The round trip must exist after removing prohibited nodes and
+    distance * time_cost must fit in min(flight_time_threshold, drone range).
+    Drones without id are skipped. time_cost is expected to be normalized
+    with drone_time_cost().
+    """
+    data = table.data
+    status = static_checks(table, goal, prohibited_set, terrain_check=False)
+
+    routes = routes or RouteTable(table, route, goal["target_nodes"], alternatives)
+    routes.compute(status == FEASIBLE)
+    dist, route_status = routes.distances()
+    open_ = status == FEASIBLE
+    status[open_] = route_status[open_]
+
+    max_time = np.minimum(flight_time_threshold, data["range"])
+    time_required = dist * time_cost
+    status[(status == FEASIBLE) & (time_required > max_time)] = OVER_LIMIT
+
+    feasible = np.flatnonzero(status == FEASIBLE)
+    if feasible.size:
+        paths = routes.paths
+        cameras = table.camera_resolution
+        candidates = [
+            {
+                "drone_id": drone_id,
+                "path": list(paths[o]),
+                "distance": d,
+                "time_required": t,
+                "location": loc,
+                "altitude": alt,
+                "camera_resolution": cameras[i],
+                "alternatives": _drone_alternatives(routes.alternatives.get(o), limit, time_cost),
+            }
+            for i, drone_id, o, d, t, loc, alt, limit in zip(
+                feasible.tolist(),
+                data["id"][feasible].tolist(),
+                data["origin"][feasible].tolist(),
+                dist[feasible].tolist(),
+                time_required[feasible].tolist(),
+                data["location"][feasible].tolist(),
+                data["altitude"][feasible].tolist(),
+                max_time[feasible].tolist(),
+            )
+        ]
+        return _goal_model(drone_models.GoalCandidates, goal, candidates, [])
+
+    target_nodes = goal["target_nodes"]
+    ids, locations, origins = data["id"].tolist(), data["location"].tolist(), data["origin"].tolist()
+    rejections = []
+    for i, code in enumerate(status.tolist()):
+        if code == SKIP:
+            continue
+        start = locations[i]
+        if code == MISSING_LOCATION:
+            reason = "missing drone.location"
+        elif code == PROHIBITED_START:
+            reason = f"drone starts on prohibited node {start}"
+        elif code == NO_TARGETS:
+            reason = "Goal has no target_nodes. It is not a clear goal."
+        elif code == NO_PATH:
+            reason = f"no path found to complete goal from {start} to {target_nodes}"
+        elif code == NODE_NOT_FOUND:
+            reason = f"node not found: {routes.errors[origins[i]]}"
+        else:
+            reason = f"time exceeds limit: {float(time_required[i]):.2f}. Limit of drone is {float(max_time[i]):.2f}"
+        rejections.append({"drone_id": ids[i], "reason": reason})
+    return _goal_model(drone_models.GoalCandidates, goal, [], rejections)
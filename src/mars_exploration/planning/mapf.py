@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from mars_exploration.commons import metrics, tracing
+from mars_exploration.models.rover_models import (
+    RoverFleetSchedule,
+    RoverGoalAssignment,
+    RoverSchedule,
+    RoverSelectionPlan,
+    TimedStop,
+)
+from mars_exploration.planning.candidates import priority_rank
+from mars_exploration.routing.compiled_map import CompiledMap, load_map
+from mars_exploration.routing.cost_models import ROVER_TERRAIN_MULTIPLIERS
+from mars_exploration.routing.engine import NoPathError, NodeNotFoundError, dijkstra
+
+
+# Conflict-free timing for the selected rovers (multi-agent path finding).
+#
+# Rovers are selected one goal at a time, so two of them can be sent through
+# the same node at the same time. After selection, every rover's itinerary
+# (all of its assignments, start -> targets -> start) is planned on the
+# compiled graph in time: an edge takes ceil(cost / (speed * tick)) ticks.
+# Rovers are planned one after another (prioritized planning, high priority
+# goals and long trips first); each one runs a space-time A* against a
+# reservation table of the rovers before it, so it waits or takes an equally
+# short route instead of meeting them. Recharge stops stay on the route.
+#
+# A node holds one rover per tick, two rovers never cross on an edge and never
+# overtake each other on one. Rover start nodes are bases with room for every
+# rover, so a rover can always wait at its base until the others are back:
+# the search never fails for lack of time. Routes may be up to
+# MARS_MAPF_DETOUR (fraction, default 0) longer than the shortest ones; the
+# energy of a longer route is recomputed but not checked against the battery
+# again.
+MAPF_TICK_ENV = "MARS_MAPF_TICK"
+MAPF_DETOUR_ENV = "MARS_MAPF_DETOUR"
+
+SCHEDULE_CONFLICTS = metrics.counter(
+    "mars_schedule_conflicts_total", "Conflicts between selected rover routes resolved by the scheduler."
+)
+
+# (node, arrival tick, departure tick)
+Stop = Tuple[int, int, int]
+
+
+def schedule_tick() -> float:
+    return float(os.getenv(MAPF_TICK_ENV, "1.0"))
+
+
+def schedule_detour() -> float:
+    return max(0.0, float(os.getenv(MAPF_DETOUR_ENV, "0")))
+
+
+def _schedule_map(map_path: str) -> CompiledMap:
+    """Compiled map for map_path; a tiled map is scheduled on the graphml it was built from."""
+    from mars_exploration.routing.tiles import source_map_path
+
+    return load_map(source_map_path(map_path))
+
+
+class ReservationTable:
+    """Node ticks and edge intervals claimed by the rovers planned so far. Nodes in shared are never claimed."""
+
+    def __init__(self, shared: FrozenSet[int] = frozenset()):
+        self.shared = shared
+        self.nodes: Dict[int, Set[int]] = {}
+        self.edges: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        self.last = 0
+
+    def node_free(self, node: int, t: int) -> bool:
+        return node in self.shared or t not in self.nodes.get(node, ())
+
+    def edge_free(self, u: int, v: int, t0: int, t1: int) -> bool:
+        """u -> v during [t0, t1] neither meets a rover coming the other way nor overtakes or is overtaken."""
+        for a, b in self.edges.get((v, u), ()):
+            if a < t1 and t0 < b:
+                return False
+        for a, b in self.edges.get((u, v), ()):
+            if (t0 - a) * (t1 - b) <= 0:
+                return False
+        return True
+
+    def conflicts(self, stops: Sequence[Stop]) -> int:
+        """Ticks and edges of a timed route that collide with the reservations."""
+        count = 0
+        for i, (node, arrival, departure) in enumerate(stops):
+            count += sum(not self.node_free(node, t) for t in range(arrival, departure + 1))
+            if i + 1 < len(stops):
+                count += not self.edge_free(node, stops[i + 1][0], departure, stops[i + 1][1])
+        return count
+
+    def reserve(self, stops: Sequence[Stop]) -> None:
+        for i, (node, arrival, departure) in enumerate(stops):
+            if node not in self.shared:
+                self.nodes.setdefault(node, set()).update(range(arrival, departure + 1))
+            if i + 1 < len(stops):
+                self.edges.setdefault((node, stops[i + 1][0]), []).append((departure, stops[i + 1][1]))
+            self.last = max(self.last, departure)
+
+
+def _stops_in_order(path: Sequence[str], targets: Sequence[str], recharges: Sequence[str]) -> List[str]:
+    """Targets and recharge stops in the order path reaches them (a route with recharges must keep its stations)."""
+    if not recharges:
+        return list(targets)
+    out: List[str] = []
+    t = r = 0
+    for node in path[1:]:
+        if t < len(targets) and node == targets[t]:
+            out.append(node)
+            t += 1
+        elif r < len(recharges) and node == recharges[r]:
+            out.append(node)
+            r += 1
+    return out + list(targets[t:])
+
+
+class _Rover:
+    def __init__(self, rover_id: str, assignments: List[RoverGoalAssignment]):
+        first = assignments[0].selected_rover
+        self.rover_id = rover_id
+        self.goal_ids = [a.goal_id for a in assignments]
+        self.speed = float(first.speed)
+        if self.speed <= 0:
+            raise ValueError(f"{rover_id} has speed {first.speed}; scheduling needs a positive speed")
+        self.energy_per_distance = first.energy_required / first.distance if first.distance else 0.0
+        self.rank = min(priority_rank(a.priority) for a in assignments)
+        self.path: List[str] = []
+        waypoints: List[str] = []
+        for a in assignments:
+            rover = a.selected_rover
+            self.path.extend(rover.path if not self.path else rover.path[1:])
+            waypoints.extend([rover.location, *_stops_in_order(rover.path, a.target_nodes, rover.recharge_stops), rover.location])
+        self.waypoints = [n for i, n in enumerate(waypoints) if i == 0 or n != waypoints[i - 1]]
+
+
+class _Scheduler:
+    """Time-expanded searches over one compiled map and cost model; distance labels are shared by every rover."""
+
+    def __init__(self, cmap: CompiledMap, multipliers, blocked: FrozenSet[int], tick: float, detour: float):
+        self.cmap = cmap
+        self.weights = cmap.edge_weights(multipliers)
+        self.blocked = blocked
+        self.tick = tick
+        self.detour = detour
+        self._adj: Dict[int, List[Tuple[int, float]]] = {}
+        self._dist: Dict[int, Dict[int, float]] = {}
+        self.states = 0
+
+    def index(self, node: str) -> int:
+        i = self.cmap.index_of(node)
+        if i is None:
+            raise NodeNotFoundError(f"Node {node} not found in graph")
+        return i
+
+    def neighbours(self, u: int) -> List[Tuple[int, float]]:
+        adj = self._adj.get(u)
+        if adj is None:
+            lo, hi = int(self.cmap.indptr[u]), int(self.cmap.indptr[u + 1])
+            best: Dict[int, float] = {}
+            for v, w in zip(self.cmap.indices[lo:hi].tolist(), self.weights[lo:hi].tolist()):
+                if v != u and v not in self.blocked and w < best.get(v, math.inf):
+                    best[v] = w
+            adj = self._adj[u] = list(best.items())
+        return adj
+
+    def distances_to(self, target: int) -> Dict[int, float]:
+        """Shortest distance from every node to target (the map is undirected)."""
+        dist = self._dist.get(target)
+        if dist is None:
+            dist = self._dist[target] = dijkstra(
+                self.cmap.indptr, self.cmap.indices, self.weights, target, blocked=self.blocked
+            )[0]
+        return dist
+
+    def ticks(self, cost: float, speed: float) -> int:
+        return max(1, math.ceil(cost / (speed * self.tick) - 1e-9))
+
+    def timed(self, path: Sequence[str], speed: float) -> Optional[List[Stop]]:
+        """path driven without waiting from tick 0, None when it is not a walk on the map."""
+        stops: List[Stop] = []
+        t = 0
+        for i, node in enumerate(path):
+            u = self.cmap.index_of(node)
+            if u is None:
+                return None
+            if stops:
+                w = dict(self.neighbours(stops[-1][0])).get(u)
+                if w is None:
+                    return None
+                t += self.ticks(w, speed)
+            stops.append((u, t, t))
+        return stops
+
+    def search(self, rover: _Rover, table: ReservationTable) -> Tuple[List[Stop], float]:
+        """
+        Earliest conflict-free timed route through rover.waypoints (space-time
+        A* over (node, tick, next waypoint)) and its distance.
+        """
+        waypoints = [self.index(n) for n in rover.waypoints]
+        for w in waypoints:
+            if w in self.blocked:
+                raise NoPathError(f"Waypoint {self.cmap.node_id(w)} of {rover.rover_id} is prohibited")
+        dists = [self.distances_to(w) for w in waypoints]
+        # Shortest remaining distance after reaching waypoint j
+        rest = [0.0] * len(waypoints)
+        for j in range(len(waypoints) - 2, -1, -1):
+            leg = dists[j + 1].get(waypoints[j])
+            if leg is None:
+                raise NoPathError(f"No path from {rover.waypoints[j]} to {rover.waypoints[j + 1]}.")
+            rest[j] = leg + rest[j + 1]
+
+        budget = rest[0] * (1.0 + self.detour) + 1e-6
+        speed, tick = rover.speed, self.tick
+        # Once every earlier rover is back at its base the map is free, so
+        # waiting longer than that never helps
+        horizon = table.last + 1
+        last = len(waypoints)
+
+        def advance(u: int, j: int) -> int:
+            while j < last and u == waypoints[j]:
+                j += 1
+            return j
+
+        def remaining(u: int, j: int) -> float:
+            return dists[j].get(u, math.inf) + rest[j] if j < last else 0.0
+
+        start = (waypoints[0], 0, advance(waypoints[0], 1))
+        best = {start: 0.0}
+        parent: Dict[Tuple[int, int, int], Tuple[int, int, int]] = {}
+        heap = [(remaining(start[0], start[2]) / (speed * tick), 0.0, 0, start)]
+        seq = 0
+        while heap:
+            _, g, _, state = heapq.heappop(heap)
+            u, t, j = state
+            if g > best.get(state, math.inf):
+                continue
+            self.states += 1
+            if j == last:
+                return self._unwind(state, parent), g
+
+            moves = [(u, 1, 0.0)] if t < horizon and table.node_free(u, t + 1) else []
+            for v, w in self.neighbours(u):
+                moves.append((v, self.ticks(w, speed), w))
+            for v, k, w in moves:
+                if v != u and not (table.node_free(v, t + k) and table.edge_free(u, v, t, t + k)):
+                    continue
+                nj = advance(v, j) if v != u else j
+                ng = g + w
+                h = remaining(v, nj)
+                if ng + h > budget:
+                    continue
+                nxt = (v, t + k, nj)
+                if ng < best.get(nxt, math.inf):
+                    best[nxt] = ng
+                    parent[nxt] = state
+                    seq += 1
+                    heapq.heappush(heap, (t + k + h / (speed * tick), ng, seq, nxt))
+        raise NoPathError(f"No conflict-free route for {rover.rover_id} within {horizon} ticks.")
+
+    @staticmethod
+    def _unwind(state, parent) -> List[Stop]:
+        chain = [state]
+        while chain[-1] in parent:
+            chain.append(parent[chain[-1]])
+        chain.reverse()
+        stops: List[Stop] = []
+        for u, t, _ in chain:
+            if stops and stops[-1][0] == u:
+                stops[-1] = (u, stops[-1][1], t)
+            else:
+                stops.append((u, t, t))
+        return stops
+
+
+def _rovers(plan: RoverSelectionPlan) -> List[_Rover]:
+    by_rover: Dict[str, List[RoverGoalAssignment]] = {}
+    for a in sorted(plan.assignments, key=lambda a: priority_rank(a.priority)):
+        by_rover.setdefault(a.selected_rover.rover_id, []).append(a)
+    return [_Rover(rover_id, assignments) for rover_id, assignments in by_rover.items()]
+
+
+def schedule_rovers(
+    plan: RoverSelectionPlan,
+    mars_map: str,
+    prohibited_nodes: Iterable[str] = (),
+    use_terrain_weight: bool = True,
+    tick: Optional[float] = None,
+    detour: Optional[float] = None,
+) -> RoverFleetSchedule:
+    """
+    Conflict-free timed routes for every rover of a selection plan.
+
+    A rover with several assignments drives them one after another. tick and
+    detour default to MARS_MAPF_TICK and MARS_MAPF_DETOUR.
+    """
+    tick = schedule_tick() if tick is None else tick
+    detour = schedule_detour() if detour is None else detour
+    if tick <= 0:
+        raise ValueError(f"tick must be positive, got {tick}")
+    rovers = _rovers(plan)
+    if not rovers:
+        return RoverFleetSchedule(tick=tick)
+
+    cmap = _schedule_map(mars_map)
+    multipliers = ROVER_TERRAIN_MULTIPLIERS if use_terrain_weight else None
+    blocked = frozenset(i for i in map(cmap.index_of, prohibited_nodes) if i is not None)
+    scheduler = _Scheduler(cmap, multipliers, blocked, tick, detour)
+    bases = frozenset(scheduler.index(r.waypoints[0]) for r in rovers)
+
+    with tracing.span("routing.schedule", "routing", rovers=len(rovers)) as span:
+        # Conflicts if every rover drove its selected route from tick 0
+        naive = ReservationTable(bases)
+        conflicts = 0
+        duration: Dict[str, int] = {}
+        for rover in rovers:
+            stops = scheduler.timed(rover.path, rover.speed)
+            if stops is not None:
+                conflicts += naive.conflicts(stops)
+                naive.reserve(stops)
+                duration[rover.rover_id] = stops[-1][1]
+
+        # Prioritized planning: high priority goals, then longest trips, first
+        table = ReservationTable(bases)
+        schedules: List[RoverSchedule] = []
+        for rover in sorted(rovers, key=lambda r: (r.rank, -duration.get(r.rover_id, 0), r.rover_id)):
+            stops, distance = scheduler.search(rover, table)
+            table.reserve(stops)
+            schedules.append(_rover_schedule(rover, stops, distance, cmap, tick))
+        span.set(conflicts=conflicts, states=scheduler.states)
+
+    SCHEDULE_CONFLICTS.inc(conflicts)
+    return RoverFleetSchedule(
+        schedules=schedules,
+        makespan=max(s.finish for s in schedules),
+        tick=tick,
+        conflicts_resolved=conflicts,
+    )
+
+
+def _rover_schedule(rover: _Rover, stops: List[Stop], distance: float, cmap: CompiledMap, tick: float) -> RoverSchedule:
+    return RoverSchedule(
+        rover_id=rover.rover_id,
+        goal_ids=rover.goal_ids,
+        path=[cmap.node_id(u) for u, _, _ in stops],
+        timed_path=[TimedStop(node=cmap.node_id(u), arrival=a * tick, departure=d * tick) for u, a, d in stops],
+        distance=distance,
+        energy_required=distance * rover.energy_per_distance,
+        start=stops[0][2] * tick,
+        finish=stops[-1][1] * tick,
+        wait_time=sum(d - a for _, a, d in stops[:-1]) * tick,
+    )
+
+
+def schedule_plan_file(plan_path: str, mars_map: str, prohibited_nodes: Iterable[str] = (), **kwargs) -> RoverFleetSchedule:
+    """schedule_rovers() for a rover crew output file (rover_crew_output.json)."""
+    with open(plan_path, encoding="utf-8") as f:
+        plan = RoverSelectionPlan.model_validate(json.load(f))
+    return schedule_rovers(plan, mars_map, prohibited_nodes, **kwargs)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from mars_exploration.planning.candidates import drone_time_cost, parse_goal, prohibited_node_set, sort_goals
+from mars_exploration.planning.fleet import FleetTable, drone_goal_candidates, rover_goal_candidates
+from mars_exploration.routing.compiled_map import CompiledMap, load_map
+from mars_exploration.routing.cost_models import DRONE_TERRAIN_MULTIPLIERS, ROVER_TERRAIN_MULTIPLIERS
+from mars_exploration.routing.dynamic import DynamicRouter
+from mars_exploration.routing.engine import NoPathError
+
+
+def _replan_map(map_path: str) -> CompiledMap:
+    """Compiled map for map_path; a tiled map is replanned on the graphml it was built from."""
+    from mars_exploration.routing.tiles import source_map_path
+
+    return load_map(source_map_path(map_path))
+
+
+# (source index, target index, leg path as node indices or None if the leg failed)
+Leg = Tuple[Optional[int], Optional[int], Optional[List[int]]]
+
+
+class _Evaluation:
+    """GoalCandidates of one goal plus the route legs it depended on."""
+
+    __slots__ = ("result", "legs")
+
+    def __init__(self, result, legs: List[Leg]):
+        self.result = result
+        self.legs = legs
+
+    def is_dirty(self, changed: Mapping[int, Optional[Set[int]]], toggled: Set[int]) -> bool:
+        for source, target, path in self.legs:
+            if source is None or target is None:
+                continue
+            if target in toggled:
+                return True
+            if source not in changed:
+                continue
+            nodes = changed[source]
+            if nodes is None or target in nodes:
+                return True
+            if path is not None and not nodes.isdisjoint(path):
+                return True
+        return False
+
+
+class CandidateReplanner:
+    """
+    Keeps the GoalCandidates of one path tool alive across hazard updates.
+
+    Goals are evaluated over the whole fleet with the same rules as
+    RoversPathTool / DronesPathTool (planning/fleet.py), routed on a
+    DynamicRouter. Unlike the tools, candidates carry no alternative routes
+    and rovers over the energy limit are not routed through charging nodes.
+    push_hazard_delta() applies the change to the router (which repairs its
+    cached shortest-path trees) and re-evaluates only the goals whose legs
+    touched a changed node or whose vehicles start on a toggled one. Only the
+    goals whose GoalCandidates actually changed are returned.
+    """
+
+    def __init__(
+        self,
+        router: DynamicRouter,
+        vehicles: List[Dict[str, Any]],
+        goals: List[Dict[str, Any]],
+        evaluate: Callable[..., Any],
+    ):
+        self.router = router
+        self.table = FleetTable(vehicles)
+        self.goals = [parse_goal(g) for g in sort_goals(goals)]
+        self._evaluate = evaluate
+        self._lock = threading.Lock()
+        self._prohibited_set = self._current_prohibited()
+        self._starts = {i for i in map(router.cmap.index_of, self.table.origins) if i is not None}
+
+        self._evaluations: List[_Evaluation] = [self._evaluate_goal(goal) for goal in self.goals]
+        self._results = [e.result for e in self._evaluations]
+
+    @classmethod
+    def for_rovers(
+        cls,
+        mars_map: str,
+        rovers: List[Dict[str, Any]],
+        goals: List[Dict[str, Any]],
+        prohibited_nodes: Optional[list] = None,
+        use_terrain_weight: bool = True,
+        energy_cost: float = 0.2,
+        energy_threshold: float = 5.0,
+    ) -> "CandidateReplanner":
+        """Same parameters as RoversPathTool._run."""
+        router = DynamicRouter(
+            _replan_map(mars_map),
+            ROVER_TERRAIN_MULTIPLIERS if use_terrain_weight else None,
+            prohibited_node_set(prohibited_nodes),
+        )
+
+        def evaluate(table, goal, route, prohibited_set):
+            return rover_goal_candidates(table, goal, route, prohibited_set, energy_cost, energy_threshold)
+
+        return cls(router, rovers, goals, evaluate)
+
+    @classmethod
+    def for_drones(
+        cls,
+        mars_map: str,
+        drones: List[Dict[str, Any]],
+        goals: List[Dict[str, Any]],
+        prohibited_nodes: Optional[list] = None,
+        use_terrain_weight: bool = True,
+        flight_time_threshold: float = 240,
+        time_cost: float = 1.0,
+    ) -> "CandidateReplanner":
+        """Same parameters as DronesPathTool._run."""
+        router = DynamicRouter(
+            _replan_map(mars_map),
+            DRONE_TERRAIN_MULTIPLIERS if use_terrain_weight else None,
+            prohibited_node_set(prohibited_nodes),
+        )
+        time_cost = drone_time_cost(time_cost, use_terrain_weight)
+
+        def evaluate(table, goal, route, prohibited_set):
+            return drone_goal_candidates(table, goal, route, prohibited_set, flight_time_threshold, time_cost)
+
+        return cls(router, drones, goals, evaluate)
+
+    # ------------------------------------------------------------------
+    def candidates(self) -> List[Any]:
+        """Current GoalCandidates, in goal priority order."""
+        with self._lock:
+            return list(self._results)
+
+    def prohibited_nodes(self) -> List[str]:
+        return sorted(self._prohibited_set)
+
+    def push_hazard_delta(
+        self,
+        add: Iterable[str] = (),
+        remove: Iterable[str] = (),
+        terrain: Optional[Mapping[str, str]] = None,
+        edge_weights: Optional[Mapping[Tuple[str, str], Optional[float]]] = None,
+    ) -> List[Any]:
+        """
+        Apply a hazard delta and return the GoalCandidates that changed.
+
+        - add: newly prohibited nodes
+        - remove: nodes that are no longer prohibited
+        - terrain: node id -> new terrain type
+        - edge_weights: (node, node) -> cost override (None clears it)
+        """
+        with self._lock:
+            before = set(self.router.blocked)
+            changed = self.router.apply(add=add, remove=remove, terrain=terrain, edge_weights=edge_weights)
+            toggled = before ^ self.router.blocked
+            self._prohibited_set = self._current_prohibited()
+
+            # A toggled start changes the static checks of every goal
+            restart = not self._starts.isdisjoint(toggled)
+            updated = []
+            for i, goal in enumerate(self.goals):
+                if not restart and not self._evaluations[i].is_dirty(changed, toggled):
+                    continue
+                self._evaluations[i] = self._evaluate_goal(goal)
+                result = self._evaluations[i].result
+                if result.model_dump() != self._results[i].model_dump():
+                    self._results[i] = result
+                    updated.append(result)
+            return updated
+
+    # ------------------------------------------------------------------
+    def _evaluate_goal(self, goal: Dict[str, Any]) -> _Evaluation:
+        router = self.router
+        legs: List[Leg] = []
+
+        def route(source: str, target_nodes: List[str]):
+            # source -> targets -> source, recording every leg for invalidation
+            total = 0.0
+            full_path: List[str] = []
+            current = source
+            for tnode in list(target_nodes) + [source]:
+                s, t = router.cmap.index_of(current), router.cmap.index_of(tnode)
+                try:
+                    leg_dist, leg_path = router.leg_indices(current, tnode)
+                except NoPathError:
+                    legs.append((s, t, None))
+                    raise
+                legs.append((s, t, leg_path))
+                total += leg_dist
+                ids = [router.cmap.node_id(v) for v in leg_path]
+                full_path.extend(ids if not full_path else ids[1:])
+                current = tnode
+            return total, full_path
+
+        result = self._evaluate(self.table, goal, route, self._prohibited_set)
+        return _Evaluation(result, legs)
+
+    def _current_prohibited(self) -> Set[str]:
+        return {self.router.cmap.node_id(i) for i in self.router.blocked}
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from mars_exploration.models.mission_spec import GoalFragment, MissionFragment, MissionSpec, ScientificGoal
+from mars_exploration.planning.candidates import priority_rank
+
+
+# Chunked mission analysis for long reports. Reports longer than
+# MARS_MISSION_CHUNK_CHARS are split at Markdown section boundaries into parts
+# of at most that size, each part is read by its own Mission Crew call in
+# parallel (MissionFragment, crews/mission_crew) and the fragments are merged
+# here without the LLM, so latency follows the largest part instead of the
+# whole report. 0 disables chunking.
+CHUNK_CHARS_ENV = "MARS_MISSION_CHUNK_CHARS"
+CHUNK_WORKERS_ENV = "MARS_MISSION_CHUNK_WORKERS"
+
+_SECTION = re.compile(r"^#{1,2}\s")
+_SUBSECTION = re.compile(r"^#{3,6}\s")
+_TITLE = re.compile(r"^#\s+(.*\S)")
+_GOAL_ID = re.compile(r"^G(\d+)$", re.IGNORECASE)
+
+
+def chunk_chars() -> int:
+    return int(os.getenv(CHUNK_CHARS_ENV, "6000"))
+
+
+def chunk_workers() -> int:
+    return max(1, int(os.getenv(CHUNK_WORKERS_ENV, "4")))
+
+
+def _split_at(text: str, boundary: re.Pattern) -> List[str]:
+    """text cut before every line matching boundary; the pieces join back to text."""
+    pieces: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines(keepends=True):
+        if boundary.match(line) and current:
+            pieces.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [p + "\n\n" for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+
+def _pieces(section: str, max_chars: int) -> List[str]:
+    """A section, or its subsections / paragraphs / lines when it is longer than max_chars."""
+    if len(section) <= max_chars:
+        return [section]
+    for split in (lambda s: _split_at(s, _SUBSECTION), _paragraphs, lambda s: s.splitlines(keepends=True)):
+        parts = split(section)
+        if len(parts) > 1:
+            return [p for part in parts for p in _pieces(part, max_chars)]
+    # One line longer than max_chars
+    return [section[i:i + max_chars] for i in range(0, len(section), max_chars)]
+
+
+def report_title(report: str) -> Optional[str]:
+    """Text of the first level-1 heading, None when there is none."""
+    return next((m.group(1) for m in map(_TITLE.match, report.splitlines()) if m), None)
+
+
+def split_report(report: str, max_chars: Optional[int] = None) -> List[str]:
+    """
+    Parts of a Markdown report of at most max_chars each (MARS_MISSION_CHUNK_CHARS).
+
+    Consecutive level-1/2 sections are packed together; a section that does
+    not fit alone is cut at subsections, then paragraphs. Parts after the first
+    repeat the report title. A report that fits is returned whole.
+    """
+    max_chars = chunk_chars() if max_chars is None else max_chars
+    if max_chars <= 0 or len(report) <= max_chars:
+        return [report]
+
+    title = report_title(report)
+    header = f"# {title} (continued)\n\n" if title else ""
+    budget = max(max_chars - len(header), max_chars // 2)
+
+    parts: List[str] = []
+    current = ""
+    for section in _split_at(report, _SECTION):
+        for piece in _pieces(section, budget):
+            if current and len(current) + len(piece) > budget:
+                parts.append(current)
+                current = ""
+            current += piece
+    if current.strip():
+        parts.append(current)
+    return [parts[0]] + [header + part for part in parts[1:]]
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.casefold().split()).rstrip(".;:")
+
+
+def _union(lists: Sequence[Sequence[str]]) -> List[str]:
+    seen: Dict[str, str] = {}
+    for items in lists:
+        for item in items:
+            if item.strip():
+                seen.setdefault(_norm(item), item.strip())
+    return list(seen.values())
+
+
+def _goal_key(goal: GoalFragment) -> Tuple:
+    if goal.target_nodes:
+        return ("targets", frozenset(n.strip().upper() for n in goal.target_nodes))
+    return ("description", _norm(goal.description))
+
+
+def _merge_goals(fragments: Sequence[MissionFragment]) -> Tuple[List[ScientificGoal], List[str], List[str]]:
+    """Goals deduplicated by target set (description when untargeted), plus assumptions and risks it adds."""
+    merged: Dict[Tuple, Dict] = {}
+    for fragment in fragments:
+        for goal in fragment.scientific_goals:
+            entry = merged.setdefault(_goal_key(goal), {"goal": goal.model_dump(), "priorities": []})
+            current = entry["goal"]
+            if current["terrain"] is None and goal.terrain:
+                current["terrain"] = goal.terrain
+            if goal.priority is not None:
+                entry["priorities"].append(goal.priority)
+
+    goals: List[ScientificGoal] = []
+    assumptions: List[str] = []
+    risks: List[str] = []
+    used_ids = set()
+    next_id = 1 + max(
+        (int(m.group(1)) for e in merged.values() if (m := _GOAL_ID.match(e["goal"]["goal_id"].strip()))), default=0
+    )
+    for entry in merged.values():
+        goal = entry["goal"]
+        # Parts number their goals independently: keep the first id, renumber collisions
+        goal_id = goal["goal_id"].strip()
+        if not goal_id or goal_id.upper() in used_ids:
+            goal_id, next_id = f"G{next_id}", next_id + 1
+        used_ids.add(goal_id.upper())
+
+        priorities = entry["priorities"]
+        if not priorities:
+            priority = "medium"
+            assumptions.append(f"Priority of {goal_id} ({goal['description']}) is not stated; assumed medium.")
+        else:
+            priority = min(priorities, key=priority_rank)
+            if len(set(priorities)) > 1:
+                risks.append(
+                    f"Conflicting priorities for {goal_id} ({goal['description']}): {', '.join(sorted(set(priorities), key=priority_rank))}; "
+                    f"using {priority}."
+                )
+        goals.append(ScientificGoal(**{**goal, "goal_id": goal_id, "priority": priority}))
+    return goals, assumptions, risks
+
+
+def merge_fragments(fragments: Sequence[MissionFragment], default_title: str = "Mars mission") -> MissionSpec:
+    """
+    Deterministic reduce of per-part fragments (in report order) into one
+    MissionSpec: first title and description, goals merged by target nodes,
+    other lists unioned without duplicates.
+    """
+    title = next((f.mission_title.strip() for f in fragments if f.mission_title.strip()), default_title)
+    description = next((f.mission_description.strip() for f in fragments if f.mission_description.strip()), title)
+    goals, assumptions, risks = _merge_goals(fragments)
+    return MissionSpec(
+        mission_title=title,
+        mission_description=description,
+        scientific_goals=goals,
+        constraints=_union([f.constraints for f in fragments]),
+        hazards=_union([f.hazards for f in fragments]),
+        assumptions=_union([f.assumptions for f in fragments] + [assumptions]),
+        risks=_union([f.risks for f in fragments] + [risks]),
+    )
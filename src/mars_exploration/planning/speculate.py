@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import re
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence
+
+from mars_exploration.commons import metrics, tracing
+from mars_exploration.planning.fallback import classify_item
+from mars_exploration.routing.cost_models import DRONE_TERRAIN_MULTIPLIERS, ROVER_TERRAIN_MULTIPLIERS
+from mars_exploration.routing.engine import RouteEngine, get_route_engine
+
+
+# Speculative route precomputation. The path tools run only after three LLM
+# stages (mission analysis, classification, candidate analysis), but the legs
+# they need are mostly known from the raw inputs: vehicle origins from the
+# fleet files and target nodes from the report. MarsMissionFlow starts this
+# right after prepare_mission; it loads the map, route engines and
+# reachability labels and fills the engines' leg caches (see
+# BaseRouteEngine.warm_legs) while the LLM stages run.
+#
+# Legs are cached per prohibited-node set, which is only known after
+# classification. Two guesses are warmed per vehicle class: the keyword
+# classification used by the fallbacks, and the split the classifier is
+# prompted with (flight hazards to drones, surface hazards to rovers).
+SPECULATE_ENV = "MARS_SPECULATE"
+
+SPECULATED_LEGS = metrics.counter(
+    "mars_speculated_legs_total", "Route legs computed ahead of the path tools.", ("vehicle",)
+)
+
+_NODE = re.compile(r"\bN\d+\b")
+_HEADING = re.compile(r"^\s*#+\s*(.*)$")
+_ITEM = re.compile(r"^\s*(?:[-*+]|\d+\.)\s+(.*)$")
+_AERIAL_WORDS = ("dust", "storm", "wind", "radiation", "airspace", "visibility", "flight")
+
+
+def report_items(report: str) -> Dict[str, List[str]]:
+    """List items of a Markdown mission report by section: goals, constraints, hazards, other."""
+    out: Dict[str, List[str]] = {"goals": [], "constraints": [], "hazards": [], "other": []}
+    section = "other"
+    for line in report.splitlines():
+        heading = _HEADING.match(line)
+        if heading:
+            title = heading.group(1).lower()
+            section = next((s for s in ("goal", "constraint", "hazard") if s in title), "other")
+            section = section + "s" if section != "other" else section
+            continue
+        item = _ITEM.match(line)
+        if item:
+            out[section].append(item.group(1).replace("**", "").replace("__", "").strip())
+    return out
+
+
+def _rule_vehicles(text: str) -> List[str]:
+    lower = text.lower()
+    if ("rover" in lower) != ("drone" in lower) or "agent" in lower or "all " in lower:
+        return classify_item(text, hazard=True).vehicles
+    return ["drone"] if any(w in lower for w in _AERIAL_WORDS) else ["rover"]
+
+
+def prohibited_guesses(items: Dict[str, List[str]]) -> Dict[str, List[FrozenSet[str]]]:
+    """Distinct candidate prohibited-node sets per vehicle class."""
+    constraints = [classify_item(text, hazard=False) for text in items["constraints"]]
+    hazards = [classify_item(text, hazard=True) for text in items["hazards"]]
+    guesses: Dict[str, List[FrozenSet[str]]] = {}
+    for vehicle in ("rover", "drone"):
+        keyword = {n for item in (*constraints, *hazards) if vehicle in item.vehicles for n in item.nodes}
+        rules = {n for item in constraints if vehicle in item.vehicles for n in item.nodes}
+        rules |= {n for item in hazards if vehicle in _rule_vehicles(item.text) for n in item.nodes}
+        guesses[vehicle] = list(dict.fromkeys([frozenset(keyword), frozenset(rules)]))
+    return guesses
+
+
+def _origins(fleet: Sequence[Dict[str, Any]]) -> List[str]:
+    return list(dict.fromkeys(v["location"] for v in fleet if isinstance(v, dict) and v.get("location")))
+
+
+def speculate_routes(
+    report: str,
+    map_path: str,
+    rovers: Sequence[Dict[str, Any]],
+    drones: Sequence[Dict[str, Any]],
+) -> Dict[str, int]:
+    """Warm the route engines with every origin/target leg the report suggests. Returns new legs per vehicle."""
+    items = report_items(report)
+    nodes = list(dict.fromkeys(_NODE.findall(report)))
+    guesses = prohibited_guesses(items)
+    added: Dict[str, int] = {}
+    with tracing.span("routing.speculate", "routing", nodes=len(nodes)) as span:
+        for vehicle, fleet, multipliers in (
+            ("rover", rovers, ROVER_TERRAIN_MULTIPLIERS),
+            ("drone", drones, DRONE_TERRAIN_MULTIPLIERS),
+        ):
+            engine = get_route_engine(map_path, multipliers)
+            if isinstance(engine, RouteEngine):
+                from mars_exploration.routing.reachability import get_reachability
+
+                get_reachability(engine.cmap)
+            origins = _origins(fleet)
+            count = 0
+            for prohibited in guesses[vehicle]:
+                targets = [n for n in nodes if n not in prohibited]
+                blocked = engine.blocked_indices(prohibited)
+                # origin -> first target, target -> target, last target -> origin
+                count += engine.warm_legs(origins, targets, blocked)
+                count += engine.warm_legs(targets, targets + origins, blocked)
+            SPECULATED_LEGS.inc(count, vehicle=vehicle)
+            added[vehicle] = count
+        span.set(**{f"{vehicle}_legs": n for vehicle, n in added.items()})
+    return added
+
+
+def speculate_in_background(
+    report: str,
+    map_path: str,
+    rovers: Sequence[Dict[str, Any]],
+    drones: Sequence[Dict[str, Any]],
+) -> Optional[threading.Thread]:
+    """speculate_routes() in a daemon thread unless MARS_SPECULATE=0. Errors are reported, never raised."""
+    if os.getenv(SPECULATE_ENV, "1") == "0":
+        return None
+
+    def run():
+        try:
+            speculate_routes(report, map_path, rovers, drones)
+        except Exception as e:
+            print(f"Route speculation failed: {e}")
+
+    ctx = contextvars.copy_context()
+    thread = threading.Thread(target=ctx.run, args=(run,), name="route-speculation", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import sys
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+from mars_exploration.models.serialization import dump_json
+
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@contextmanager
+def _open_out(out: Union[str, IO[str]]):
+    if not isinstance(out, str):
+        yield out
+    elif out == "-":
+        yield sys.stdout
+    else:
+        with open(out, "w", encoding="utf-8") as f:
+            yield f
+
+
+def write_ndjson(items: Iterable[BaseModel], out: Union[str, IO[str]] = "-") -> int:
+    """
+    Write models as NDJSON (one JSON object per line) as they are produced.
+
+    out is a path, "-" for stdout, or an open text stream. Every line is
+    flushed so a reader on the other end of a pipe sees it immediately.
+    Returns the number of lines written.
+    """
+    count = 0
+    with _open_out(out) as f:
+        for item in items:
+            f.write(dump_json(item).decode("utf-8"))
+            f.write("\n")
+            f.flush()
+            count += 1
+    return count
+
+
+def read_ndjson(source: Union[str, IO[str]], model: Type[M]) -> Iterator[M]:
+    """Lazily parse an NDJSON file or stream back into models."""
+    if isinstance(source, str):
+        f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    else:
+        f = source
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield model.model_validate_json(line)
+    finally:
+        if isinstance(source, str) and source != "-":
+            f.close()
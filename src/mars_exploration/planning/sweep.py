@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from mars_exploration.planning.candidates import AlternativesFn, RechargeFn, RouteFn, drone_time_cost
+from mars_exploration.planning.fleet import (
+    FEASIBLE,
+    FleetTable,
+    RouteTable,
+    drone_goal_candidates,
+    rover_goal_candidates,
+    static_checks,
+)
+from mars_exploration.routing.engine import NodeNotFoundError, NoPathError
+
+# (energy_cost, energy_threshold) -> recharge function for that grid point, or None
+RechargeFactory = Callable[[float, float], Optional[RechargeFn]]
+
+
+class FeasibilityCube:
+    """
+    Feasibility of every goal x vehicle x parameter point, from one set of routes.
+
+    - feasible: bool array (goals, vehicles, *axis lengths)
+    - distance: round-trip distance per (goal, vehicle), NaN when not routable
+    - status: parameter-independent outcome code per (goal, vehicle)
+      (planning/fleet.py codes; FEASIBLE means the route exists)
+    - values: extra per-point arrays (energy_required / recharge_before for
+      rovers, time_required for drones); energy_required is that of the
+      direct route, also for rovers made feasible by recharge stops
+    - axes: parameter name -> values, in the order of the trailing dimensions
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        table: FleetTable,
+        goals: List[Dict[str, Any]],
+        routes: List[RouteTable],
+        status: np.ndarray,
+        distance: np.ndarray,
+        axes: Dict[str, np.ndarray],
+        feasible: np.ndarray,
+        values: Dict[str, np.ndarray],
+        route: RouteFn,
+        prohibited_set: Set[str],
+        recharge: Optional[RechargeFactory] = None,
+    ):
+        self.kind = kind
+        self.table = table
+        self.goals = goals
+        self.routes = routes
+        self.status = status
+        self.distance = distance
+        self.axes = axes
+        self.feasible = feasible
+        self.values = values
+        self._route = route
+        self._prohibited_set = prohibited_set
+        self._recharge = recharge
+
+    @property
+    def goal_ids(self) -> List[str]:
+        return [g["goal_id"] for g in self.goals]
+
+    @property
+    def vehicle_ids(self) -> List[str]:
+        return self.table.data["id"].tolist()
+
+    def feasible_counts(self) -> np.ndarray:
+        """Number of feasible vehicles per goal and parameter point."""
+        return self.feasible.sum(axis=1)
+
+    def candidates(self, **params: float) -> List[Any]:
+        """
+        GoalCandidates for one parameter point, as the path tool would return
+        them, built from the routes already computed for the sweep.
+        """
+        out = []
+        for goal, routes in zip(self.goals, self.routes):
+            if self.kind == "rover":
+                out.append(
+                    rover_goal_candidates(
+                        self.table, goal, self._route, self._prohibited_set,
+                        params["energy_cost"], params["energy_threshold"], routes=routes,
+                        recharge=self._recharge and self._recharge(params["energy_cost"], params["energy_threshold"]),
+                    )
+                )
+            else:
+                out.append(
+                    drone_goal_candidates(
+                        self.table, goal, self._route, self._prohibited_set,
+                        params["flight_time_threshold"], params["time_cost"], routes=routes,
+                    )
+                )
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact JSON-friendly form: axes, ids and the nested feasibility cube."""
+        return {
+            "kind": self.kind,
+            "goal_ids": self.goal_ids,
+            "vehicle_ids": self.vehicle_ids,
+            "axes": {k: v.tolist() for k, v in self.axes.items()},
+            "feasible": self.feasible.astype(np.uint8).tolist(),
+            "distance": np.where(np.isnan(self.distance), None, self.distance).tolist(),
+        }
+
+
+def _route_all(
+    table: FleetTable,
+    goals,
+    route: RouteFn,
+    prohibited_set: Set[str],
+    terrain_check: bool,
+    alternatives: Optional[AlternativesFn] = None,
+):
+    """Parameter-independent status and distance per (goal, vehicle); routes once per goal and origin."""
+    status = np.empty((len(goals), len(table)), dtype=np.int8)
+    distance = np.full((len(goals), len(table)), np.nan)
+    tables: List[RouteTable] = []
+    for g, goal in enumerate(goals):
+        st = static_checks(table, goal, prohibited_set, terrain_check)
+        routes = RouteTable(table, route, goal["target_nodes"], alternatives)
+        routes.compute(st == FEASIBLE)
+        dist, route_status = routes.distances()
+        open_ = st == FEASIBLE
+        st[open_] = route_status[open_]
+        status[g] = st
+        distance[g] = np.where(st == FEASIBLE, dist, np.nan)
+        tables.append(routes)
+    return status, distance, tables
+
+
+def rover_sweep(
+    table: FleetTable,
+    goals: List[Dict[str, Any]],
+    route: RouteFn,
+    prohibited_set: Set[str],
+    energy_cost: Sequence[float],
+    energy_threshold: Sequence[float],
+    alternatives: Optional[AlternativesFn] = None,
+    recharge: Optional[RechargeFactory] = None,
+) -> FeasibilityCube:
+    """
+    Rover feasibility over a grid of energy_cost x energy_threshold values.
+
+    goals are parsed goals in output order. Cube shape: (goals, rovers, costs, thresholds).
+    With a recharge factory, rovers over the energy limit at a grid point are
+    feasible when that point's recharge function finds a route (per origin),
+    as in rover_goal_candidates.
+    """
+    costs = np.asarray(energy_cost, dtype=np.float64)
+    thresholds = np.asarray(energy_threshold, dtype=np.float64)
+    status, distance, routes = _route_all(table, goals, route, prohibited_set, True, alternatives)
+
+    energy_required = distance[:, :, None] * costs[None, None, :]  # (G, V, C)
+    routable = (status == FEASIBLE)[:, :, None, None]
+    feasible = routable & ((100.0 - energy_required[..., None]) >= thresholds)
+    recharge_before = routable & (
+        (table.data["energy"][None, :, None, None] - energy_required[..., None]) <= thresholds
+    )
+    if recharge is not None:
+        _recharge_grid(table, goals, recharge, costs, thresholds, routable[:, :, 0, 0], feasible, recharge_before)
+    return FeasibilityCube(
+        "rover", table, goals, routes, status, distance,
+        {"energy_cost": costs, "energy_threshold": thresholds},
+        feasible,
+        {"energy_required": energy_required, "recharge_before": recharge_before},
+        route, prohibited_set, recharge,
+    )
+
+
+def _recharge_grid(
+    table: FleetTable,
+    goals: List[Dict[str, Any]],
+    recharge: RechargeFactory,
+    costs: np.ndarray,
+    thresholds: np.ndarray,
+    routable: np.ndarray,
+    feasible: np.ndarray,
+    recharge_before: np.ndarray,
+) -> None:
+    """Mark routable rovers over the energy limit feasible where a recharge route exists (in place)."""
+    origin, energy = table.data["origin"], table.data["energy"]
+    for c, cost in enumerate(costs.tolist()):
+        for t, threshold in enumerate(thresholds.tolist()):
+            fn = recharge(cost, threshold)
+            if fn is None:
+                continue
+            for g, goal in enumerate(goals):
+                over = routable[g] & ~feasible[g, :, c, t]
+                for o in np.unique(origin[over]).tolist():
+                    try:
+                        _, _, _, first_energy = fn(table.origins[o], goal["target_nodes"])
+                    except (NoPathError, NodeNotFoundError):
+                        continue
+                    hit = over & (origin == o)
+                    feasible[g, hit, c, t] = True
+                    recharge_before[g, hit, c, t] = (energy[hit] - first_energy) <= threshold
+
+
+def drone_sweep(
+    table: FleetTable,
+    goals: List[Dict[str, Any]],
+    route: RouteFn,
+    prohibited_set: Set[str],
+    flight_time_threshold: Sequence[float],
+    time_cost: Sequence[float],
+    alternatives: Optional[AlternativesFn] = None,
+) -> FeasibilityCube:
+    """
+    Drone feasibility over a grid of flight_time_threshold x time_cost values.
+
+    time_cost values must already be normalized (see drone_time_cost).
+    Cube shape: (goals, drones, thresholds, time costs).
+    """
+    limits = np.asarray(flight_time_threshold, dtype=np.float64)
+    costs = np.asarray(time_cost, dtype=np.float64)
+    status, distance, routes = _route_all(table, goals, route, prohibited_set, False, alternatives)
+
+    time_required = distance[:, :, None] * costs[None, None, :]  # (G, V, T)
+    max_time = np.minimum(limits[:, None], table.data["range"][None, :])  # (L, V)
+    routable = (status == FEASIBLE)[:, :, None, None]
+    feasible = routable & (time_required[:, :, None, :] <= max_time.T[None, :, :, None])
+    return FeasibilityCube(
+        "drone", table, goals, routes, status, distance,
+        {"flight_time_threshold": limits, "time_cost": costs},
+        feasible,
+        {"time_required": time_required},
+        route, prohibited_set,
+    )
+
+
+def normalized_time_costs(time_cost: Sequence[float], use_terrain_weight: bool) -> List[float]:
+    """drone_time_cost() applied to every sweep value (duplicates kept)."""
+    return [drone_time_cost(t, use_terrain_weight) for t in time_cost]
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+
+from mars_exploration.commons import metrics
+from mars_exploration.routing.engine import BaseRouteEngine, NodeNotFoundError, NoPathError
+
+
+# Alternative round trips for hazard failover (see planning/failover.py).
+#
+# Each alternative is the shortest round trip that avoids one node of the
+# primary route (a "probe"), so the set of alternatives is by construction
+# what a new hazard on the primary route needs. Only the legs that pass
+# through the probe are searched again; the others are reused from the
+# primary, and every leg goes through the engine's leg cache, so vehicles
+# sharing an origin (and goals sharing legs) share the work. Among the probe
+# routes, alternatives are picked greedily by how many still-uncovered probe
+# nodes they avoid, then by distance. Works with every engine (plain, CH,
+# tiled).
+ALTERNATIVES_ENV = "MARS_ROUTE_ALTERNATIVES"
+
+ALTERNATIVE_ROUTES = metrics.counter(
+    "mars_route_alternatives_total", "Alternative round trips kept for hazard failover."
+)
+
+Route = Tuple[float, List[str]]
+
+
+def route_alternatives() -> int:
+    """Alternatives per candidate route from MARS_ROUTE_ALTERNATIVES (default 0, off)."""
+    return max(0, int(os.getenv(ALTERNATIVES_ENV, "0")))
+
+
+def _probes(legs: Sequence[List[str]], stops: FrozenSet[str], limit: int) -> List[str]:
+    """Up to limit interior nodes of the route, evenly spaced along it."""
+    interior = list(dict.fromkeys(n for path in legs for n in path[1:-1] if n not in stops))
+    if len(interior) <= limit:
+        return interior
+    step = len(interior) / limit
+    return [interior[int(i * step + step / 2)] for i in range(limit)]
+
+
+def alternative_routes(
+    engine: BaseRouteEngine,
+    source: str,
+    target_nodes: List[str],
+    blocked: FrozenSet = frozenset(),
+    k: int = 3,
+    probes: Optional[int] = None,
+) -> List[Route]:
+    """
+    Up to k round trips (source -> targets -> source) that differ from the
+    shortest one, shortest first. Raises like chain() when there is no route.
+    """
+    if k <= 0:
+        return []
+    stops = [source] + list(target_nodes) + [source]
+    legs = [engine.cached_leg(a, b, blocked) for a, b in zip(stops, stops[1:])]
+    paths = [path for _, path in legs]
+    leg_nodes = [set(path) for path in paths]
+    primary = _join(paths)
+
+    seen = {tuple(primary)}
+    found: List[Tuple[float, List[str], FrozenSet[str]]] = []
+    probe_nodes = _probes(paths, frozenset(stops), probes if probes is not None else 4 * k)
+    for node in probe_nodes:
+        avoid = blocked | engine.blocked_indices([node])
+        total = 0.0
+        detour: List[List[str]] = []
+        try:
+            for i, (a, b) in enumerate(zip(stops, stops[1:])):
+                distance, path = engine.cached_leg(a, b, avoid) if node in leg_nodes[i] else legs[i]
+                total += distance
+                detour.append(path)
+        except (NoPathError, NodeNotFoundError):
+            # node is a cut vertex for this trip: no alternative avoids it
+            continue
+        route = _join(detour)
+        if tuple(route) not in seen:
+            seen.add(tuple(route))
+            found.append((total, route, frozenset(route)))
+
+    chosen: List[Route] = []
+    uncovered = set(probe_nodes)
+    while found and len(chosen) < k:
+        best = max(found, key=lambda r: (len(uncovered - r[2]), -r[0]))
+        if not uncovered - best[2]:
+            break
+        found.remove(best)
+        uncovered &= best[2]
+        chosen.append((best[0], best[1]))
+    ALTERNATIVE_ROUTES.inc(len(chosen))
+    return sorted(chosen, key=lambda r: r[0])
+
+
+def _join(paths: Sequence[List[str]]) -> List[str]:
+    route: List[str] = []
+    for path in paths:
+        route.extend(path if not route else path[1:])
+    return route
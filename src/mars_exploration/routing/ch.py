@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from mars_exploration.routing.compiled_map import CACHE_LOOKUPS, CompiledMap, load_map, read_arrays, write_arrays
+from mars_exploration.routing.cost_models import COST_MODELS
+from mars_exploration.routing.engine import BaseRouteEngine, NoPathError, NodeNotFoundError, RouteEngine
+
+
+# Contraction hierarchy in the customizable (CCH) style:
+#   1. offline, metric independent: a contraction order and the upward arcs
+#      of the resulting elimination graph (original edges + fill-in shortcuts)
+#   2. customization: arc weights for one metric, computed bottom-up over the
+#      lower triangles of every arc (middle node recorded for path unpacking)
+#   3. query: bidirectional search over upward arcs only
+# The index stores the customized weights of every cost model, so static
+# queries need no preprocessing at runtime. Prohibited nodes only trigger a
+# re-customization (set their arcs to infinity), never a new contraction.
+CH_SUFFIX = ".ch.marsmap"
+HAZARD_METRIC_CACHE = int(os.getenv("MARS_CH_HAZARD_CACHE", "8"))
+
+INF = float("inf")
+
+
+def ch_path_for(compiled_path: str) -> str:
+    return compiled_path[: -len(".marsmap")] + CH_SUFFIX if compiled_path.endswith(".marsmap") else compiled_path + CH_SUFFIX
+
+
+def _multiplier_key(multipliers: Optional[Mapping[str, float]]):
+    return tuple(sorted(multipliers.items())) if multipliers is not None else None
+
+
+def _contraction_order(cmap: CompiledMap) -> Tuple[np.ndarray, List[List[int]]]:
+    """Greedy minimum-degree elimination. Returns rank per node and upward neighbours."""
+    n = cmap.num_nodes
+    indptr, indices = cmap.indptr.tolist(), cmap.indices.tolist()
+    adj = [set(indices[indptr[v]:indptr[v + 1]]) - {v} for v in range(n)]
+
+    rank = np.full(n, -1, dtype=np.int32)
+    up: List[List[int]] = [[] for _ in range(n)]
+    heap = [(len(a), v) for v, a in enumerate(adj)]
+    heapq.heapify(heap)
+    r = 0
+    while heap:
+        degree, v = heapq.heappop(heap)
+        if rank[v] >= 0 or degree != len(adj[v]):
+            continue
+        rank[v] = r
+        r += 1
+        nbrs = adj[v]
+        up[v] = list(nbrs)
+        for a in nbrs:
+            adj[a].discard(v)
+            adj[a] |= nbrs - {a}
+            heapq.heappush(heap, (len(adj[a]), a))
+        adj[v] = set()
+    return rank, up
+
+
+class CHTopology:
+    """Metric-independent part of the hierarchy: ranks and upward arcs in CSR form."""
+
+    def __init__(self, rank: np.ndarray, up_indptr: np.ndarray, up_indices: np.ndarray):
+        self.rank = rank
+        self.up_indptr = up_indptr
+        self.up_indices = up_indices
+
+        self._indptr = up_indptr.tolist()
+        self._indices = up_indices.tolist()
+        self._arc: Dict[Tuple[int, int], int] = {}
+        self._down: List[List[int]] = [[] for _ in range(len(self._indptr) - 1)]
+        for v in range(len(self._indptr) - 1):
+            for a in range(self._indptr[v], self._indptr[v + 1]):
+                self._arc[(v, self._indices[a])] = a
+                self._down[self._indices[a]].append(a)
+        self._order = np.argsort(rank).tolist()
+
+    @property
+    def num_arcs(self) -> int:
+        return len(self._indices)
+
+    def arc(self, u: int, v: int) -> int:
+        """Arc id for an unordered node pair (stored at the lower-ranked node)."""
+        a = self._arc.get((u, v))
+        return a if a is not None else self._arc[(v, u)]
+
+    def upward(self, v: int):
+        for a in range(self._indptr[v], self._indptr[v + 1]):
+            yield self._indices[a], a
+
+    def base_weights(self, cmap: CompiledMap, multipliers: Optional[Mapping[str, float]]) -> np.ndarray:
+        """Original edge costs on their arcs; fill-in arcs start at infinity."""
+        w0 = np.full(self.num_arcs, INF)
+        weights = cmap.edge_weights(multipliers).tolist()
+        indptr, indices = cmap.indptr.tolist(), cmap.indices.tolist()
+        for u in range(cmap.num_nodes):
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                if u == v:
+                    continue
+                a = self.arc(u, v)
+                if weights[e] < w0[a]:
+                    w0[a] = weights[e]
+        return w0
+
+    def customize(self, w0: np.ndarray, blocked: FrozenSet[int] = frozenset()) -> Tuple[List[float], List[int]]:
+        """
+        Bottom-up customization. Returns (arc weights, arc middle node or -1).
+
+        Arcs touching a blocked node keep an infinite weight, so the metric
+        never routes through it.
+        """
+        w = w0.tolist()
+        mid = [-1] * len(w)
+        for v in blocked:
+            for _, a in self.upward(v):
+                w[a] = INF
+            for a in self._down[v]:
+                w[a] = INF
+
+        rank = self.rank
+        for x in self._order:
+            ups = [(v, a) for v, a in self.upward(x) if w[a] != INF]
+            if len(ups) < 2:
+                continue
+            ups.sort(key=lambda item: rank[item[0]])
+            for i in range(len(ups)):
+                u, au = ups[i]
+                for j in range(i + 1, len(ups)):
+                    v, av = ups[j]
+                    cand = w[au] + w[av]
+                    arc = self._arc[(u, v)]
+                    if cand < w[arc]:
+                        w[arc] = cand
+                        mid[arc] = x
+        return w, mid
+
+
+def build_ch_index(map_path: str, out_path: Optional[str] = None, cost_models: Optional[Mapping] = None) -> str:
+    """
+    Build the contraction hierarchy index for a map (graphml or .marsmap).
+
+    The index is written next to the compiled map and holds the customized
+    metric of every cost model (rover, drone and hop by default).
+    """
+    cmap = load_map(map_path)
+    cost_models = dict(COST_MODELS if cost_models is None else cost_models)
+    out_path = out_path or ch_path_for(cmap.path)
+
+    rank, up = _contraction_order(cmap)
+    up_indptr = np.zeros(cmap.num_nodes + 1, dtype=np.int64)
+    up_indptr[1:] = np.cumsum([len(u) for u in up])
+    up_indices = np.array([v for u in up for v in sorted(u, key=lambda x: rank[x])], dtype=np.int32)
+    topology = CHTopology(rank, up_indptr, up_indices)
+
+    arrays = {"rank": rank, "up_indptr": up_indptr, "up_indices": up_indices}
+    models = []
+    for i, (name, multipliers) in enumerate(cost_models.items()):
+        w0 = topology.base_weights(cmap, multipliers)
+        w, mid = topology.customize(w0)
+        arrays[f"w0_{i}"] = w0
+        arrays[f"w_{i}"] = np.array(w, dtype=np.float64)
+        arrays[f"mid_{i}"] = np.array(mid, dtype=np.int32)
+        models.append({"name": name, "multipliers": multipliers})
+
+    write_arrays(out_path, arrays, {"kind": "ch", "source": os.path.basename(cmap.path), "models": models})
+    return out_path
+
+
+class CHIndex:
+    """Loaded CH index: topology plus the customized metric of each cost model."""
+
+    def __init__(self, path: str):
+        self.path = path
+        header, arrays = read_arrays(path)
+        self.models = header.get("models", [])
+        self.arrays = arrays
+        self.topology = CHTopology(
+            np.asarray(arrays["rank"]), np.asarray(arrays["up_indptr"]), np.asarray(arrays["up_indices"])
+        )
+
+    def model_for(self, multipliers: Optional[Mapping[str, float]]) -> Optional[int]:
+        key = _multiplier_key(multipliers)
+        for i, model in enumerate(self.models):
+            if _multiplier_key(model["multipliers"]) == key:
+                return i
+        return None
+
+
+class CHRouteEngine(RouteEngine):
+    """
+    Route engine answering legs with bidirectional CH queries.
+
+    Static queries use the precomputed metric; each distinct prohibited-node
+    set gets its own re-customized metric (kept in a small LRU cache).
+    """
+
+    def __init__(self, cmap: CompiledMap, index: CHIndex, model: int, multipliers: Optional[Mapping[str, float]] = None):
+        super().__init__(cmap, multipliers)
+        self.index = index
+        self.model = model
+        self._static = (
+            index.arrays[f"w_{model}"].tolist(),
+            index.arrays[f"mid_{model}"].tolist(),
+        )
+        self._w0 = np.asarray(index.arrays[f"w0_{model}"])
+        self._metrics: "OrderedDict[FrozenSet[int], Tuple[List[float], List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _metric(self, blocked: FrozenSet[int]) -> Tuple[List[float], List[int]]:
+        if not blocked:
+            return self._static
+        with self._lock:
+            metric = self._metrics.get(blocked)
+            if metric is not None:
+                CACHE_LOOKUPS.inc(cache="ch_metric", result="hit")
+                self._metrics.move_to_end(blocked)
+                return metric
+        CACHE_LOOKUPS.inc(cache="ch_metric", result="miss")
+        metric = self.index.topology.customize(self._w0, blocked)
+        with self._lock:
+            self._metrics[blocked] = metric
+            while len(self._metrics) > HAZARD_METRIC_CACHE:
+                self._metrics.popitem(last=False)
+        return metric
+
+    def _query(self, s: int, t: int, w: List[float]) -> Tuple[float, List[int]]:
+        """Bidirectional upward search. Returns distance and the hierarchy-level node path."""
+        topo = self.index.topology
+        dist = ({s: 0.0}, {t: 0.0})
+        pred: Tuple[Dict[int, int], Dict[int, int]] = ({s: -1}, {t: -1})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        settled = (set(), set())
+        best, meet = INF, -1
+
+        while heaps[0] or heaps[1]:
+            tops = [h[0][0] if h else INF for h in heaps]
+            if min(tops) >= best:
+                break
+            side = 0 if tops[0] <= tops[1] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+
+            for v, a in topo.upward(u):
+                wa = w[a]
+                if wa == INF:
+                    continue
+                nd = d + wa
+                if nd < dist[side].get(v, INF):
+                    dist[side][v] = nd
+                    pred[side][v] = u
+                    heapq.heappush(heaps[side], (nd, v))
+
+        if meet < 0:
+            raise NoPathError
+
+        forward = [meet]
+        while pred[0][forward[-1]] != -1:
+            forward.append(pred[0][forward[-1]])
+        forward.reverse()
+        backward = [meet]
+        while pred[1][backward[-1]] != -1:
+            backward.append(pred[1][backward[-1]])
+        return best, forward + backward[1:]
+
+    def _unpack(self, nodes: List[int], mid: List[int]) -> List[int]:
+        """Replace every shortcut arc by the original edges it stands for."""
+        topo = self.index.topology
+        out = [nodes[0]]
+        for a, b in zip(nodes, nodes[1:]):
+            stack = [(a, b)]
+            while stack:
+                u, v = stack.pop()
+                m = mid[topo.arc(u, v)]
+                if m < 0:
+                    out.append(v)
+                else:
+                    stack.append((m, v))
+                    stack.append((u, m))
+        return out
+
+    def leg(self, source: str, target: str, blocked: FrozenSet[int] = frozenset()) -> Tuple[float, List[str]]:
+        s = self.cmap.index_of(source)
+        if s is None or s in blocked:
+            raise NodeNotFoundError(f"Node {source} not found in graph")
+        t = self.cmap.index_of(target)
+        if t is None or t in blocked:
+            raise NoPathError(f"No path to {target}.")
+        if s == t:
+            return 0.0, [source]
+
+        w, mid = self._metric(blocked)
+        try:
+            distance, nodes = self._query(s, t, w)
+        except NoPathError:
+            raise NoPathError(f"No path to {target}.") from None
+        return float(distance), [self.cmap.node_id(i) for i in self._unpack(nodes, mid)]
+
+    # Point-to-point CH queries are cheap; a one-to-many Dijkstra could break ties differently
+    legs_from = BaseRouteEngine.legs_from
+
+
+_INDEXES: Dict[str, Tuple[float, CHIndex]] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def load_ch_index(cmap: CompiledMap) -> Optional[CHIndex]:
+    """CH index of a compiled map if one exists and is not older than the map."""
+    path = ch_path_for(cmap.path)
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    if mtime < os.path.getmtime(cmap.path):
+        return None
+
+    with _INDEXES_LOCK:
+        cached = _INDEXES.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        index = CHIndex(path)
+        _INDEXES[path] = (mtime, index)
+        return index
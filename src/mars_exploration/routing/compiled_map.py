@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from mars_exploration.commons import metrics, tracing
+
+
+# Binary layout of a compiled map (.marsmap):
+#   8 bytes   magic
+#   8 bytes   little-endian header length
+#   N bytes   JSON header (format version, terrain vocabulary, array table)
+#   ...       arrays, each starting on a 64-byte boundary
+MAGIC = b"MARSMAP\x00"
+FORMAT_VERSION = 1
+COMPILED_SUFFIX = ".marsmap"
+_ALIGN = 64
+
+# Shared by every graph-level cache (maps, tiles, engines, CH metrics, reachability).
+CACHE_LOOKUPS = metrics.counter("mars_cache_lookups_total", "Graph cache lookups by cache and result.", ("cache", "result"))
+
+# Base traversal cost of an edge before its terrain multiplier.
+BASE_WEIGHT = 10.0
+DEFAULT_TERRAIN = "plain"
+# Values of the `charging` node attribute that mark a charging station
+_TRUE = ("1", "true", "yes")
+
+
+def compiled_path_for(graphml_path: str) -> str:
+    """Default location of the compiled file for a graphml source."""
+    return os.path.splitext(graphml_path)[0] + COMPILED_SUFFIX
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def compile_map(graphml_path: str, out_path: Optional[str] = None) -> str:
+    """
+    Convert a graphml terrain map into the compact binary format.
+
+    The file holds a node table, terrain codes, charging-station flags (the
+    `charging` node attribute) and the undirected adjacency in CSR form (both
+    directions stored) with the `length` and `energy` edge attributes aligned
+    to the adjacency entries.
+    Returns the path of the written file.
+    """
+    import networkx as nx
+
+    out_path = out_path or compiled_path_for(graphml_path)
+    graph = nx.read_graphml(graphml_path)
+
+    node_ids = [str(n) for n in graph.nodes]
+    index = {n: i for i, n in enumerate(graph.nodes)}
+
+    terrains: List[str] = []
+    terrain_codes = np.zeros(len(node_ids), dtype=np.uint8)
+    charging = np.zeros(len(node_ids), dtype=np.uint8)
+    for i, (_, data) in enumerate(graph.nodes(data=True)):
+        terrain = str(data.get("terrain", DEFAULT_TERRAIN)).strip().lower()
+        if terrain not in terrains:
+            terrains.append(terrain)
+        terrain_codes[i] = terrains.index(terrain)
+        charging[i] = str(data.get("charging", "")).strip().lower() in _TRUE
+
+    adjacency: List[List[Tuple[int, float, float]]] = [[] for _ in node_ids]
+    for s, t, data in graph.edges(data=True):
+        length = float(data.get("length", 1.0))
+        energy = float(data.get("energy", 0.0))
+        adjacency[index[s]].append((index[t], length, energy))
+        if s != t:
+            adjacency[index[t]].append((index[s], length, energy))
+
+    indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(a) for a in adjacency])
+    flat = [e for a in adjacency for e in a]
+
+    arrays = {
+        "node_ids": np.array(node_ids, dtype=f"<U{max((len(n) for n in node_ids), default=1)}"),
+        "terrain": terrain_codes,
+        "charging": charging,
+        "indptr": indptr,
+        "indices": np.array([e[0] for e in flat], dtype=np.int32),
+        "length": np.array([e[1] for e in flat], dtype=np.float64),
+        "energy": np.array([e[2] for e in flat], dtype=np.float64),
+    }
+    write_arrays(out_path, arrays, {"terrains": terrains, "source": os.path.basename(graphml_path)})
+    return out_path
+
+
+def write_arrays(out_path: str, arrays: Mapping[str, np.ndarray], extra: Dict[str, Any]) -> None:
+    """Write arrays in the .marsmap layout. The file is replaced atomically."""
+    table: Dict[str, Dict[str, Any]] = {}
+    # Two passes: offsets depend on the header size, which depends on the offsets.
+    header_len = 0
+    for _ in range(2):
+        offset = _align(len(MAGIC) + 8 + header_len)
+        for name, arr in arrays.items():
+            table[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset = _align(offset + arr.nbytes)
+        header = json.dumps({"version": FORMAT_VERSION, "arrays": table, **extra}).encode("utf-8")
+        header_len = len(header)
+
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(table[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp_path, out_path)
+
+
+def _read_header(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a compiled mars map")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        return json.loads(f.read(header_len).decode("utf-8"))
+
+
+def read_arrays(path: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Header and np.memmap views of every array stored in a .marsmap layout file."""
+    header = _read_header(path)
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {header.get('version')}, expected {FORMAT_VERSION}")
+
+    arrays: Dict[str, np.ndarray] = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if not int(np.prod(shape)):
+            # np.memmap cannot map zero bytes
+            arrays[name] = np.zeros(shape, dtype=np.dtype(spec["dtype"]))
+            continue
+        arrays[name] = np.memmap(path, dtype=np.dtype(spec["dtype"]), mode="r", offset=spec["offset"], shape=shape)
+    return header, arrays
+
+
+class CompiledMap:
+    """
+    Read-only view over a compiled map.
+
+    Arrays are np.memmap views, so opening a map costs a header read and the
+    OS page cache is shared by every process that opens the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        header, arrays = read_arrays(path)
+        self.terrains: Tuple[str, ...] = tuple(header.get("terrains", []))
+        self.node_ids: np.ndarray = arrays["node_ids"]
+        self.terrain: np.ndarray = arrays["terrain"]
+        self.indptr: np.ndarray = arrays["indptr"]
+        self.indices: np.ndarray = arrays["indices"]
+        self.length: np.ndarray = arrays["length"]
+        self.energy: np.ndarray = arrays["energy"]
+        # Absent in maps compiled before charging stations were recorded
+        self.charging: Optional[np.ndarray] = arrays.get("charging")
+
+        self._index: Optional[Dict[str, int]] = None
+        self._weights: Dict[Any, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def num_nodes(self) -> int:
+        return int(self.node_ids.shape[0])
+
+    def index_of(self, node_id: str) -> Optional[int]:
+        """Node index for a node id, or None if the node is not on the map."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = {str(n): i for i, n in enumerate(self.node_ids.tolist())}
+        return self._index.get(node_id)
+
+    def node_id(self, index: int) -> str:
+        return str(self.node_ids[index])
+
+    def terrain_of(self, index: int) -> str:
+        return self.terrains[int(self.terrain[index])]
+
+    def charging_indices(self) -> List[int]:
+        """Nodes marked as charging stations in the source map."""
+        if self.charging is None:
+            return []
+        return np.flatnonzero(np.asarray(self.charging)).tolist()
+
+    def edge_sources(self) -> np.ndarray:
+        """Source node of every adjacency entry (expanded CSR row index)."""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.indptr))
+
+    def edge_weights(self, multipliers: Optional[Mapping[str, float]] = None) -> np.ndarray:
+        """
+        Traversal cost of every adjacency entry.
+
+        With multipliers: BASE_WEIGHT times the mean
+        of both endpoint multipliers (unknown terrain counts as 1.0).
+        Without multipliers every edge costs 1 (hop count).
+        """
+        key = tuple(sorted(multipliers.items())) if multipliers is not None else None
+        weights = self._weights.get(key)
+        if weights is None:
+            if multipliers is None:
+                weights = np.ones(self.indices.shape[0], dtype=np.float64)
+            else:
+                per_terrain = np.array([float(multipliers.get(t, 1.0)) for t in self.terrains] or [1.0])
+                node_mult = per_terrain[np.asarray(self.terrain)]
+                weights = BASE_WEIGHT * (node_mult[self.edge_sources()] + node_mult[np.asarray(self.indices)]) / 2.0
+            self._weights[key] = weights
+        return weights
+
+    def to_networkx(self):
+        """Rebuild a networkx graph (for plotting and debugging)."""
+        import networkx as nx
+
+        graph = nx.Graph()
+        ids = self.node_ids.tolist()
+        charging = set(self.charging_indices())
+        for i, node in enumerate(ids):
+            graph.add_node(node, terrain=self.terrain_of(i), **({"charging": "true"} if i in charging else {}))
+        sources = self.edge_sources().tolist()
+        for s, t, length, energy in zip(sources, self.indices.tolist(), self.length.tolist(), self.energy.tolist()):
+            if s <= t:
+                graph.add_edge(ids[s], ids[t], length=length, energy=energy)
+        return graph
+
+
+_MAP_CACHE: Dict[str, Tuple[float, CompiledMap]] = {}
+_MAP_CACHE_LOCK = threading.Lock()
+
+
+def ensure_compiled(map_path: str) -> str:
+    """
+    Return the compiled file for map_path, compiling it when needed.
+
+    map_path can point at the graphml source or at a compiled file. A graphml
+    source is recompiled whenever it is newer than its compiled file.
+    """
+    if map_path.endswith(COMPILED_SUFFIX):
+        return map_path
+
+    compiled = compiled_path_for(map_path)
+    if not os.path.exists(compiled) or os.path.getmtime(map_path) > os.path.getmtime(compiled):
+        compile_map(map_path, compiled)
+    else:
+        try:
+            version = _read_header(compiled).get("version")
+        except ValueError:
+            version = None
+        if version != FORMAT_VERSION:
+            compile_map(map_path, compiled)
+    return compiled
+
+
+def load_map(map_path: str) -> CompiledMap:
+    """Open (and cache per process) the compiled map for a graphml or .marsmap path."""
+    with tracing.span("map.ensure_compiled", "graph", path=map_path):
+        compiled = os.path.abspath(ensure_compiled(map_path))
+    mtime = os.path.getmtime(compiled)
+
+    with _MAP_CACHE_LOCK:
+        cached = _MAP_CACHE.get(compiled)
+        if cached is not None and cached[0] == mtime:
+            CACHE_LOOKUPS.inc(cache="map", result="hit")
+            return cached[1]
+        CACHE_LOOKUPS.inc(cache="map", result="miss")
+        with tracing.span("map.load", "graph", path=compiled) as span:
+            cmap = CompiledMap(compiled)
+            span.set(nodes=cmap.num_nodes)
+        _MAP_CACHE[compiled] = (mtime, cmap)
+        return cmap
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+
+# Terrain traversal multipliers per vehicle class.
+# Edge cost = BASE_WEIGHT * mean(multiplier of both endpoints).
+ROVER_TERRAIN_MULTIPLIERS: Dict[str, float] = {
+    "plain": 1.0,
+    "rocky": 1.3,
+    "sandy": 1.6,
+    "icy": 2.0,
+    "crater": 2.5,
+}
+
+DRONE_TERRAIN_MULTIPLIERS: Dict[str, float] = {
+    "plain": 1.0,
+    "rocky": 1.3,
+    "sandy": 1.6,
+    "icy": 2.0,
+    "crater": 2.5,
+}
+
+# Named cost models precomputed by offline indexes (tiles, contraction hierarchies).
+# None means hop count (use_terrain_weight=False).
+COST_MODELS: Dict[str, Optional[Dict[str, float]]] = {
+    "rover": ROVER_TERRAIN_MULTIPLIERS,
+    "drone": DRONE_TERRAIN_MULTIPLIERS,
+    "hop": None,
+}
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+from mars_exploration.routing.compiled_map import BASE_WEIGHT, CompiledMap
+from mars_exploration.routing.engine import NoPathError, NodeNotFoundError, RouteEngine, dijkstra, unwind
+
+
+INF = float("inf")
+
+
+class ShortestPathTree:
+    """Full shortest-path tree of one root under the router's current state."""
+
+    def __init__(self, root: int, dist: Dict[int, float], pred: Dict[int, int]):
+        self.root = root
+        self.dist = dist
+        self.pred = pred
+        self.children: Dict[int, Set[int]] = {}
+        for v, u in pred.items():
+            if u != -1:
+                self.children.setdefault(u, set()).add(v)
+
+    def set_pred(self, v: int, u: int) -> None:
+        old = self.pred.get(v)
+        if old is not None and old != -1:
+            self.children.get(old, set()).discard(v)
+        self.pred[v] = u
+        self.children.setdefault(u, set()).add(v)
+
+    def subtree(self, v: int) -> Set[int]:
+        out, stack = set(), [v]
+        while stack:
+            x = stack.pop()
+            if x in out or x not in self.dist:
+                continue
+            out.add(x)
+            stack.extend(self.children.get(x, ()))
+        return out
+
+    def remove(self, nodes: Set[int]) -> None:
+        for v in nodes:
+            u = self.pred.pop(v, -1)
+            if u != -1:
+                self.children.get(u, set()).discard(v)
+            self.dist.pop(v, None)
+            self.children.pop(v, None)
+
+
+class DynamicRouter(RouteEngine):
+    """
+    Route engine with a mutable hazard/terrain state and cached shortest-path trees.
+
+    Trees are kept per leg source. apply() pushes a delta (blocked or restored
+    nodes, terrain changes, edge weight overrides) and repairs every cached
+    tree in place instead of recomputing it:
+      - nodes whose tree path used a removed or more expensive arc lose their
+        label (the affected subtree) and are reseeded from their neighbours
+      - cheaper arcs and restored nodes seed improvements directly
+      - a Dijkstra pass from those seeds fixes the rest
+    Work is proportional to the part of each tree that actually changes.
+    """
+
+    # Answers change with apply(); its own trees are the cache
+    cache_legs = False
+
+    def __init__(
+        self,
+        cmap: CompiledMap,
+        multipliers: Optional[Mapping[str, float]] = None,
+        prohibited: Iterable[str] = (),
+    ):
+        super().__init__(cmap, multipliers)
+        self.weights = np.array(self.weights, dtype=np.float64)
+        self.blocked: Set[int] = set(self.blocked_indices(prohibited))
+        self._indptr: List[int] = cmap.indptr.tolist()
+        self._indices: List[int] = cmap.indices.tolist()
+        self._terrain: Dict[int, str] = {}
+        self._overrides: Dict[Tuple[int, int], float] = {}
+        self._trees: Dict[int, ShortestPathTree] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # queries
+    # ------------------------------------------------------------------
+    def tree(self, root: int) -> ShortestPathTree:
+        with self._lock:
+            tree = self._trees.get(root)
+            if tree is None:
+                dist, pred = dijkstra(self._indptr, self.cmap.indices, self.weights, root, None, frozenset(self.blocked))
+                tree = ShortestPathTree(root, dist, pred)
+                self._trees[root] = tree
+            return tree
+
+    def leg(self, source: str, target: str, blocked: FrozenSet[int] = frozenset()) -> Tuple[float, List[str]]:
+        """Shortest leg under the current state (plus any extra blocked nodes)."""
+        if blocked and not blocked <= self.blocked:
+            with self._lock:
+                extra = frozenset(self.blocked | blocked)
+                s, t = self.cmap.index_of(source), self.cmap.index_of(target)
+                if s is None or s in extra:
+                    raise NodeNotFoundError(f"Node {source} not found in graph")
+                if t is None or t in extra:
+                    raise NoPathError(f"No path to {target}.")
+                dist, pred = dijkstra(self._indptr, self.cmap.indices, self.weights, s, t, extra)
+                if t not in pred:
+                    raise NoPathError(f"No path to {target}.")
+                return float(dist[t]), [self.cmap.node_id(i) for i in unwind(pred, t)]
+
+        distance, path = self.leg_indices(source, target)
+        return distance, [self.cmap.node_id(i) for i in path]
+
+    def leg_indices(self, source: str, target: str) -> Tuple[float, List[int]]:
+        with self._lock:
+            s = self.cmap.index_of(source)
+            if s is None or s in self.blocked:
+                raise NodeNotFoundError(f"Node {source} not found in graph")
+            t = self.cmap.index_of(target)
+            if t is None or t in self.blocked:
+                raise NoPathError(f"No path to {target}.")
+            if s == t:
+                return 0.0, [s]
+            tree = self.tree(s)
+            if t not in tree.pred:
+                raise NoPathError(f"No path to {target}.")
+            return float(tree.dist[t]), unwind(tree.pred, t)
+
+    # ------------------------------------------------------------------
+    # deltas
+    # ------------------------------------------------------------------
+    def _multiplier(self, v: int) -> float:
+        terrain = self._terrain.get(v)
+        if terrain is None:
+            terrain = self.cmap.terrain_of(v)
+        return float(self.multipliers.get(terrain, 1.0))
+
+    def _arc_weight(self, u: int, v: int) -> float:
+        override = self._overrides.get((min(u, v), max(u, v)))
+        if override is not None:
+            return override
+        if self.multipliers is None:
+            return 1.0
+        return BASE_WEIGHT * (self._multiplier(u) + self._multiplier(v)) / 2.0
+
+    def _reweigh(self, u: int, changed: List[Tuple[int, int, float, float]]) -> None:
+        """Recompute the weights of u's arcs in both directions."""
+        for e in range(self._indptr[u], self._indptr[u + 1]):
+            v = self._indices[e]
+            if v != u:
+                self._set_weight(u, v, changed)
+
+    def _set_weight(self, u: int, v: int, changed: List[Tuple[int, int, float, float]]) -> None:
+        new = self._arc_weight(u, v)
+        for x, y in ((u, v), (v, u)):
+            e = self._arc(x, y)
+            old = float(self.weights[e])
+            if old != new:
+                self.weights[e] = new
+                changed.append((x, y, old, new))
+
+    def _arc(self, u: int, v: int) -> int:
+        for e in range(self._indptr[u], self._indptr[u + 1]):
+            if self._indices[e] == v:
+                return e
+        raise KeyError((u, v))
+
+    def apply(
+        self,
+        add: Iterable[str] = (),
+        remove: Iterable[str] = (),
+        terrain: Optional[Mapping[str, str]] = None,
+        edge_weights: Optional[Mapping[Tuple[str, str], Optional[float]]] = None,
+    ) -> Dict[int, Optional[Set[int]]]:
+        """
+        Apply a hazard delta and repair the cached trees.
+
+        - add / remove: node ids to block / restore
+        - terrain: node id -> new terrain (reweighs incident edges)
+        - edge_weights: (node, node) -> weight override, or None to drop the override
+        Unknown node ids are ignored. Returns, per cached tree root, the nodes
+        whose distance or tree parent changed (None when the tree was dropped
+        because its root became blocked).
+        """
+        with self._lock:
+            index_of = self.cmap.index_of
+            add_idx = {i for i in (index_of(str(n).strip()) for n in add) if i is not None}
+            remove_idx = {i for i in (index_of(str(n).strip()) for n in remove) if i is not None}
+            newly_blocked = add_idx - self.blocked
+            restored = (remove_idx - add_idx) & self.blocked
+
+            arcs: List[Tuple[int, int, float, float]] = []
+            for node, value in (terrain or {}).items():
+                v = index_of(str(node).strip())
+                if v is None:
+                    continue
+                self._terrain[v] = str(value).strip().lower()
+                self._reweigh(v, arcs)
+            for (a, b), weight in (edge_weights or {}).items():
+                u, v = index_of(str(a).strip()), index_of(str(b).strip())
+                if u is None or v is None or u == v:
+                    continue
+                key = (min(u, v), max(u, v))
+                if weight is None:
+                    self._overrides.pop(key, None)
+                else:
+                    self._overrides[key] = float(weight)
+                try:
+                    self._set_weight(u, v, arcs)
+                except KeyError:
+                    continue
+
+            self.blocked |= newly_blocked
+            self.blocked -= restored
+
+            changed: Dict[int, Optional[Set[int]]] = {}
+            for root in list(self._trees):
+                if root in self.blocked:
+                    del self._trees[root]
+                    changed[root] = None
+                else:
+                    changed[root] = self._repair(self._trees[root], arcs, newly_blocked, restored)
+            return changed
+
+    def _repair(
+        self,
+        tree: ShortestPathTree,
+        arcs: List[Tuple[int, int, float, float]],
+        newly_blocked: Set[int],
+        restored: Set[int],
+    ) -> Set[int]:
+        dist, pred = tree.dist, tree.pred
+        indptr, indices, weights = self._indptr, self._indices, self.weights
+        blocked = self.blocked
+
+        # 1. labels that relied on a removed node or a more expensive arc
+        affected: Set[int] = set()
+        for v in newly_blocked:
+            if v in dist:
+                affected |= tree.subtree(v)
+        for u, v, old, new in arcs:
+            if new > old and pred.get(v) == u:
+                affected |= tree.subtree(v)
+        before = {v: (dist[v], pred[v]) for v in affected}
+        tree.remove(affected)
+
+        touched: Set[int] = set()
+        heap: List[Tuple[float, int]] = []
+
+        def offer(v: int, d: float, u: int) -> None:
+            if d < dist.get(v, INF):
+                dist[v] = d
+                tree.set_pred(v, u)
+                touched.add(v)
+                heapq.heappush(heap, (d, v))
+
+        def reseed(v: int) -> None:
+            for e in range(indptr[v], indptr[v + 1]):
+                y = indices[e]
+                if y in dist and y not in blocked:
+                    offer(v, dist[y] + float(weights[e]), y)
+
+        # 2. seeds: affected and restored nodes from their labelled neighbours,
+        #    heads of cheaper arcs from their tails
+        for v in affected | restored:
+            if v not in blocked:
+                reseed(v)
+        for u, v, old, new in arcs:
+            if new < old and u in dist and v not in blocked:
+                # an arc can change twice in one delta, use its final weight
+                offer(v, dist[u] + float(weights[self._arc(u, v)]), u)
+
+        # 3. propagate
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist.get(u, INF):
+                continue
+            lo, hi = indptr[u], indptr[u + 1]
+            for y, w in zip(indices[lo:hi], weights[lo:hi].tolist()):
+                if y not in blocked:
+                    offer(y, d + w, u)
+
+        changed = {v for v in affected if (dist.get(v), pred.get(v)) != before[v]}
+        changed |= touched - affected
+        return changed
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from mars_exploration.commons import metrics, tracing
+from mars_exploration.routing.compiled_map import CACHE_LOOKUPS, CompiledMap, load_map
+from mars_exploration.routing.engine import NoPathError, NodeNotFoundError, dijkstra
+
+
+# Rover round trips with mid-route recharges.
+#
+# The battery is in percent and an edge drains cost * energy_cost of it; it
+# must never drop below the energy threshold. Charging stations (the graphml
+# `charging` node attribute, MARS_CHARGING_NODES and the stations passed in)
+# refill it to 100, and so does the rover's own base. The search runs over
+# (node, energy, next target) states in distance order (A* on the shortest
+# remaining distance) and keeps a state only when it arrives with more energy
+# than every shorter one at the same node and target; energies are compared
+# in MARS_ENERGY_BUCKET wide buckets so a node is settled at most 100 / bucket
+# times. Battery levels themselves are exact, so every route returned is
+# feasible. Results and the per-target distance labels behind them are kept
+# in LRU caches of MARS_RECHARGE_CACHE entries each, per router.
+CHARGING_ENV = "MARS_CHARGING_NODES"
+ENERGY_BUCKET_ENV = "MARS_ENERGY_BUCKET"
+RECHARGE_CACHE_ENV = "MARS_RECHARGE_CACHE"
+FULL_BATTERY = 100.0
+
+RECHARGE_ROUTES = metrics.counter(
+    "mars_recharge_routes_total", "Energy-state round-trip searches by result.", ("result",)
+)
+
+
+class RechargeRoute(NamedTuple):
+    distance: float
+    path: List[str]
+    # Nodes where the battery is refilled, in route order
+    stops: List[str]
+    # Energy used before the first refill (the whole route without stops)
+    first_energy: float
+
+
+def charging_nodes_from_env() -> List[str]:
+    """Charging node ids from MARS_CHARGING_NODES (comma separated)."""
+    return [n.strip() for n in os.getenv(CHARGING_ENV, "").split(",") if n.strip()]
+
+
+def energy_bucket() -> float:
+    return max(1e-3, float(os.getenv(ENERGY_BUCKET_ENV, "1.0")))
+
+
+class EnergyRouter:
+    """Energy-state searches over one compiled map and cost model; distance labels and routes are cached."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, cmap: CompiledMap, multipliers: Optional[Mapping[str, float]] = None):
+        self.cmap = cmap
+        self.weights = cmap.edge_weights(dict(multipliers) if multipliers is not None else None)
+        self._adj: Dict[int, List[Tuple[int, float]]] = {}
+        self._dist: "OrderedDict[Tuple[int, FrozenSet[int]], Dict[int, float]]" = OrderedDict()
+        self._routes: "OrderedDict[Tuple, Union[RechargeRoute, Exception]]" = OrderedDict()
+
+    def blocked_indices(self, prohibited: Iterable[str]) -> FrozenSet[int]:
+        return frozenset(i for i in map(self.cmap.index_of, prohibited) if i is not None)
+
+    def stations(self, charging_nodes: Iterable[str] = ()) -> FrozenSet[int]:
+        """Charging stations: the map attribute, MARS_CHARGING_NODES and charging_nodes."""
+        extra = [*charging_nodes_from_env(), *charging_nodes]
+        return frozenset(self.cmap.charging_indices()) | self.blocked_indices(extra)
+
+    def _neighbours(self, u: int, blocked: FrozenSet[int]) -> List[Tuple[int, float]]:
+        adj = self._adj.get(u)
+        if adj is None:
+            lo, hi = int(self.cmap.indptr[u]), int(self.cmap.indptr[u + 1])
+            best: Dict[int, float] = {}
+            for v, w in zip(self.cmap.indices[lo:hi].tolist(), self.weights[lo:hi].tolist()):
+                if v != u and w < best.get(v, math.inf):
+                    best[v] = w
+            adj = self._adj[u] = list(best.items())
+        return [(v, w) for v, w in adj if v not in blocked] if blocked else adj
+
+    def _distances_to(self, target: int, blocked: FrozenSet[int]) -> Dict[int, float]:
+        key = (target, blocked)
+        with self._lock:
+            dist = self._dist.get(key)
+            if dist is not None:
+                self._dist.move_to_end(key)
+        if dist is None:
+            dist = dijkstra(self.cmap.indptr, self.cmap.indices, self.weights, target, blocked=blocked)[0]
+            self._remember(self._dist, key, dist)
+        return dist
+
+    def _remember(self, cache: OrderedDict, key: Tuple, value) -> None:
+        limit = int(os.getenv(RECHARGE_CACHE_ENV, "4096"))
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+
+    def route(
+        self,
+        source: str,
+        targets: List[str],
+        blocked: FrozenSet[int],
+        stations: FrozenSet[int],
+        energy_cost: float,
+        energy_threshold: float,
+        bucket: Optional[float] = None,
+    ) -> RechargeRoute:
+        """
+        Shortest round trip source -> targets -> source that keeps the battery
+        (full at departure) at or above energy_threshold, recharging at
+        stations on the way. Raises NoPathError when there is none.
+        """
+        bucket = energy_bucket() if bucket is None else bucket
+        key = (source, tuple(targets), blocked, stations, float(energy_cost), float(energy_threshold), bucket)
+        with self._lock:
+            result = self._routes.get(key)
+            if result is not None:
+                self._routes.move_to_end(key)
+        if result is None:
+            CACHE_LOOKUPS.inc(cache="recharge_route", result="miss")
+            try:
+                result = self._search(source, targets, blocked, stations, float(energy_cost), float(energy_threshold), bucket)
+                RECHARGE_ROUTES.inc(result="ok")
+            except NoPathError as e:
+                RECHARGE_ROUTES.inc(result="no_path")
+                result = e
+            except NodeNotFoundError as e:
+                RECHARGE_ROUTES.inc(result="node_not_found")
+                result = e
+            self._remember(self._routes, key, result)
+        else:
+            CACHE_LOOKUPS.inc(cache="recharge_route", result="hit")
+        if isinstance(result, Exception):
+            raise type(result)(*result.args)
+        return result
+
+    def _search(
+        self,
+        source: str,
+        targets: List[str],
+        blocked: FrozenSet[int],
+        stations: FrozenSet[int],
+        energy_cost: float,
+        energy_threshold: float,
+        bucket: float,
+    ) -> RechargeRoute:
+        s = self.cmap.index_of(source)
+        if s is None or s in blocked:
+            raise NodeNotFoundError(f"Node {source} not found in graph")
+        waypoints = [s]
+        for target in targets:
+            t = self.cmap.index_of(target)
+            if t is None or t in blocked:
+                raise NoPathError(f"No path to {target}.")
+            waypoints.append(t)
+        waypoints.append(s)
+        last = len(waypoints)
+        dists = [self._distances_to(w, blocked) for w in waypoints]
+        rest = [0.0] * last
+        for j in range(last - 2, -1, -1):
+            leg = dists[j + 1].get(waypoints[j])
+            if leg is None:
+                raise NoPathError(f"No path from {source} to {targets}.")
+            rest[j] = leg + rest[j + 1]
+        chargers = stations | {s}
+
+        def advance(u: int, j: int) -> int:
+            while j < last and u == waypoints[j]:
+                j += 1
+            return j
+
+        def remaining(u: int, j: int) -> float:
+            return dists[j].get(u, math.inf) + rest[j] if j < last else 0.0
+
+        # label: (node, next waypoint, energy, parent label, refilled here)
+        labels: List[Tuple[int, int, float, int, bool]] = []
+        settled: Dict[Tuple[int, int], int] = {}
+        heap: List[Tuple[float, float, int, int]] = []
+
+        def push(u: int, j: int, energy: float, g: float, stops: int, parent: int, refilled: bool) -> None:
+            labels.append((u, j, energy, parent, refilled))
+            heapq.heappush(heap, (g + remaining(u, j), g, stops, len(labels) - 1))
+
+        with tracing.span("routing.recharge", "routing", targets=len(targets)) as span:
+            push(s, advance(s, 1), FULL_BATTERY, 0.0, 0, -1, False)
+            while heap:
+                _, g, stops, i = heapq.heappop(heap)
+                u, j, energy, _, _ = labels[i]
+                if j == last:
+                    span.set(labels=len(labels), stops=stops)
+                    return self._unwind(i, labels, g, energy_cost)
+                level = int(energy // bucket)
+                if level <= settled.get((u, j), -1):
+                    continue
+                settled[(u, j)] = level
+
+                if u in chargers and energy < FULL_BATTERY:
+                    push(u, j, FULL_BATTERY, g, stops + 1, i, True)
+                for v, w in self._neighbours(u, blocked):
+                    left = energy - w * energy_cost
+                    if left < energy_threshold:
+                        continue
+                    nj = advance(v, j)
+                    if int(left // bucket) <= settled.get((v, nj), -1) or math.isinf(remaining(v, nj)):
+                        continue
+                    push(v, nj, left, g + w, stops, i, False)
+            span.set(labels=len(labels))
+        raise NoPathError(f"No route from {source} to {targets} and back within the battery, even with recharges.")
+
+    def _unwind(self, i: int, labels, distance: float, energy_cost: float) -> RechargeRoute:
+        chain = []
+        while i != -1:
+            chain.append(labels[i])
+            i = labels[i][3]
+        chain.reverse()
+        path: List[str] = []
+        stops: List[str] = []
+        first_energy = None
+        for u, _, energy, _, refilled in chain:
+            node = self.cmap.node_id(u)
+            if refilled:
+                stops.append(node)
+                if first_energy is None:
+                    first_energy = FULL_BATTERY - previous
+            elif not path or path[-1] != node:
+                path.append(node)
+            previous = energy
+        if first_energy is None:
+            first_energy = distance * energy_cost
+        return RechargeRoute(float(distance), path, stops, float(first_energy))
+
+
+_ROUTERS: Dict[Tuple[str, Optional[Tuple]], EnergyRouter] = {}
+_ROUTERS_LOCK = threading.Lock()
+
+
+def get_energy_router(map_path: str, multipliers: Optional[Mapping[str, float]] = None) -> EnergyRouter:
+    """Shared router per (map, cost model). Tiled maps are searched on the graphml they were built from."""
+    from mars_exploration.routing.tiles import source_map_path
+
+    cmap = load_map(source_map_path(map_path))
+    key = (cmap.path, tuple(sorted(multipliers.items())) if multipliers is not None else None)
+    with _ROUTERS_LOCK:
+        router = _ROUTERS.get(key)
+        if router is None or router.cmap is not cmap:
+            router = _ROUTERS[key] = EnergyRouter(cmap, multipliers)
+        return router
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+from collections import OrderedDict
+from typing import Collection, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple, Union
+
+from mars_exploration.commons import metrics
+from mars_exploration.routing.compiled_map import CACHE_LOOKUPS, CompiledMap, load_map
+
+ROUTE_QUERIES = metrics.counter("mars_route_queries_total", "Round-trip route queries by result.", ("result",))
+ROUTE_LEGS = metrics.counter("mars_route_legs_total", "Shortest-path leg queries.")
+
+# Legs (source, target, blocked set) kept per shared engine, filled by chain()
+# and ahead of time by warm_legs() (see planning/speculate.py).
+LEG_CACHE_ENV = "MARS_LEG_CACHE"
+
+
+class NoPathError(Exception):
+    """No route exists between two nodes (after removing prohibited nodes)."""
+
+
+class NodeNotFoundError(Exception):
+    """A route starts at a node that is not on the map."""
+
+
+def dijkstra(
+    indptr,
+    indices,
+    weights,
+    source: int,
+    target: Optional[int] = None,
+    blocked: FrozenSet[int] = frozenset(),
+    targets: Collection[int] = (),
+) -> Tuple[Dict[int, float], Dict[int, int]]:
+    """
+    Dijkstra over CSR arrays (memmaps are sliced per settled node, so only the
+    pages that the search touches are read).
+
+    Stops early once target (or every node of targets) is settled; labels of
+    settled nodes are the same as in a full search. Returns (dist, pred);
+    pred[source] is -1.
+    """
+    dist: Dict[int, float] = {source: 0.0}
+    pred: Dict[int, int] = {source: -1}
+    done = set()
+    pending = set(targets)
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+        if u == target:
+            break
+        if pending:
+            pending.discard(u)
+            if not pending:
+                break
+        lo, hi = int(indptr[u]), int(indptr[u + 1])
+        for v, w in zip(indices[lo:hi].tolist(), weights[lo:hi].tolist()):
+            if v in blocked:
+                continue
+            nd = d + w
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(heap, (nd, v))
+    return dist, pred
+
+
+def unwind(pred: Mapping[int, int], target: int) -> List[int]:
+    """Path source -> target from a predecessor map."""
+    path = [target]
+    while pred[path[-1]] != -1:
+        path.append(pred[path[-1]])
+    path.reverse()
+    return path
+
+
+LegResult = Union[Tuple[float, List[str]], Exception]
+
+
+class BaseRouteEngine:
+    """Shared route composition for all engines (single file or tiled maps)."""
+
+    # Engines whose answers change over time (DynamicRouter) turn this off
+    cache_legs = True
+    _legs_lock = threading.Lock()
+
+    def blocked_indices(self, prohibited: Iterable[str]) -> FrozenSet:
+        raise NotImplementedError
+
+    def leg(self, source: str, target: str, blocked: FrozenSet = frozenset()) -> Tuple[float, List[str]]:
+        raise NotImplementedError
+
+    def legs_from(self, source: str, targets: Iterable[str], blocked: FrozenSet = frozenset()) -> Dict[str, LegResult]:
+        """leg() from source to every target; a route error is returned in place of its leg."""
+        out: Dict[str, LegResult] = {}
+        for target in targets:
+            try:
+                out[target] = self.leg(source, target, blocked)
+            except (NoPathError, NodeNotFoundError) as e:
+                out[target] = e
+        return out
+
+    def _leg_cache(self) -> "OrderedDict[Tuple, LegResult]":
+        cache = self.__dict__.get("_legs")
+        if cache is None:
+            cache = self.__dict__.setdefault("_legs", OrderedDict())
+        return cache
+
+    def _store_leg(self, key: Tuple, result: LegResult) -> None:
+        limit = int(os.getenv(LEG_CACHE_ENV, "50000"))
+        cache = self._leg_cache()
+        with self._legs_lock:
+            cache[key] = result
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+
+    def cached_leg(self, source: str, target: str, blocked: FrozenSet = frozenset()) -> Tuple[float, List[str]]:
+        """leg() through the engine's leg cache."""
+        if not self.cache_legs:
+            return self.leg(source, target, blocked)
+        key = (source, target, blocked)
+        cache = self._leg_cache()
+        with self._legs_lock:
+            result = cache.get(key)
+            if result is not None:
+                cache.move_to_end(key)
+        if result is None:
+            CACHE_LOOKUPS.inc(cache="route_leg", result="miss")
+            try:
+                result = self.leg(source, target, blocked)
+            except (NoPathError, NodeNotFoundError) as e:
+                result = e
+            self._store_leg(key, result)
+        else:
+            CACHE_LOOKUPS.inc(cache="route_leg", result="hit")
+        if isinstance(result, Exception):
+            raise type(result)(*result.args)
+        return result
+
+    def warm_legs(self, sources: Iterable[str], targets: Collection[str], blocked: FrozenSet = frozenset()) -> int:
+        """
+        Compute and cache the legs from every source to every other target ahead
+        of the route queries that will need them. Returns the number of new legs.
+        """
+        if not self.cache_legs:
+            return 0
+        cache = self._leg_cache()
+        added = 0
+        for source in sources:
+            missing = [t for t in targets if t != source and (source, t, blocked) not in cache]
+            if not missing:
+                continue
+            for target, result in self.legs_from(source, missing, blocked).items():
+                self._store_leg((source, target, blocked), result)
+                added += 1
+        return added
+
+    def reachable(self, source: str, targets: List[str], blocked: FrozenSet = frozenset()) -> bool:
+        """False only if some target is certainly unreachable from source."""
+        return True
+
+    def chain(self, source: str, targets: List[str], blocked: FrozenSet = frozenset()) -> Tuple[float, List[str]]:
+        """
+        Round trip source -> target1 -> target2 -> ... -> source.
+
+        Returns the total distance and the concatenated node path.
+        """
+        if not self.reachable(source, targets, blocked):
+            ROUTE_QUERIES.inc(result="unreachable")
+            raise NoPathError(f"No path from {source} to {targets}.")
+        total = 0.0
+        full_path: List[str] = []
+        current = source
+        try:
+            for tnode in list(targets) + [source]:
+                ROUTE_LEGS.inc()
+                leg_dist, leg_path = self.cached_leg(current, tnode, blocked)
+                total += leg_dist
+                full_path.extend(leg_path if not full_path else leg_path[1:])
+                current = tnode
+        except NoPathError:
+            ROUTE_QUERIES.inc(result="no_path")
+            raise
+        except NodeNotFoundError:
+            ROUTE_QUERIES.inc(result="node_not_found")
+            raise
+        ROUTE_QUERIES.inc(result="ok")
+        return total, full_path
+
+
+class RouteEngine(BaseRouteEngine):
+    """
+    Shortest-path queries over a compiled map for one cost model.
+
+    - multipliers: terrain multipliers for terrain-weighted costs, or None for hop count.
+    - prohibited nodes are skipped during the search instead of copying the graph.
+    """
+
+    def __init__(self, cmap: CompiledMap, multipliers: Optional[Mapping[str, float]] = None):
+        self.cmap = cmap
+        self.multipliers = dict(multipliers) if multipliers is not None else None
+        self.weights = cmap.edge_weights(self.multipliers)
+
+    def blocked_indices(self, prohibited: Iterable[str]) -> FrozenSet[int]:
+        """Indices of prohibited nodes that exist on the map."""
+        blocked = set()
+        for node in prohibited:
+            idx = self.cmap.index_of(node)
+            if idx is not None:
+                blocked.add(idx)
+        return frozenset(blocked)
+
+    def reachable(self, source: str, targets: List[str], blocked: FrozenSet[int] = frozenset()) -> bool:
+        """
+        O(1) per target component check (see routing/reachability.py).
+
+        An unknown or blocked source is left to leg() so it reports NodeNotFoundError.
+        """
+        from mars_exploration.routing.reachability import get_reachability
+
+        s = self.cmap.index_of(source)
+        if s is None or s in blocked:
+            return True
+        idx = [self.cmap.index_of(t) for t in targets]
+        if any(t is None or t in blocked for t in idx):
+            return False
+        return get_reachability(self.cmap).connected(s, idx, frozenset(blocked))
+
+    def leg(self, source: str, target: str, blocked: FrozenSet[int] = frozenset()) -> Tuple[float, List[str]]:
+        """Shortest (distance, node-id path) from source to target."""
+        s = self.cmap.index_of(source)
+        if s is None or s in blocked:
+            raise NodeNotFoundError(f"Node {source} not found in graph")
+        t = self.cmap.index_of(target)
+        if t is None or t in blocked:
+            raise NoPathError(f"No path to {target}.")
+        if s == t:
+            return 0.0, [source]
+
+        dist, pred = dijkstra(self.cmap.indptr, self.cmap.indices, self.weights, s, t, blocked)
+        if t not in pred:
+            raise NoPathError(f"No path to {target}.")
+        return float(dist[t]), [self.cmap.node_id(i) for i in unwind(pred, t)]
+
+    def legs_from(self, source: str, targets: Iterable[str], blocked: FrozenSet[int] = frozenset()) -> Dict[str, LegResult]:
+        """One search from source for all targets, with the same answers as leg()."""
+        targets = list(targets)
+        s = self.cmap.index_of(source)
+        if s is None or s in blocked:
+            return {t: NodeNotFoundError(f"Node {source} not found in graph") for t in targets}
+        idx = {t: self.cmap.index_of(t) for t in targets}
+        wanted = {i for i in idx.values() if i is not None and i not in blocked and i != s}
+        dist, pred = dijkstra(self.cmap.indptr, self.cmap.indices, self.weights, s, None, blocked, wanted)
+
+        out: Dict[str, LegResult] = {}
+        for target, t in idx.items():
+            if t is None or t in blocked or (t != s and t not in pred):
+                out[target] = NoPathError(f"No path to {target}.")
+            elif t == s:
+                out[target] = (0.0, [source])
+            else:
+                out[target] = (float(dist[t]), [self.cmap.node_id(i) for i in unwind(pred, t)])
+        return out
+
+
+_ENGINES: Dict[Tuple[str, Optional[Tuple]], BaseRouteEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_route_engine(map_path: str, multipliers: Optional[Mapping[str, float]] = None) -> BaseRouteEngine:
+    """
+    Shared engine per (map, cost model); reused across tool calls.
+
+    map_path may be a graphml/.marsmap file or a tiled map directory.
+    Compiled maps with an up-to-date CH index (see build_ch) answer legs with
+    contraction hierarchy queries unless MARS_USE_CH=0.
+    """
+    from mars_exploration.routing.tiles import is_tiled_map, load_tiled_map, TiledRouteEngine
+
+    if is_tiled_map(map_path):
+        tmap = load_tiled_map(map_path)
+        key = (tmap.root, tuple(sorted(multipliers.items())) if multipliers is not None else None)
+        with _ENGINES_LOCK:
+            engine = _ENGINES.get(key)
+            if engine is None or engine.tmap is not tmap:
+                CACHE_LOOKUPS.inc(cache="route_engine", result="miss")
+                engine = TiledRouteEngine(tmap, multipliers)
+                _ENGINES[key] = engine
+            else:
+                CACHE_LOOKUPS.inc(cache="route_engine", result="hit")
+            return engine
+
+    cmap = load_map(map_path)
+    key = (cmap.path, tuple(sorted(multipliers.items())) if multipliers is not None else None)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None or engine.cmap is not cmap:
+            CACHE_LOOKUPS.inc(cache="route_engine", result="miss")
+            engine = _ch_engine(cmap, multipliers) or RouteEngine(cmap, multipliers)
+            _ENGINES[key] = engine
+        else:
+            CACHE_LOOKUPS.inc(cache="route_engine", result="hit")
+        return engine
+
+
+def _ch_engine(cmap: CompiledMap, multipliers: Optional[Mapping[str, float]]) -> Optional[BaseRouteEngine]:
+    if os.getenv("MARS_USE_CH", "1") == "0":
+        return None
+    from mars_exploration.routing.ch import CHRouteEngine, load_ch_index
+
+    index = load_ch_index(cmap)
+    if index is None:
+        return None
+    model = index.model_for(multipliers)
+    if model is None:
+        return None
+    return CHRouteEngine(cmap, index, model, multipliers)
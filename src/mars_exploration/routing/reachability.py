@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+import numpy as np
+
+from mars_exploration.routing.compiled_map import CACHE_LOOKUPS, CompiledMap
+
+
+# Component labels are cached per prohibited-node set (LRU).
+REACH_CACHE_SIZE = int(os.getenv("MARS_REACH_CACHE", "32"))
+
+BLOCKED = -1
+
+
+class Components:
+    """
+    Connected-component labels of the map minus one set of blocked nodes.
+
+    labels[v] is the component id of v, or BLOCKED. articulation holds the cut
+    vertices of that graph when they are known (None for derived labellings).
+    """
+
+    __slots__ = ("labels", "articulation")
+
+    def __init__(self, labels: np.ndarray, articulation: Optional[FrozenSet[int]]):
+        self.labels = labels
+        self.articulation = articulation
+
+    def connected(self, source: int, targets: Iterable[int]) -> bool:
+        label = self.labels[source]
+        if label == BLOCKED:
+            return False
+        return all(self.labels[t] == label for t in targets)
+
+
+def _components(indptr: List[int], indices: List[int], n: int, blocked: FrozenSet[int]) -> Components:
+    """
+    Labels plus articulation points in one iterative DFS (Hopcroft-Tarjan),
+    O(nodes + edges).
+    """
+    labels = np.full(n, BLOCKED, dtype=np.int32)
+    disc = [-1] * n
+    low = [0] * n
+    articulation: Set[int] = set()
+    clock = 0
+    label = 0
+    for root in range(n):
+        if root in blocked or disc[root] >= 0:
+            continue
+        disc[root] = low[root] = clock
+        clock += 1
+        labels[root] = label
+        root_children = 0
+        # (node, parent, next adjacency position)
+        stack = [(root, -1, indptr[root])]
+        while stack:
+            u, parent, pos = stack[-1]
+            if pos < indptr[u + 1]:
+                stack[-1] = (u, parent, pos + 1)
+                v = indices[pos]
+                if v == u or v in blocked:
+                    continue
+                if disc[v] < 0:
+                    disc[v] = low[v] = clock
+                    clock += 1
+                    labels[v] = label
+                    if u == root:
+                        root_children += 1
+                    stack.append((v, u, indptr[v]))
+                elif v != parent:
+                    low[u] = min(low[u], disc[v])
+                continue
+            stack.pop()
+            if parent >= 0:
+                low[parent] = min(low[parent], low[u])
+                if parent != root and low[u] >= disc[parent]:
+                    articulation.add(parent)
+        if root_children > 1:
+            articulation.add(root)
+        label += 1
+    return Components(labels, frozenset(articulation))
+
+
+class ReachabilityIndex:
+    """
+    Answers "can source reach all targets?" without a graph search.
+
+    The unblocked map is labelled once. A prohibited set is labelled from a
+    cached neighbour when possible:
+      - one extra hazard that is not a cut vertex leaves every other label as is
+      - removed hazards merge the components of their neighbours
+    and by a full O(nodes + edges) pass otherwise.
+    """
+
+    def __init__(self, cmap: CompiledMap):
+        self.cmap = cmap
+        self._indptr: List[int] = cmap.indptr.tolist()
+        self._indices: List[int] = cmap.indices.tolist()
+        self._cache: "OrderedDict[FrozenSet[int], Components]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._base = _components(self._indptr, self._indices, cmap.num_nodes, frozenset())
+
+    def components(self, blocked: FrozenSet[int] = frozenset()) -> Components:
+        if not blocked:
+            return self._base
+        with self._lock:
+            comps = self._cache.get(blocked)
+            if comps is not None:
+                CACHE_LOOKUPS.inc(cache="reachability", result="hit")
+                self._cache.move_to_end(blocked)
+                return comps
+            candidates = list(self._cache.items())
+
+        CACHE_LOOKUPS.inc(cache="reachability", result="miss")
+        comps = self._derive(blocked, candidates)
+        if comps is None:
+            comps = _components(self._indptr, self._indices, self.cmap.num_nodes, blocked)
+
+        with self._lock:
+            self._cache[blocked] = comps
+            while len(self._cache) > REACH_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return comps
+
+    def connected(self, source: int, targets: Iterable[int], blocked: FrozenSet[int] = frozenset()) -> bool:
+        return self.components(blocked).connected(source, targets)
+
+    def _derive(self, blocked: FrozenSet[int], candidates) -> Optional[Components]:
+        candidates.append((frozenset(), self._base))
+        for known, comps in candidates:
+            extra = blocked - known
+            if not extra and known:
+                return self._restore(comps, known - blocked, blocked)
+            if len(extra) == 1 and len(known) == len(blocked) - 1:
+                (h,) = extra
+                if comps.articulation is not None and h not in comps.articulation:
+                    labels = comps.labels.copy()
+                    labels[h] = BLOCKED
+                    return Components(labels, None)
+        return None
+
+    def _restore(self, comps: Components, restored: FrozenSet[int], blocked: FrozenSet[int]) -> Components:
+        """Labels after unblocking nodes: union the components around each restored node."""
+        labels = comps.labels.copy()
+        next_label = int(labels.max()) + 1
+        parent: Dict[int, int] = {}
+
+        def find(x: int) -> int:
+            root = x
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while parent.get(x, x) != root:
+                parent[x], x = root, parent[x]
+            return root
+
+        for r in restored:
+            labels[r] = next_label
+            next_label += 1
+        for r in restored:
+            for e in range(self._indptr[r], self._indptr[r + 1]):
+                v = self._indices[e]
+                if v in blocked or labels[v] == BLOCKED:
+                    continue
+                a, b = find(int(labels[r])), find(int(labels[v]))
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+
+        if parent:
+            mapping = np.arange(next_label, dtype=np.int32)
+            for x in parent:
+                mapping[x] = find(x)
+            mask = labels != BLOCKED
+            labels[mask] = mapping[labels[mask]]
+        return Components(labels, None)
+
+
+_INDEXES: Dict[str, ReachabilityIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_reachability(cmap: CompiledMap) -> ReachabilityIndex:
+    """Shared reachability index per compiled map."""
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(cmap.path)
+        if index is None or index.cmap is not cmap:
+            index = ReachabilityIndex(cmap)
+            _INDEXES[cmap.path] = index
+        return index
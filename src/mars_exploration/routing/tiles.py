@@ -0,0 +1,489 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from mars_exploration.commons import tracing
+from mars_exploration.routing.compiled_map import (
+    BASE_WEIGHT,
+    DEFAULT_TERRAIN,
+    CompiledMap,
+    read_arrays,
+    write_arrays,
+)
+from mars_exploration.routing.cost_models import COST_MODELS
+from mars_exploration.routing.engine import (
+    CACHE_LOOKUPS,
+    BaseRouteEngine,
+    NodeNotFoundError,
+    NoPathError,
+    dijkstra,
+    unwind,
+)
+
+
+# Layout of a tiled map directory:
+#   tiles.json          manifest (tile count, terrain vocabulary, precomputed cost models)
+#   directory.marsmap   sorted node ids -> (tile, local index)
+#   overlay.marsmap     boundary nodes, cut edges between tiles, in-tile boundary shortcuts
+#   tile_00000.marsmap  one compiled map per tile (tile-local CSR, global node ids)
+MANIFEST = "tiles.json"
+DEFAULT_TILE_SIZE = 2048
+DEFAULT_TILE_CACHE = int(os.getenv("MARS_TILE_CACHE", "16"))
+# Boundary shortcut lists kept per engine, in tiles (LRU)
+SHORTCUT_CACHE_ENV = "MARS_TILE_SHORTCUT_CACHE"
+
+
+# (tile, local index) identifies a node across the whole tiled map
+NodeKey = Tuple[int, int]
+
+
+def is_tiled_map(map_path: str) -> bool:
+    return os.path.isdir(map_path) and os.path.exists(os.path.join(map_path, MANIFEST))
+
+
+def _tile_file(k: int) -> str:
+    return f"tile_{k:05d}.marsmap"
+
+
+def _partition(graph, tile_size: int) -> List[List[str]]:
+    """Grow connected regions of at most tile_size nodes by BFS."""
+    assigned = set()
+    tiles: List[List[str]] = []
+    for seed in graph.nodes:
+        if seed in assigned:
+            continue
+        tile: List[str] = []
+        queue = deque([seed])
+        assigned.add(seed)
+        while queue:
+            node = queue.popleft()
+            tile.append(node)
+            for nbr in graph.neighbors(node):
+                if nbr not in assigned and len(tile) + len(queue) < tile_size:
+                    assigned.add(nbr)
+                    queue.append(nbr)
+        tiles.append(tile)
+    return tiles
+
+
+def _multiplier_key(multipliers: Optional[Mapping[str, float]]):
+    return tuple(sorted(multipliers.items())) if multipliers is not None else None
+
+
+def _shortcuts_for_tile(
+    tile: CompiledMap, boundary_local: List[int], multipliers: Optional[Mapping[str, float]]
+) -> List[Tuple[int, int, float]]:
+    """(src local, dst local, in-tile distance) for every reachable boundary pair."""
+    weights = tile.edge_weights(multipliers)
+    wanted = set(boundary_local)
+    out: List[Tuple[int, int, float]] = []
+    for b in boundary_local:
+        dist, _ = dijkstra(tile.indptr, tile.indices, weights, b)
+        for other in wanted:
+            if other != b and other in dist:
+                out.append((b, other, float(dist[other])))
+    return out
+
+
+def build_tiled_map(
+    graphml_path: str,
+    out_dir: str,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    cost_models: Optional[Mapping[str, Optional[Mapping[str, float]]]] = None,
+) -> str:
+    """
+    Partition a graphml map into tiles and precompute the boundary overlay.
+
+    Each tile is written as a compiled map holding only its internal edges.
+    Edges between tiles become overlay cut edges; for every cost model the
+    in-tile shortest distances between the tile's boundary nodes are stored
+    as overlay shortcuts (defaults to the rover, drone and hop cost models).
+    Returns out_dir.
+    """
+    import networkx as nx
+
+    cost_models = dict(COST_MODELS if cost_models is None else cost_models)
+    graph = nx.read_graphml(graphml_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Vehicle classes that share multipliers share one set of shortcuts
+    unique_models: Dict[str, Optional[Mapping[str, float]]] = {}
+    for name, multipliers in cost_models.items():
+        if all(_multiplier_key(m) != _multiplier_key(multipliers) for m in unique_models.values()):
+            unique_models[name] = multipliers
+    cost_models = unique_models
+
+    terrains: List[str] = []
+    for _, data in graph.nodes(data=True):
+        terrain = str(data.get("terrain", DEFAULT_TERRAIN)).strip().lower()
+        if terrain not in terrains:
+            terrains.append(terrain)
+
+    tiles = _partition(graph, tile_size)
+    location: Dict[str, NodeKey] = {}
+    for k, members in enumerate(tiles):
+        for local, node in enumerate(members):
+            location[node] = (k, local)
+
+    boundary: Dict[NodeKey, int] = {}
+    cut_edges: List[Tuple[int, int, float, float]] = []
+    for s, t, data in graph.edges(data=True):
+        ks, kt = location[s], location[t]
+        if ks[0] == kt[0]:
+            continue
+        for key in (ks, kt):
+            boundary.setdefault(key, len(boundary))
+        length, energy = float(data.get("length", 1.0)), float(data.get("energy", 0.0))
+        cut_edges.append((boundary[ks], boundary[kt], length, energy))
+        cut_edges.append((boundary[kt], boundary[ks], length, energy))
+
+    boundary_by_tile: Dict[int, List[int]] = {}
+    for (k, local) in boundary:
+        boundary_by_tile.setdefault(k, []).append(local)
+
+    sc_rows: List[Tuple[int, int, int]] = []
+    sc_weights: Dict[str, List[float]] = {name: [] for name in cost_models}
+    for k, members in enumerate(tiles):
+        adjacency: List[List[Tuple[int, float, float]]] = [[] for _ in members]
+        for local, node in enumerate(members):
+            for nbr, data in graph[node].items():
+                nk = location[nbr]
+                if nk[0] == k:
+                    adjacency[local].append((nk[1], float(data.get("length", 1.0)), float(data.get("energy", 0.0))))
+        indptr = np.zeros(len(members) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(a) for a in adjacency])
+        flat = [e for a in adjacency for e in a]
+        arrays = {
+            "node_ids": np.array(members, dtype=f"<U{max(len(n) for n in members)}"),
+            "terrain": np.array(
+                [terrains.index(str(graph.nodes[n].get("terrain", DEFAULT_TERRAIN)).strip().lower()) for n in members],
+                dtype=np.uint8,
+            ),
+            "indptr": indptr,
+            "indices": np.array([e[0] for e in flat], dtype=np.int32),
+            "length": np.array([e[1] for e in flat], dtype=np.float64),
+            "energy": np.array([e[2] for e in flat], dtype=np.float64),
+        }
+        tile_path = os.path.join(out_dir, _tile_file(k))
+        write_arrays(tile_path, arrays, {"terrains": terrains, "tile": k})
+
+        locals_ = sorted(boundary_by_tile.get(k, []))
+        if len(locals_) < 2:
+            continue
+        tile = CompiledMap(tile_path)
+        per_model = {name: {(s, t): w for s, t, w in _shortcuts_for_tile(tile, locals_, m)} for name, m in cost_models.items()}
+        pairs = sorted(set().union(*(p.keys() for p in per_model.values())))
+        for s, t in pairs:
+            sc_rows.append((k, boundary[(k, s)], boundary[(k, t)]))
+            for name in cost_models:
+                sc_weights[name].append(per_model[name].get((s, t), float("inf")))
+
+    order = sorted(boundary, key=boundary.get)
+    overlay = {
+        "bnd_tile": np.array([key[0] for key in order], dtype=np.int32),
+        "bnd_local": np.array([key[1] for key in order], dtype=np.int32),
+        "bnd_terrain": np.array(
+            [terrains.index(str(graph.nodes[tiles[k][l]].get("terrain", DEFAULT_TERRAIN)).strip().lower()) for k, l in order],
+            dtype=np.uint8,
+        ),
+        "cut_src": np.array([e[0] for e in cut_edges], dtype=np.int32),
+        "cut_dst": np.array([e[1] for e in cut_edges], dtype=np.int32),
+        "cut_length": np.array([e[2] for e in cut_edges], dtype=np.float64),
+        "cut_energy": np.array([e[3] for e in cut_edges], dtype=np.float64),
+        "sc_tile": np.array([r[0] for r in sc_rows], dtype=np.int32),
+        "sc_src": np.array([r[1] for r in sc_rows], dtype=np.int32),
+        "sc_dst": np.array([r[2] for r in sc_rows], dtype=np.int32),
+    }
+    for i, name in enumerate(cost_models):
+        overlay[f"sc_w{i}"] = np.array(sc_weights[name], dtype=np.float64)
+    write_arrays(os.path.join(out_dir, "overlay.marsmap"), overlay, {"terrains": terrains})
+
+    ids = sorted(location)
+    directory = {
+        "ids": np.array(ids, dtype=f"<U{max(len(n) for n in ids)}"),
+        "tile": np.array([location[n][0] for n in ids], dtype=np.int32),
+        "local": np.array([location[n][1] for n in ids], dtype=np.int32),
+    }
+    write_arrays(os.path.join(out_dir, "directory.marsmap"), directory, {})
+
+    manifest = {
+        "version": 1,
+        "source": os.path.basename(graphml_path),
+        "tiles": len(tiles),
+        "tile_size": tile_size,
+        "terrains": terrains,
+        "cost_models": [{"name": name, "multipliers": m} for name, m in cost_models.items()],
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return out_dir
+
+
+class TiledMap:
+    """
+    Lazily loaded tiled map.
+
+    Only the manifest, node directory and overlay are opened up front (all as
+    memmaps); tiles are opened on demand and kept in a bounded LRU cache.
+    """
+
+    def __init__(self, root: str, cache_size: int = DEFAULT_TILE_CACHE):
+        self.root = os.path.abspath(root)
+        with open(os.path.join(self.root, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.terrains: Tuple[str, ...] = tuple(self.manifest["terrains"])
+        self.cache_size = max(1, cache_size)
+
+        _, self.directory = read_arrays(os.path.join(self.root, "directory.marsmap"))
+        _, self.overlay = read_arrays(os.path.join(self.root, "overlay.marsmap"))
+
+        self.bnd_tile = self.overlay["bnd_tile"]
+        self.bnd_local = self.overlay["bnd_local"]
+        self._boundary: Dict[NodeKey, int] = {
+            (k, l): i for i, (k, l) in enumerate(zip(self.bnd_tile.tolist(), self.bnd_local.tolist()))
+        }
+
+        self._cut_adj: Dict[int, List[Tuple[int, float, float]]] = {}
+        for s, t, length, energy in zip(
+            self.overlay["cut_src"].tolist(),
+            self.overlay["cut_dst"].tolist(),
+            self.overlay["cut_length"].tolist(),
+            self.overlay["cut_energy"].tolist(),
+        ):
+            self._cut_adj.setdefault(s, []).append((t, length, energy))
+
+        self._tiles: "OrderedDict[int, CompiledMap]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def num_tiles(self) -> int:
+        return int(self.manifest["tiles"])
+
+    def locate(self, node_id: str) -> Optional[NodeKey]:
+        """(tile, local index) of a node via binary search over the directory."""
+        ids = self.directory["ids"]
+        i = int(np.searchsorted(ids, node_id))
+        if i < ids.shape[0] and str(ids[i]) == node_id:
+            return int(self.directory["tile"][i]), int(self.directory["local"][i])
+        return None
+
+    def tile(self, k: int) -> CompiledMap:
+        with self._lock:
+            cmap = self._tiles.get(k)
+            if cmap is not None:
+                CACHE_LOOKUPS.inc(cache="tile", result="hit")
+                self._tiles.move_to_end(k)
+                return cmap
+            CACHE_LOOKUPS.inc(cache="tile", result="miss")
+            cmap = CompiledMap(os.path.join(self.root, _tile_file(k)))
+            self._tiles[k] = cmap
+            while len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+            return cmap
+
+    def boundary_index(self, key: NodeKey) -> Optional[int]:
+        return self._boundary.get(key)
+
+    def boundary_key(self, b: int) -> NodeKey:
+        return int(self.bnd_tile[b]), int(self.bnd_local[b])
+
+    def boundary_locals(self, k: int) -> List[int]:
+        return sorted(l for (tk, l) in self._boundary if tk == k)
+
+    def cut_edges(self, b: int) -> List[Tuple[int, float, float]]:
+        return self._cut_adj.get(b, [])
+
+    def precomputed_model(self, multipliers: Optional[Mapping[str, float]]) -> Optional[int]:
+        key = _multiplier_key(multipliers)
+        for i, model in enumerate(self.manifest.get("cost_models", [])):
+            if _multiplier_key(model["multipliers"]) == key:
+                return i
+        return None
+
+
+class TiledRouteEngine(BaseRouteEngine):
+    """
+    Multi-level Dijkstra over a tiled map.
+
+    The tiles of the route endpoints (and any tile holding a prohibited node)
+    are searched at full resolution; every other tile is crossed through its
+    precomputed boundary shortcuts. Shortcuts on the final route are unpacked
+    by a local search inside that tile only.
+    """
+
+    def __init__(self, tmap: TiledMap, multipliers: Optional[Mapping[str, float]] = None):
+        self.tmap = tmap
+        self.multipliers = dict(multipliers) if multipliers is not None else None
+        self._model = tmap.precomputed_model(self.multipliers)
+        self._shortcuts: "OrderedDict[int, Dict[int, List[Tuple[int, float]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        per_terrain = np.array(
+            [float(self.multipliers.get(t, 1.0)) if self.multipliers is not None else 1.0 for t in tmap.terrains] or [1.0]
+        )
+        self._terrain_mult = per_terrain
+
+    def _cut_weight(self, a: int, b: int) -> float:
+        if self.multipliers is None:
+            return 1.0
+        codes = self.tmap.overlay["bnd_terrain"]
+        return BASE_WEIGHT * (self._terrain_mult[codes[a]] + self._terrain_mult[codes[b]]) / 2.0
+
+    def _tile_shortcuts(self, k: int) -> Dict[int, List[Tuple[int, float]]]:
+        """Boundary shortcuts of tile k: boundary index -> [(boundary index, distance)]."""
+        with self._lock:
+            cached = self._shortcuts.get(k)
+            if cached is not None:
+                CACHE_LOOKUPS.inc(cache="tile_shortcuts", result="hit")
+                self._shortcuts.move_to_end(k)
+                return cached
+            CACHE_LOOKUPS.inc(cache="tile_shortcuts", result="miss")
+
+            adj: Dict[int, List[Tuple[int, float]]] = {}
+            if self._model is not None:
+                overlay = self.tmap.overlay
+                sc_tile = overlay["sc_tile"]
+                lo, hi = int(np.searchsorted(sc_tile, k, "left")), int(np.searchsorted(sc_tile, k, "right"))
+                for s, t, w in zip(
+                    overlay["sc_src"][lo:hi].tolist(),
+                    overlay["sc_dst"][lo:hi].tolist(),
+                    overlay[f"sc_w{self._model}"][lo:hi].tolist(),
+                ):
+                    if w != float("inf"):
+                        adj.setdefault(s, []).append((t, w))
+            else:
+                # Cost model not precomputed: derive this tile's shortcuts once
+                locals_ = self.tmap.boundary_locals(k)
+                tile = self.tmap.tile(k)
+                for s, t, w in _shortcuts_for_tile(tile, locals_, self.multipliers):
+                    adj.setdefault(self.tmap.boundary_index((k, s)), []).append((self.tmap.boundary_index((k, t)), w))
+
+            self._shortcuts[k] = adj
+            limit = max(1, int(os.getenv(SHORTCUT_CACHE_ENV, "256")))
+            while len(self._shortcuts) > limit:
+                self._shortcuts.popitem(last=False)
+            return adj
+
+    def blocked_indices(self, prohibited: Iterable[str]) -> FrozenSet[NodeKey]:
+        blocked = set()
+        for node in prohibited:
+            key = self.tmap.locate(node)
+            if key is not None:
+                blocked.add(key)
+        return frozenset(blocked)
+
+    def leg(self, source: str, target: str, blocked: FrozenSet[NodeKey] = frozenset()) -> Tuple[float, List[str]]:
+        s = self.tmap.locate(source)
+        if s is None or s in blocked:
+            raise NodeNotFoundError(f"Node {source} not found in graph")
+        t = self.tmap.locate(target)
+        if t is None or t in blocked:
+            raise NoPathError(f"No path to {target}.")
+        if s == t:
+            return 0.0, [source]
+
+        expanded = {s[0], t[0]} | {k for k, _ in blocked}
+        weights: Dict[int, np.ndarray] = {}
+
+        def tile_weights(k: int) -> np.ndarray:
+            if k not in weights:
+                weights[k] = self.tmap.tile(k).edge_weights(self.multipliers)
+            return weights[k]
+
+        # pred[v] = (u, via_shortcut)
+        dist: Dict[NodeKey, float] = {s: 0.0}
+        pred: Dict[NodeKey, Tuple[Optional[NodeKey], bool]] = {s: (None, False)}
+        done = set()
+        heap = [(0.0, s)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            if u == t:
+                break
+
+            k, local = u
+            steps: List[Tuple[NodeKey, float, bool]] = []
+            if k in expanded:
+                tile = self.tmap.tile(k)
+                lo, hi = int(tile.indptr[local]), int(tile.indptr[local + 1])
+                w = tile_weights(k)
+                steps.extend(((k, v), cost, False) for v, cost in zip(tile.indices[lo:hi].tolist(), w[lo:hi].tolist()))
+
+            b = self.tmap.boundary_index(u)
+            if b is not None:
+                if k not in expanded:
+                    for other, cost in self._tile_shortcuts(k).get(b, []):
+                        steps.append((self.tmap.boundary_key(other), cost, True))
+                for other, _, _ in self.tmap.cut_edges(b):
+                    steps.append((self.tmap.boundary_key(other), self._cut_weight(b, other), False))
+
+            for v, cost, via_shortcut in steps:
+                if v in blocked:
+                    continue
+                nd = d + cost
+                if nd < dist.get(v, float("inf")):
+                    dist[v] = nd
+                    pred[v] = (u, via_shortcut)
+                    heapq.heappush(heap, (nd, v))
+        else:
+            raise NoPathError(f"No path to {target}.")
+
+        if t not in done:
+            raise NoPathError(f"No path to {target}.")
+
+        # Unwind, expanding shortcuts inside their tile
+        keys: List[NodeKey] = [t]
+        node = t
+        while pred[node][0] is not None:
+            prev, via_shortcut = pred[node]
+            if via_shortcut:
+                tile = self.tmap.tile(prev[0])
+                _, local_pred = dijkstra(tile.indptr, tile.indices, tile_weights(prev[0]), prev[1], node[1])
+                inner = unwind(local_pred, node[1])
+                keys.extend((prev[0], l) for l in reversed(inner[1:-1]))
+            keys.append(prev)
+            node = prev
+        keys.reverse()
+
+        return float(dist[t]), [self.tmap.tile(k).node_id(l) for k, l in keys]
+
+
+_TILED_CACHE: Dict[str, TiledMap] = {}
+_TILED_LOCK = threading.Lock()
+
+
+def load_tiled_map(root: str) -> TiledMap:
+    """Open (and cache per process) a tiled map directory."""
+    root = os.path.abspath(root)
+    with _TILED_LOCK:
+        tmap = _TILED_CACHE.get(root)
+        if tmap is None:
+            with tracing.span("map.load_tiled", "graph", path=root):
+                tmap = TiledMap(root)
+            _TILED_CACHE[root] = tmap
+        return tmap
+
+
+def source_map_path(map_path: str) -> str:
+    """
+    The single-file map behind map_path: the graphml a tiled map was built from (next to its directory).
+
+    Recharge routing, rover scheduling and replanning have no tiled engine:
+    they run on this map, which is loaded whole.
+    """
+    if not is_tiled_map(map_path):
+        return map_path
+    tmap = load_tiled_map(map_path)
+    source = os.path.join(os.path.dirname(tmap.root), tmap.manifest["source"])
+    if not os.path.exists(source):
+        raise ValueError(f"{tmap.root} was built from {source}, which is not found")
+    return source
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from mars_exploration.commons import metrics
+
+
+# Long-running planning service.
+#
+#   POST /missions   {"mission_report": "...", "rovers": [...], "drones": [...],
+#                     "fleet_overrides": {"rovers": {"<id>": {...}}, "drones": {...}},
+#                     "map": "<path>"}                 (everything but the report is optional)
+#                    -> application/x-ndjson stream of events:
+#                       {"event": "accepted", "mission_id": ...}
+#                       {"event": "step", "step": "process_mission", "elapsed": 12.3}   (one per flow step)
+#                       {"event": "result", ...} or {"event": "error", "message": ...}
+#   GET  /health     service status
+#   GET  /metrics    Prometheus text (when metrics are enabled)
+#
+# Maps, route engines, reachability labels, fleets and the LLM client are
+# loaded once at startup and shared by every mission; each mission runs its
+# own MarsMissionFlow in the request thread, with at most `workers` at a time.
+DEFAULT_PORT = 8765
+DEFAULT_WORK_DIR = "src/mars_exploration/data/service"
+
+MISSIONS = metrics.counter("mars_service_missions_total", "Missions handled by the planning service.", ("result",))
+MISSION_SECONDS = metrics.histogram("mars_service_mission_seconds", "End-to-end mission latency in the service.")
+IN_FLIGHT = metrics.gauge("mars_service_missions_in_flight", "Missions currently running.")
+QUEUED = metrics.gauge("mars_service_missions_queued", "Missions waiting for a worker slot.")
+
+
+def _apply_overrides(fleet: List[Dict[str, Any]], overrides: Optional[Dict[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Copy of fleet with per-vehicle field patches applied (by vehicle id)."""
+    if not overrides:
+        return fleet
+    unknown = set(overrides) - {str(v.get("id", "")) for v in fleet}
+    if unknown:
+        raise ValueError(f"fleet_overrides for unknown vehicles: {sorted(unknown)}")
+    return [{**v, **overrides.get(str(v.get("id", "")), {})} for v in fleet]
+
+
+class PlanningService:
+    """Warm state shared by all missions plus the per-mission flow runner."""
+
+    def __init__(self, work_dir: str = DEFAULT_WORK_DIR, map_path: Optional[str] = None, workers: int = 4):
+        from mars_exploration import main
+
+        self._main = main
+        self.work_dir = work_dir
+        self.map_path = map_path or main.default_map_path()
+        self.rovers = json.loads(Path(main.ROVERS_FILE).read_text(encoding="utf-8"))
+        self.drones = json.loads(Path(main.DRONES_FILE).read_text(encoding="utf-8"))
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers)
+        self._subscribers: Dict[int, Callable[[Dict[str, Any]], None]] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.completed = 0
+        self.failed = 0
+
+        self.warm(self.map_path)
+        self._subscribe_flow_events()
+
+    def warm(self, map_path: str) -> None:
+        """Load the map, build the shared route engines and the LLM clients; with MARS_LLM_WARMUP=1, start loading the models."""
+        from mars_exploration.commons.llm import warm_up_in_background
+        from mars_exploration.routing.cost_models import DRONE_TERRAIN_MULTIPLIERS, ROVER_TERRAIN_MULTIPLIERS
+        from mars_exploration.routing.engine import RouteEngine, get_route_engine
+        from mars_exploration.routing.reachability import get_reachability
+
+        for multipliers in (ROVER_TERRAIN_MULTIPLIERS, DRONE_TERRAIN_MULTIPLIERS, None):
+            engine = get_route_engine(map_path, multipliers)
+        if isinstance(engine, RouteEngine):
+            get_reachability(engine.cmap)
+        warm_up_in_background()
+
+    def _subscribe_flow_events(self) -> None:
+        from crewai.utilities.events import crewai_event_bus
+        from crewai.utilities.events.flow_events import MethodExecutionFinishedEvent
+
+        @crewai_event_bus.on(MethodExecutionFinishedEvent)
+        def on_step_finished(source, event):
+            with self._lock:
+                emit = self._subscribers.get(id(source))
+            if emit is not None:
+                emit({"event": "step", "step": event.method_name})
+
+    # ------------------------------------------------------------------
+    def mission_inputs(self, request: Dict[str, Any], mission_dir: str) -> Dict[str, Any]:
+        report = request.get("mission_report")
+        if not isinstance(report, str) or not report.strip():
+            raise ValueError("mission_report (non-empty string) is required")
+        overrides = request.get("fleet_overrides") or {}
+        rovers = request.get("rovers") or self.rovers
+        drones = request.get("drones") or self.drones
+        return {
+            "input_report": report,
+            "mars_map_path": request.get("map") or self.map_path,
+            "rovers": _apply_overrides(copy.deepcopy(rovers), overrides.get("rovers")),
+            "drones": _apply_overrides(copy.deepcopy(drones), overrides.get("drones")),
+            "intermediate_dir": os.path.join(mission_dir, "intermediate"),
+            "output_dir": os.path.join(mission_dir, "output"),
+        }
+
+    def run_mission(self, request: Dict[str, Any], emit: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """Run one mission, emitting progress events; returns the result event."""
+        mission_id = uuid.uuid4().hex[:12]
+        mission_dir = os.path.join(self.work_dir, mission_id)
+        inputs = self.mission_inputs(request, mission_dir)
+        if inputs["mars_map_path"] != self.map_path:
+            self.warm(inputs["mars_map_path"])
+
+        start = time.perf_counter()
+        emit({"event": "accepted", "mission_id": mission_id})
+
+        def emit_step(event: Dict[str, Any]) -> None:
+            emit({**event, "mission_id": mission_id, "elapsed": round(time.perf_counter() - start, 3)})
+
+        QUEUED.inc()
+        self._slots.acquire()
+        QUEUED.dec()
+        IN_FLIGHT.inc()
+        flow = self._main.MarsMissionFlow()
+        with self._lock:
+            self._subscribers[id(flow)] = emit_step
+        try:
+            flow.kickoff(inputs=inputs)
+        except Exception:
+            MISSIONS.inc(result="error")
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._subscribers.pop(id(flow), None)
+            IN_FLIGHT.dec()
+            self._slots.release()
+
+        seconds = time.perf_counter() - start
+        MISSIONS.inc(result="ok")
+        MISSION_SECONDS.observe(seconds)
+        with self._lock:
+            self.completed += 1
+        state = flow.state
+        return {
+            "event": "result",
+            "mission_id": mission_id,
+            "seconds": round(seconds, 3),
+            "mission_summary": state.mission_summary.model_dump(mode="json") if state.mission_summary else None,
+            "rover_plan": state.rover_plan.model_dump(mode="json") if state.rover_plan else None,
+            "rover_schedule": state.rover_schedule.model_dump(mode="json") if state.rover_schedule else None,
+            "drone_plan": state.drone_plan.model_dump(mode="json") if state.drone_plan else None,
+            "final_plan": state.final_plan,
+            "degraded_stages": state.degraded_stages,
+            "output_dir": state.output_dir,
+        }
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            active = len(self._subscribers)
+        return {
+            "status": "ok",
+            "uptime": round(time.time() - self.started, 1),
+            "map": self.map_path,
+            "workers": self.workers,
+            "active": active,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: PlanningService
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send_json(200, self.service.health())
+        elif path == "/metrics" and metrics.enabled():
+            data = metrics.REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", metrics.CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": f"unknown path {path}"})
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/missions":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("request body must be a JSON object")
+            self.service.mission_inputs(request, "")
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        # Stream events as NDJSON; the response ends when the mission does.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        write_lock = threading.Lock()
+
+        def emit(event: Dict[str, Any]) -> None:
+            line = (json.dumps(event) + "\n").encode("utf-8")
+            with write_lock:
+                try:
+                    self.wfile.write(line)
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        try:
+            emit(self.service.run_mission(request, emit))
+        except Exception as e:
+            emit({"event": "error", "message": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(service: PlanningService, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    handler = type("PlanningHandler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    """Run the planning service: warm maps, fleets and LLM client, then accept missions over HTTP."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="plan_server", description=main.__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=4, help="missions running at the same time")
+    parser.add_argument("--map", default=None, help="map served by default (default: tiled map if built, else graphml)")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="per-mission artifact directory")
+    args = parser.parse_args()
+
+    metrics.start_exporters()
+    started = time.perf_counter()
+    service = PlanningService(args.work_dir, args.map, args.workers)
+    server = serve(service, args.host, args.port)
+    print(f"Planning service ready in {time.perf_counter() - started:.1f}s on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        metrics.stop_exporters()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from mars_exploration.service.daemon import DEFAULT_PORT
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return round(ordered[k], 3)
+
+
+def submit(url: str, request: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """
+    POST one mission and read its event stream to the end.
+
+    Returns latency (s), time to the first step event (s), the number of step
+    events and the final event.
+    """
+    parsed = urlparse(url)
+    conn = HTTPConnection(parsed.hostname, parsed.port or DEFAULT_PORT, timeout=timeout)
+    body = json.dumps(request).encode("utf-8")
+    start = time.perf_counter()
+    first_step = None
+    steps = 0
+    last: Dict[str, Any] = {}
+    try:
+        conn.request("POST", "/missions", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        if response.status != 200:
+            return {"ok": False, "latency": time.perf_counter() - start, "error": response.read().decode()}
+        for raw in response:
+            line = raw.strip()
+            if not line:
+                continue
+            last = json.loads(line)
+            if last.get("event") == "step":
+                steps += 1
+                if first_step is None:
+                    first_step = time.perf_counter() - start
+    except OSError as e:
+        return {"ok": False, "latency": time.perf_counter() - start, "error": str(e)}
+    finally:
+        conn.close()
+    return {
+        "ok": last.get("event") == "result",
+        "latency": time.perf_counter() - start,
+        "first_step": first_step,
+        "steps": steps,
+        "error": last.get("message"),
+    }
+
+
+def run_load(url: str, request: Dict[str, Any], missions: int, concurrency: int, timeout: float) -> Dict[str, Any]:
+    """Send `missions` requests with `concurrency` in flight and summarize throughput and latency."""
+    lock = threading.Lock()
+    done: List[Dict[str, Any]] = []
+
+    def one(_):
+        result = submit(url, request, timeout)
+        with lock:
+            done.append(result)
+            print(
+                f"[{len(done)}/{missions}] {'ok' if result['ok'] else 'FAILED'} {result['latency']:.1f}s"
+                + (f" ({result['error']})" if result.get("error") else ""),
+                flush=True,
+            )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(missions)))
+    wall = time.perf_counter() - started
+
+    ok = [r for r in done if r["ok"]]
+    latencies = [r["latency"] for r in ok]
+    first_steps = [r["first_step"] for r in ok if r["first_step"] is not None]
+    return {
+        "missions": missions,
+        "concurrency": concurrency,
+        "completed": len(ok),
+        "failed": len(done) - len(ok),
+        "wall_seconds": round(wall, 3),
+        "missions_per_minute": round(60.0 * len(ok) / wall, 2) if wall > 0 else None,
+        "latency_p50": _percentile(latencies, 0.5),
+        "latency_p95": _percentile(latencies, 0.95),
+        "latency_max": _percentile(latencies, 1.0),
+        "first_step_p50": _percentile(first_steps, 0.5),
+    }
+
+
+def main():
+    """Load-test the planning service: sustained missions/minute and latency percentiles."""
+    import argparse
+
+    from mars_exploration.paths import INPUT_REPORT
+
+    parser = argparse.ArgumentParser(prog="plan_loadtest", description=main.__doc__)
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    parser.add_argument("--report", default=INPUT_REPORT, help="mission report sent with every request")
+    parser.add_argument("--missions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=1800.0, help="per-mission socket timeout (s)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON only")
+    args = parser.parse_args()
+
+    request = {"mission_report": Path(args.report).read_text(encoding="utf-8")}
+    summary = run_load(args.url, request, args.missions, args.concurrency, args.timeout)
+    if args.json:
+        print(json.dumps(summary))
+        return
+    for key, value in summary.items():
+        print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 from typing import Any, Dict
 from crewai.tools import BaseTool
 
+from mars_exploration.commons import metrics, profiling
+
+TOOL_SECONDS = metrics.histogram("mars_tool_seconds", "Tool _run latency.", ("tool",))
+SPLIT_GOALS = metrics.counter("mars_split_goals_total", "Goals classified by split_goals_tool.", ("outcome",))
+
 class SplitGoalsTool(BaseTool):
     """
     Decide which goals must be assignments vs failures, purely by checking
@@ -15,6 +20,8 @@ class SplitGoalsTool(BaseTool):
         "No other logic."
     )
 
+    @metrics.timed(TOOL_SECONDS, tool="split_goals_tool")
+    @profiling.profiled("tool.split_goals_tool")
     def _run(self, possible_assignments: list) -> Dict[str, Any]:
         assignments = []
         failures = []
@@ -39,4 +46,6 @@ class SplitGoalsTool(BaseTool):
             else:
                 failures.append(goal_id)
 
+        SPLIT_GOALS.inc(len(assignments), outcome="assignment")
+        SPLIT_GOALS.inc(len(failures), outcome="failure")
         return {"assignments": assignments, "failures": failures}
\ No newline at end of file
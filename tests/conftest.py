@@ -0,0 +1,93 @@
+"""
+Shared fixtures for the routing and planning checks.
+
+Every check runs on a copy of the sample map in a temporary directory, so the
+compiled map and the indexes built from it never land in the source tree.
+Run from the repository root:
+
+    python -m pytest -q tests
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import networkx as nx
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from mars_exploration.paths import MARS_MAP_PATH  # noqa: E402
+from mars_exploration.routing.compiled_map import BASE_WEIGHT  # noqa: E402
+from mars_exploration.routing.engine import NoPathError  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def map_path(tmp_path_factory) -> str:
+    """Copy of the sample graphml map in a session temporary directory."""
+    path = tmp_path_factory.mktemp("map") / os.path.basename(MARS_MAP_PATH)
+    shutil.copy(os.path.join(ROOT, MARS_MAP_PATH), path)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def reference_graph(map_path):
+    """
+    networkx view of the sample map weighted like the route engines: BASE_WEIGHT
+    times the mean endpoint multiplier, or hop count without multipliers.
+    Returns a function of the multipliers.
+    """
+    source = nx.read_graphml(map_path)
+    graphs: Dict[Optional[Tuple], nx.Graph] = {}
+
+    def build(multipliers: Optional[Mapping[str, float]]) -> nx.Graph:
+        key = tuple(sorted(multipliers.items())) if multipliers is not None else None
+        if key not in graphs:
+            terrain = {n: str(d.get("terrain", "plain")).strip().lower() for n, d in source.nodes(data=True)}
+            graph = nx.Graph()
+            graph.add_nodes_from(source.nodes)
+            for s, t in source.edges():
+                if multipliers is None:
+                    weight = 1.0
+                else:
+                    weight = BASE_WEIGHT * (multipliers.get(terrain[s], 1.0) + multipliers.get(terrain[t], 1.0)) / 2.0
+                graph.add_edge(s, t, weight=weight)
+            graphs[key] = graph
+        return graphs[key]
+
+    return build
+
+
+@pytest.fixture(scope="session")
+def assert_leg():
+    """
+    Check one leg answer against networkx on graph minus the prohibited nodes:
+    same distance (or NoPathError when there is no path) and a path of that cost.
+    """
+
+    def check(
+        leg: Callable[[str, str], Tuple[float, List[str]]],
+        graph: nx.Graph,
+        source: str,
+        target: str,
+        prohibited: Iterable[str] = (),
+    ) -> None:
+        prohibited = set(prohibited)
+        open_graph = graph.subgraph(n for n in graph if n not in prohibited)
+        try:
+            expected = nx.shortest_path_length(open_graph, source, target, weight="weight")
+        except nx.NetworkXNoPath:
+            with pytest.raises(NoPathError):
+                leg(source, target)
+            return
+        distance, path = leg(source, target)
+        assert distance == pytest.approx(expected), (source, target)
+        assert path[0] == source and path[-1] == target
+        assert nx.path_weight(open_graph, path, "weight") == pytest.approx(distance)
+
+    return check
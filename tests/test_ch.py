@@ -0,0 +1,50 @@
+"""Contraction hierarchy engine (routing/ch.py) against networkx on the sample map."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from mars_exploration.routing.ch import CHRouteEngine, build_ch_index, load_ch_index
+from mars_exploration.routing.compiled_map import load_map
+from mars_exploration.routing.cost_models import COST_MODELS, ROVER_TERRAIN_MULTIPLIERS
+from mars_exploration.routing.engine import get_route_engine
+
+
+@pytest.fixture(scope="module")
+def ch_map(map_path):
+    build_ch_index(map_path)
+    return load_map(map_path)
+
+
+def _engine(cmap, multipliers) -> CHRouteEngine:
+    index = load_ch_index(cmap)
+    return CHRouteEngine(cmap, index, index.model_for(multipliers), multipliers)
+
+
+@pytest.mark.parametrize("multipliers", list(COST_MODELS.values()), ids=list(COST_MODELS))
+def test_legs_match_networkx(ch_map, reference_graph, assert_leg, multipliers):
+    engine = _engine(ch_map, multipliers)
+    graph = reference_graph(multipliers)
+    nodes = sorted(graph)
+    for source in nodes[::10]:
+        for target in nodes:
+            assert_leg(engine.leg, graph, source, target)
+
+
+def test_legs_with_prohibited_nodes(ch_map, reference_graph, assert_leg):
+    engine = _engine(ch_map, ROVER_TERRAIN_MULTIPLIERS)
+    graph = reference_graph(ROVER_TERRAIN_MULTIPLIERS)
+    rng = random.Random(5)
+    nodes = sorted(graph)
+    for _ in range(40):
+        prohibited = rng.sample(nodes, rng.randint(1, 25))
+        blocked = engine.blocked_indices(prohibited)
+        open_nodes = [n for n in nodes if n not in prohibited]
+        for _ in range(5):
+            source, target = rng.sample(open_nodes, 2)
+            assert_leg(lambda s, t: engine.leg(s, t, blocked), graph, source, target, prohibited)
+
+
+def test_shared_engine_uses_the_index(ch_map):
+    assert isinstance(get_route_engine(ch_map.path, ROVER_TERRAIN_MULTIPLIERS), CHRouteEngine)
@@ -0,0 +1,68 @@
+"""Incremental route repair (routing/dynamic.py) against networkx as hazards and terrain change."""
+from __future__ import annotations
+
+import random
+
+import networkx as nx
+import pytest
+
+from mars_exploration.routing.compiled_map import BASE_WEIGHT, load_map
+from mars_exploration.routing.cost_models import ROVER_TERRAIN_MULTIPLIERS
+from mars_exploration.routing.dynamic import DynamicRouter
+from mars_exploration.routing.engine import NoPathError
+
+ROOTS = ("N0", "N17", "N43", "N68", "N99")
+
+
+def _assert_trees(router, graph, prohibited):
+    """Every leg from the cached tree roots matches one networkx search per root."""
+    open_graph = graph.subgraph(n for n in graph if n not in prohibited)
+    for source in ROOTS:
+        if source in prohibited:
+            continue
+        expected = nx.single_source_dijkstra_path_length(open_graph, source, weight="weight")
+        for target in open_graph:
+            if target not in expected:
+                with pytest.raises(NoPathError):
+                    router.leg(source, target)
+                continue
+            distance, path = router.leg(source, target)
+            assert distance == pytest.approx(expected[target]), (source, target)
+            assert path[0] == source and path[-1] == target
+            assert nx.path_weight(open_graph, path, "weight") == pytest.approx(distance)
+
+
+def test_hazards_added_and_removed_one_at_a_time(map_path, reference_graph):
+    router = DynamicRouter(load_map(map_path), ROVER_TERRAIN_MULTIPLIERS)
+    graph = reference_graph(ROVER_TERRAIN_MULTIPLIERS)
+    rng = random.Random(13)
+    nodes = sorted(graph)
+    prohibited = set()
+    _assert_trees(router, graph, prohibited)
+    for _ in range(60):
+        if prohibited and rng.random() < 0.4:
+            node = rng.choice(sorted(prohibited))
+            router.apply(remove=[node])
+            prohibited.discard(node)
+        else:
+            node = rng.choice(nodes)
+            router.apply(add=[node])
+            prohibited.add(node)
+        _assert_trees(router, graph, prohibited)
+
+
+def test_terrain_changes(map_path, reference_graph):
+    router = DynamicRouter(load_map(map_path), ROVER_TERRAIN_MULTIPLIERS)
+    graph = reference_graph(ROVER_TERRAIN_MULTIPLIERS).copy()
+    terrain = {n: str(d.get("terrain", "plain")) for n, d in nx.read_graphml(map_path).nodes(data=True)}
+    rng = random.Random(17)
+    nodes = sorted(graph)
+    _assert_trees(router, graph, ())
+    for _ in range(30):
+        node = rng.choice(nodes)
+        terrain[node] = rng.choice(sorted(ROVER_TERRAIN_MULTIPLIERS))
+        router.apply(terrain={node: terrain[node]})
+        for other in graph[node]:
+            mean = (ROVER_TERRAIN_MULTIPLIERS[terrain[node]] + ROVER_TERRAIN_MULTIPLIERS[terrain[other]]) / 2.0
+            graph[node][other]["weight"] = BASE_WEIGHT * mean
+        _assert_trees(router, graph, ())
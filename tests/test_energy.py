@@ -0,0 +1,140 @@
+"""Recharge routes (routing/energy.py) keep the battery at or above the threshold."""
+from __future__ import annotations
+
+import json
+import os
+import random
+from typing import Sequence
+
+import networkx as nx
+import pytest
+
+from mars_exploration.paths import ROVERS_FILE
+from mars_exploration.planning import evaluate
+from mars_exploration.planning.fleet import FleetTable
+from mars_exploration.routing.compiled_map import load_map
+from mars_exploration.routing.cost_models import ROVER_TERRAIN_MULTIPLIERS
+from mars_exploration.routing.energy import FULL_BATTERY, RECHARGE_CACHE_ENV, EnergyRouter
+from mars_exploration.routing.engine import NoPathError
+
+STATIONS = ["N3", "N10", "N22", "N50", "N70", "N81"]
+ENERGY_COST = 0.6
+THRESHOLD = 5.0
+
+
+def _assert_battery(graph: nx.Graph, path: Sequence[str], stops: Sequence[str], chargers, cost: float, threshold: float):
+    """
+    Some placement of the refills at the listed stops, in order, keeps the
+    battery at or above threshold along path. best[k] is the highest battery
+    level after k refills.
+    """
+    assert set(stops) <= set(chargers)
+    best = {0: FULL_BATTERY}
+    for i, node in enumerate(path):
+        for k in sorted(best, reverse=True):
+            if k < len(stops) and node == stops[k]:
+                best[k + 1] = FULL_BATTERY
+        if i + 1 < len(path):
+            drain = graph[node][path[i + 1]]["weight"] * cost
+            best = {k: e - drain for k, e in best.items() if e - drain >= threshold - 1e-9}
+            assert best, f"battery below {threshold} before {path[i + 1]}"
+    assert len(stops) in best
+
+
+def _visits_in_order(path: Sequence[str], targets: Sequence[str]) -> bool:
+    it = iter(path)
+    return all(t in it for t in targets)
+
+
+@pytest.mark.parametrize("bucket", [0.5, 1.0, 5.0])
+def test_routes_stay_above_threshold(map_path, reference_graph, monkeypatch, bucket):
+    # A one-entry cache evicts labels and routes between every search
+    monkeypatch.setenv(RECHARGE_CACHE_ENV, "1")
+    cmap = load_map(map_path)
+    router = EnergyRouter(cmap, ROVER_TERRAIN_MULTIPLIERS)
+    graph = reference_graph(ROVER_TERRAIN_MULTIPLIERS)
+    stations = router.stations(STATIONS)
+    rng = random.Random(19)
+    nodes = sorted(graph)
+    routed = recharged = 0
+    for _ in range(60):
+        source = rng.choice(nodes)
+        targets = rng.sample([n for n in nodes if n != source], rng.randint(1, 3))
+        legs = [source, *targets, source]
+        direct = sum(nx.shortest_path_length(graph, a, b, weight="weight") for a, b in zip(legs, legs[1:]))
+        try:
+            route = router.route(source, targets, frozenset(), stations, ENERGY_COST, THRESHOLD, bucket)
+        except NoPathError:
+            # Only when the plain round trip does not fit in the battery
+            assert direct * ENERGY_COST > FULL_BATTERY - THRESHOLD
+            continue
+        routed += 1
+        recharged += bool(route.stops)
+        assert route.path[0] == route.path[-1] == source
+        assert _visits_in_order(route.path, targets)
+        assert nx.path_weight(graph, route.path, "weight") == pytest.approx(route.distance)
+        _assert_battery(graph, route.path, route.stops, [*STATIONS, source], ENERGY_COST, THRESHOLD)
+        if direct * ENERGY_COST <= FULL_BATTERY - THRESHOLD:
+            assert route.distance == pytest.approx(direct)
+        else:
+            assert route.stops and route.distance >= direct - 1e-9
+    assert routed and recharged
+
+
+def _rovers():
+    with open(os.path.join(os.path.dirname(__file__), "..", ROVERS_FILE), encoding="utf-8") as f:
+        rovers = json.load(f)
+    for rover in rovers:
+        rover["terrain_compatibility"] = ["plain", "rocky", "sandy", "icy", "crater"]
+    return rovers
+
+
+def _goals(nodes, count: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        {"goal_id": f"G{i}", "description": "test goal", "priority": "high", "terrain": "plain", "target_nodes": rng.sample(nodes, 3)}
+        for i in range(count)
+    ]
+
+
+def test_rover_candidates_with_recharge_stops(map_path, reference_graph):
+    rovers = _rovers()
+    goals = _goals(sorted(reference_graph(None)), 30, seed=3)
+    out = evaluate.iter_rover_candidates(
+        map_path, FleetTable(rovers), goals, [],
+        energy_cost=ENERGY_COST, energy_threshold=THRESHOLD, charging_nodes=STATIONS,
+    )
+    graph = reference_graph(ROVER_TERRAIN_MULTIPLIERS)
+    recharged = [c for goal in out for c in goal.candidates if c.recharge_stops]
+    assert recharged
+    for c in recharged:
+        assert nx.path_weight(graph, c.path, "weight") == pytest.approx(c.distance)
+        _assert_battery(graph, c.path, c.recharge_stops, [*STATIONS, c.location], ENERGY_COST, THRESHOLD)
+
+
+def test_sweep_plans_recharges_per_grid_point(map_path, reference_graph):
+    rovers = _rovers()
+    goals = _goals(sorted(reference_graph(None)), 12, seed=8)
+    costs, thresholds = [0.3, ENERGY_COST], [THRESHOLD, 40.0]
+    cube = evaluate.sweep_rovers(
+        map_path, FleetTable(rovers), goals, [], energy_cost=costs, energy_threshold=thresholds, charging_nodes=STATIONS
+    )
+    ids = cube.vehicle_ids
+    recharged = 0
+    for c, cost in enumerate(costs):
+        for t, threshold in enumerate(thresholds):
+            fresh = [
+                g.model_dump() for g in evaluate.iter_rover_candidates(
+                    map_path, FleetTable(rovers), goals, [],
+                    energy_cost=cost, energy_threshold=threshold, charging_nodes=STATIONS,
+                )
+            ]
+            assert [g.model_dump() for g in cube.candidates(energy_cost=cost, energy_threshold=threshold)] == fresh
+            for g, goal in enumerate(fresh):
+                by_id = {cand["rover_id"]: cand for cand in goal["candidates"]}
+                assert cube.feasible[g, :, c, t].tolist() == [i in by_id for i in ids]
+                for v, rover_id in enumerate(ids):
+                    if rover_id in by_id:
+                        assert cube.values["recharge_before"][g, v, c, t] == by_id[rover_id]["recharge_before"]
+                recharged += sum(bool(cand["recharge_stops"]) for cand in goal["candidates"])
+    assert recharged
@@ -0,0 +1,20 @@
+"""Fleet parsing (planning/fleet.py) on malformed vehicle records."""
+from __future__ import annotations
+
+from mars_exploration.planning.candidates import parse_goal
+from mars_exploration.planning.fleet import FleetTable, rover_goal_candidates
+
+
+def test_null_numbers_do_not_fail_the_fleet():
+    table = FleetTable([
+        {"id": "rover_1", "location": "N1", "energy": None, "speed": "fast", "terrain_compatibility": ["plain"]},
+        {"location": "N2", "energy": None},
+        {"id": "rover_3", "energy": None, "altitude": None},
+    ])
+    assert table.data["energy"].tolist() == [0.0, 0.0, 0.0]
+    assert table.data["speed"].tolist() == [0.0, 0.0, 0.0]
+
+    goal = parse_goal({"goal_id": "G1", "terrain": "plain", "target_nodes": ["N5"]})
+    out = rover_goal_candidates(table, goal, lambda s, t: (10.0, [s, *t, s]), set(), 0.2, 5.0)
+    assert [c.rover_id for c in out.candidates] == ["rover_1"]
+    assert out.candidates[0].recharge_before
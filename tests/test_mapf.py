@@ -0,0 +1,106 @@
+"""Rover schedules (planning/mapf.py) are walks on the map without vertex or swap conflicts."""
+from __future__ import annotations
+
+import itertools
+import os
+import random
+from typing import Dict, Tuple
+
+import networkx as nx
+import pytest
+
+from mars_exploration.models.rover_models import RoverGoalAssignment, RoverSelectionPlan
+from mars_exploration.paths import ROVER_PLAN_JSON
+from mars_exploration.planning import evaluate
+from mars_exploration.planning.fleet import FleetTable
+from mars_exploration.planning.mapf import schedule_plan_file, schedule_rovers
+
+
+def _plan(map_path: str, nodes, rovers: int, bases: int, seed: int) -> RoverSelectionPlan:
+    """One two-target goal per rover, rovers sharing a few start nodes (as in benchmarks/bench_schedule.py)."""
+    rng = random.Random(seed)
+    starts = rng.sample(nodes, bases)
+    fleet = [
+        {
+            "id": f"rover_{i}",
+            "location": starts[i % bases],
+            "energy": 100,
+            "speed": round(rng.uniform(1.5, 3.0), 2),
+            "terrain_compatibility": ["plain", "rocky", "sandy", "icy", "crater"],
+        }
+        for i in range(rovers)
+    ]
+    goals = [
+        {
+            "goal_id": f"G{i}",
+            "description": "test goal",
+            "priority": rng.choice(["high", "medium", "low"]),
+            "terrain": "plain",
+            "target_nodes": rng.sample(nodes, 2),
+        }
+        for i in range(rovers)
+    ]
+    plan = RoverSelectionPlan()
+    for i, goal in enumerate(evaluate.iter_rover_candidates(map_path, FleetTable(fleet), goals, [], energy_cost=0.05)):
+        candidate = next((c for c in goal.candidates if c.rover_id == f"rover_{i}"), None)
+        if candidate is not None:
+            plan.assignments.append(
+                RoverGoalAssignment(
+                    goal_id=goal.goal_id,
+                    description=goal.description,
+                    priority=goal.priority,
+                    terrain=goal.terrain,
+                    target_nodes=goal.target_nodes,
+                    selected_rover=candidate,
+                    selection_reason="test",
+                )
+            )
+    return plan
+
+
+def _assert_conflict_free(schedule, plan: RoverSelectionPlan, graph: nx.Graph) -> None:
+    tick = schedule.tick
+    bases = {a.selected_rover.location for a in plan.assignments}
+    occupied: Dict[Tuple[str, int], str] = {}
+    moves = []
+    for s in schedule.schedules:
+        assert s.path == [stop.node for stop in s.timed_path]
+        assert s.path[0] == s.path[-1] and s.path[0] in bases
+        for i, stop in enumerate(s.timed_path):
+            arrival, departure = round(stop.arrival / tick), round(stop.departure / tick)
+            assert arrival <= departure
+            if stop.node not in bases:
+                for t in range(arrival, departure + 1):
+                    # Vertex conflict: two rovers on one node in the same tick
+                    assert occupied.setdefault((stop.node, t), s.rover_id) == s.rover_id, (stop.node, t)
+            if i + 1 < len(s.timed_path):
+                nxt = s.timed_path[i + 1]
+                assert graph.has_edge(stop.node, nxt.node), (stop.node, nxt.node)
+                assert nxt.arrival > stop.departure
+                moves.append((s.rover_id, stop.node, nxt.node, departure, round(nxt.arrival / tick)))
+    for a, b in itertools.combinations(moves, 2):
+        # Swap conflict: two rovers on one edge in opposite directions at the same time
+        if a[0] != b[0] and a[1] == b[2] and a[2] == b[1]:
+            assert not (a[3] < b[4] and b[3] < a[4]), (a, b)
+
+
+@pytest.mark.parametrize("tick", [1.0, 2.0])
+@pytest.mark.parametrize("detour", [0.0, 0.2])
+def test_shared_bases_are_conflict_free(map_path, reference_graph, tick, detour):
+    graph = reference_graph(None)
+    plan = _plan(map_path, sorted(graph), rovers=24, bases=3, seed=7)
+    assert len(plan.assignments) > 12
+    schedule = schedule_rovers(plan, map_path, tick=tick, detour=detour)
+    assert {s.rover_id for s in schedule.schedules} == {a.selected_rover.rover_id for a in plan.assignments}
+    _assert_conflict_free(schedule, plan, graph)
+
+
+def test_sample_plan(map_path, reference_graph):
+    path = os.path.join(os.path.dirname(__file__), "..", ROVER_PLAN_JSON)
+    schedule = schedule_plan_file(path, map_path)
+    plan = RoverSelectionPlan.model_validate_json(open(path, encoding="utf-8").read())
+    _assert_conflict_free(schedule, plan, reference_graph(None))
+    for s in schedule.schedules:
+        # Every target of the rover's goals is visited
+        targets = {t for a in plan.assignments if a.selected_rover.rover_id == s.rover_id for t in a.target_nodes}
+        assert targets <= set(s.path)
@@ -0,0 +1,48 @@
+"""Reachability index (routing/reachability.py) against nx.has_path as hazards come and go."""
+from __future__ import annotations
+
+import random
+
+import networkx as nx
+
+from mars_exploration.routing.compiled_map import load_map
+from mars_exploration.routing.reachability import ReachabilityIndex
+
+
+def test_hazards_added_and_removed_one_at_a_time(map_path, reference_graph):
+    cmap = load_map(map_path)
+    graph = reference_graph(None)
+    nodes = sorted(graph)
+    index_of = {n: cmap.index_of(n) for n in nodes}
+    for seed in range(5):
+        rng = random.Random(seed)
+        index = ReachabilityIndex(cmap)
+        prohibited = set()
+        for _ in range(60):
+            # Single-node deltas are what the index derives from cached labels
+            if prohibited and rng.random() < 0.4:
+                prohibited.discard(rng.choice(sorted(prohibited)))
+            else:
+                prohibited.add(rng.choice(nodes))
+            blocked = frozenset(index_of[n] for n in prohibited)
+            open_graph = graph.subgraph(n for n in nodes if n not in prohibited)
+            for _ in range(40):
+                source, target = rng.choice(nodes), rng.choice(nodes)
+                expected = source in open_graph and target in open_graph and nx.has_path(open_graph, source, target)
+                assert index.connected(index_of[source], [index_of[target]], blocked) == expected, (source, target)
+
+
+def test_multiple_targets(map_path, reference_graph):
+    cmap = load_map(map_path)
+    graph = reference_graph(None)
+    nodes = sorted(graph)
+    index = ReachabilityIndex(cmap)
+    rng = random.Random(23)
+    for _ in range(100):
+        prohibited = set(rng.sample(nodes, rng.randint(0, 40)))
+        blocked = frozenset(cmap.index_of(n) for n in prohibited)
+        open_graph = graph.subgraph(n for n in nodes if n not in prohibited)
+        source = rng.choice(nodes)
+        targets = rng.sample(nodes, 3)
+        expected = source in open_graph and all(t in open_graph and nx.has_path(open_graph, source, t) for t in targets)
+        assert index.connected(cmap.index_of(source), [cmap.index_of(t) for t in targets], blocked) == expected
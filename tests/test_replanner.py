@@ -0,0 +1,98 @@
+"""Incremental replanning (planning/replanner.py) against a fresh path-tool evaluation."""
+from __future__ import annotations
+
+import json
+import os
+import random
+
+import pytest
+
+from mars_exploration.paths import DRONES_FILE, ROVERS_FILE
+from mars_exploration.planning import evaluate
+from mars_exploration.planning.fleet import FleetTable
+from mars_exploration.planning.replanner import CandidateReplanner
+from mars_exploration.routing.tiles import build_tiled_map
+
+
+def _fleet(path: str):
+    with open(os.path.join(os.path.dirname(__file__), "..", path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _goals(nodes, seed: int):
+    rng = random.Random(seed)
+    return [
+        {
+            "goal_id": f"G{i}",
+            "description": "test goal",
+            "priority": rng.choice(["high", "medium", "low"]),
+            "terrain": rng.choice(["", "rocky", "icy", "crater", "sandy", "plain"]),
+            "target_nodes": rng.sample(nodes, rng.randint(1, 3)),
+        }
+        for i in range(6)
+    ]
+
+
+def _dump(goals):
+    return [g.model_dump() for g in goals]
+
+
+@pytest.fixture(scope="module")
+def tiled_path(map_path):
+    # Next to the graphml, where source_map_path() finds the source map
+    return build_tiled_map(map_path, os.path.join(os.path.dirname(map_path), "mars_terrain.tiles"), tile_size=16)
+
+
+def test_tiled_map_is_replanned_on_its_source(map_path, tiled_path, reference_graph):
+    rovers = _fleet(ROVERS_FILE)
+    goals = _goals(sorted(reference_graph(None)), seed=1)
+    on_tiles = CandidateReplanner.for_rovers(tiled_path, rovers, goals, ["N12"])
+    on_graphml = CandidateReplanner.for_rovers(map_path, rovers, goals, ["N12"])
+    assert _dump(on_tiles.candidates()) == _dump(on_graphml.candidates())
+
+
+def _strip(goals):
+    """GoalCandidates without paths, which may differ between equally short routes."""
+    out = []
+    for goal in goals:
+        d = goal.model_dump()
+        for c in d["candidates"]:
+            c.pop("path")
+            for key in ("distance", "energy_required", "time_required"):
+                if key in c:
+                    c[key] = round(c[key], 6)
+        out.append(d)
+    return out
+
+
+@pytest.mark.parametrize("use_terrain_weight", [True, False])
+def test_hazard_deltas_match_a_fresh_evaluation(map_path, reference_graph, use_terrain_weight):
+    rovers, drones = _fleet(ROVERS_FILE), _fleet(DRONES_FILE)
+    nodes = sorted(reference_graph(None))
+    rng = random.Random(5)
+    for trial in range(4):
+        goals = _goals(nodes, seed=trial)
+        prohibited = set(rng.sample(nodes, rng.randint(0, 10)))
+        rover_plan = CandidateReplanner.for_rovers(map_path, rovers, goals, sorted(prohibited), use_terrain_weight)
+        drone_plan = CandidateReplanner.for_drones(
+            map_path, drones, goals, sorted(prohibited), use_terrain_weight, flight_time_threshold=25
+        )
+        for _ in range(8):
+            add = set(rng.sample(nodes, rng.randint(0, 3)))
+            remove = set(rng.sample(sorted(prohibited), min(len(prohibited), rng.randint(0, 3))))
+            # Rover and drone bases are toggled too
+            if rng.random() < 0.3:
+                add.add(rng.choice([r["location"] for r in rovers]))
+            prohibited = (prohibited | add) - (remove - add)
+            rover_plan.push_hazard_delta(add=add, remove=remove)
+            drone_plan.push_hazard_delta(add=add, remove=remove)
+
+            fresh_rovers = evaluate.iter_rover_candidates(
+                map_path, FleetTable(rovers), goals, sorted(prohibited), use_terrain_weight, alternatives=0
+            )
+            fresh_drones = evaluate.iter_drone_candidates(
+                map_path, FleetTable(drones), goals, sorted(prohibited), use_terrain_weight,
+                flight_time_threshold=25, alternatives=0,
+            )
+            assert _strip(rover_plan.candidates()) == _strip(fresh_rovers)
+            assert _strip(drone_plan.candidates()) == _strip(fresh_drones)
@@ -0,0 +1,56 @@
+"""Tiled route engine (routing/tiles.py) against networkx on the sample map."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from mars_exploration.routing.cost_models import COST_MODELS, ROVER_TERRAIN_MULTIPLIERS
+from mars_exploration.routing.tiles import SHORTCUT_CACHE_ENV, TiledRouteEngine, build_tiled_map, load_tiled_map
+
+# Not one of the precomputed cost models: shortcuts are derived per tile
+CUSTOM_MULTIPLIERS = {**ROVER_TERRAIN_MULTIPLIERS, "crater": 4.0}
+
+
+@pytest.fixture(scope="module")
+def tiled_map(map_path, tmp_path_factory):
+    # Small tiles so that routes cross several of them
+    return load_tiled_map(build_tiled_map(map_path, str(tmp_path_factory.mktemp("tiles") / "map.tiles"), tile_size=16))
+
+
+@pytest.mark.parametrize("multipliers", [*COST_MODELS.values(), CUSTOM_MULTIPLIERS], ids=[*COST_MODELS, "custom"])
+def test_legs_match_networkx(tiled_map, reference_graph, assert_leg, multipliers):
+    engine = TiledRouteEngine(tiled_map, multipliers)
+    graph = reference_graph(multipliers)
+    rng = random.Random(7)
+    nodes = sorted(graph)
+    for _ in range(200):
+        source, target = rng.sample(nodes, 2)
+        assert_leg(engine.leg, graph, source, target)
+
+
+def test_legs_with_prohibited_nodes(tiled_map, reference_graph, assert_leg):
+    engine = TiledRouteEngine(tiled_map, ROVER_TERRAIN_MULTIPLIERS)
+    graph = reference_graph(ROVER_TERRAIN_MULTIPLIERS)
+    rng = random.Random(11)
+    nodes = sorted(graph)
+    for _ in range(40):
+        prohibited = rng.sample(nodes, rng.randint(1, 25))
+        blocked = engine.blocked_indices(prohibited)
+        open_nodes = [n for n in nodes if n not in prohibited]
+        for _ in range(5):
+            source, target = rng.sample(open_nodes, 2)
+            assert_leg(lambda s, t: engine.leg(s, t, blocked), graph, source, target, prohibited)
+
+
+def test_shortcut_cache_is_bounded(tiled_map, reference_graph, assert_leg, monkeypatch):
+    monkeypatch.setenv(SHORTCUT_CACHE_ENV, "1")
+    engine = TiledRouteEngine(tiled_map, CUSTOM_MULTIPLIERS)
+    graph = reference_graph(CUSTOM_MULTIPLIERS)
+    rng = random.Random(3)
+    nodes = sorted(graph)
+    for _ in range(100):
+        source, target = rng.sample(nodes, 2)
+        assert_leg(engine.leg, graph, source, target)
+        assert len(engine._shortcuts) <= 1
+    assert engine._shortcuts